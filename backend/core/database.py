@@ -93,3 +93,23 @@ def get_pds_ledger_collection():
 def get_lifestyle_scans_collection():
     """Lifestyle/asset mismatch scan results (from lifestyle_mismatch)"""
     return get_database().lifestyle_scans
+
+
+def get_pds_ledger_checkpoints_collection():
+    """Signed Merkle checkpoints over PDS ledger segments"""
+    return get_database().pds_ledger_checkpoints
+
+
+def get_pds_ledger_imports_collection():
+    """Progress of bulk historical PDS ledger imports"""
+    return get_database().pds_ledger_imports
+
+
+def get_pds_ledger_stats_collection():
+    """Incrementally maintained PDS ledger statistics"""
+    return get_database().pds_ledger_stats
+
+
+def get_pds_ledger_meta_collection():
+    """PDS ledger metadata (revision counter bumped by in-place edits)"""
+    return get_database().pds_ledger_meta
@@ -78,6 +78,17 @@ class ForbiddenError(PortalException):
         super().__init__("FORBIDDEN", message, 403)
 
 
+class PayloadTooLargeError(PortalException):
+    """Request body over the allowed size"""
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            "PAYLOAD_TOO_LARGE",
+            f"Request body exceeds {max_bytes} bytes",
+            413,
+            {"max_bytes": max_bytes}
+        )
+
+
 class InternalError(PortalException):
     """Internal server error"""
     def __init__(self, message: str = "Internal server error"):
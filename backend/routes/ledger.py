@@ -3,29 +3,55 @@ PDS Ledger (Blockchain) Routes
 Integrated from: kawach-ledger
 
 Endpoints:
-- GET  /api/ledger/blocks       - Get full blockchain ledger
+- GET  /api/ledger/blocks       - Browse the blockchain ledger (paginated)
 - POST /api/ledger/transaction  - Add new transaction block
 - GET  /api/ledger/verify       - Verify blockchain integrity
+- GET  /api/ledger/checkpoints  - List signed Merkle checkpoints
+- POST /api/ledger/checkpoints/audit - Re-audit checkpointed segments
+- GET  /api/ledger/proof/{index} - Merkle inclusion proof for a block
+- GET  /api/ledger/proof/hash/{block_hash} - Inclusion proof by block hash
 - GET  /api/ledger/stats        - Get ledger statistics
+- POST /api/ledger/stats/recount - Exact unique counts in the background
+- POST /api/ledger/import       - Bulk import historical transactions (CSV/NDJSON body)
+- POST /api/ledger/import/{import_id}/resume - Resume an interrupted import
+- GET  /api/ledger/import/{import_id} - Import progress
 - POST /api/ledger/simulate-tamper - Simulate tampering (demo)
 - POST /api/ledger/reset        - Reset blockchain (demo)
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime, timezone
+import asyncio
 import hashlib
-import json
+import os
+from typing import List, Optional
 
 from core.auth import require_official, require_permission
-from core.database import get_database, get_pds_ledger_collection
+from core.database import (
+    get_database, get_pds_ledger_collection, get_pds_ledger_checkpoints_collection,
+    get_pds_ledger_imports_collection, get_pds_ledger_meta_collection
+)
 from core.logging import get_logger, log_request
-from core.exceptions import ValidationError
+from core.exceptions import NotFoundError, PayloadTooLargeError, ValidationError
+
+from services.block_codec import check_quantity
+from services.ledger import utc_timestamp
+from services.ledger_verifier import verify_chain_stream
+from services.ledger_merkle import audit_checkpoints, inclusion_proof, mark_for_audit, verify_incremental
+from services.ledger_writer import get_ledger_writer
+from services.ledger_import import (
+    FORMATS, IMPORTS_DIR, MAX_IMPORT_BYTES, import_ledger, new_import_id, upload_path
+)
 
 router = APIRouter(prefix="/api/ledger", tags=["PDS Ledger"])
 logger = get_logger("ledger")
 
+# Running imports and recounts (references keep the tasks alive)
+_background_tasks = set()
+
+# Upload bytes buffered before each write to disk
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+
 
 # Request/Response Models
 class Transaction(BaseModel):
@@ -43,12 +69,15 @@ class Block(BaseModel):
     previous_hash: str
     hash: str
     added_by: Optional[str] = None
+    hash_version: Optional[int] = None
 
 
 class LedgerResponse(BaseModel):
     success: bool
     blocks: List[Block]
     total_blocks: int
+    next_after_index: Optional[int] = None  # Pass as after_index for the next page
+    has_more: bool = False
 
 
 class VerifyResponse(BaseModel):
@@ -57,61 +86,116 @@ class VerifyResponse(BaseModel):
     message: str
     total_blocks: int
     tampered_block: Optional[int] = None
+    tampered_blocks: List[int] = []
+    broken_links: List[int] = []
+    elapsed_seconds: Optional[float] = None
+    blocks_per_second: Optional[float] = None
+    verified_from_index: int = 0
+    watermark: Optional[int] = None
+    checkpoints_created: int = 0
+    segments_rechecked: int = 0  # Checkpointed segments re-audited by this call
+    last_audit_at: Optional[str] = None  # Other checkpointed segments were last checked at or after this
 
 
-def hash_block(block: dict) -> str:
-    """Calculate SHA-256 hash of a block."""
-    block_copy = {k: v for k, v in block.items() if k != "hash" and k != "_id"}
-    block_string = json.dumps(block_copy, sort_keys=True)
-    return hashlib.sha256(block_string.encode()).hexdigest()
+async def ensure_genesis_block():
+    """Create genesis block if chain is empty (once; the writer caches the tip)."""
+    await get_ledger_writer().tip()
 
 
-async def ensure_genesis_block():
-    """Create genesis block if chain is empty."""
-    db = get_database()
-    count = await db.pds_ledger.count_documents({})
-    
-    if count == 0:
-        genesis = {
-            "index": 0,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "transaction": {
-                "shop_id": "GENESIS",
-                "dealer_id": "GENESIS",
-                "beneficiary_id": "GENESIS",
-                "item": "Genesis Block",
-                "quantity": 0
-            },
-            "previous_hash": "0" * 64,
-            "hash": "",
-            "added_by": "SYSTEM"
-        }
-        genesis["hash"] = hash_block(genesis)
-        await db.pds_ledger.insert_one(genesis)
-        logger.info("Genesis block created")
+MAX_PAGE_SIZE = 1000
+
+LEDGER_REVISION_ID = "pds_ledger"
+
+
+async def _ledger_revision() -> int:
+    """Ledger-wide revision, bumped by every write that is not an append."""
+    doc = await get_pds_ledger_meta_collection().find_one({"_id": LEDGER_REVISION_ID})
+    return doc["revision"] if doc else 0
+
+
+async def _bump_ledger_revision():
+    await get_pds_ledger_meta_collection().update_one(
+        {"_id": LEDGER_REVISION_ID}, {"$inc": {"revision": 1}}, upsert=True
+    )
+
+
+def _utc_timestamp(value: Optional[str], name: str) -> Optional[str]:
+    """ISO timestamp normalized like stored block timestamps (naive means UTC)."""
+    if value is None:
+        return None
+    try:
+        return utc_timestamp(value)
+    except ValueError:
+        raise ValidationError(f"{name} must be an ISO 8601 timestamp")
 
 
 @router.get("/blocks", response_model=LedgerResponse)
 @log_request("ledger")
 async def get_ledger(
+    request: Request,
+    after_index: Optional[int] = Query(None, ge=-1, description="Keyset cursor: blocks after this index"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    start_index: Optional[int] = Query(None, ge=0),
+    end_index: Optional[int] = Query(None, ge=0),
+    since: Optional[str] = Query(None, description="Blocks with timestamp >= since (ISO 8601)"),
+    until: Optional[str] = Query(None, description="Blocks with timestamp < until (ISO 8601)"),
     user: dict = Depends(require_permission("ledger:read"))
 ):
     """
-    Get the full blockchain ledger.
+    Browse the blockchain ledger in index order.
+    
+    Pages are keyset-paginated on the unique index: pass next_after_index
+    back as after_index. start_index/end_index (inclusive) and since/until
+    narrow the range. The ETag is derived from the chain tip, the ledger
+    revision and the query, so a poll with If-None-Match gets 304 until a
+    block is appended or the chain is edited through this API
+    (simulate-tamper, reset). Edits made directly in the database are not
+    seen by the ETag; /verify detects those.
     
     Originally: GET /ledger in kawach-ledger
     """
     await ensure_genesis_block()
+    since, until = _utc_timestamp(since, "since"), _utc_timestamp(until, "until")
     
     db = get_database()
+    tip = await db.pds_ledger.find_one({}, {"_id": 0, "hash": 1}, sort=[("index", -1)])
+    revision = await _ledger_revision()
+    etag = '"' + hashlib.sha256(
+        f"{tip['hash'] if tip else ''}|{revision}|{request.url.query}".encode()
+    ).hexdigest()[:32] + '"'
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    index_range = {}
+    lower = max(after_index + 1 if after_index is not None else 0, start_index or 0)
+    if lower > 0:
+        index_range["$gte"] = lower
+    if end_index is not None:
+        index_range["$lte"] = end_index
+    query = {"index": index_range} if index_range else {}
+    time_range = {}
+    if since:
+        time_range["$gte"] = since
+    if until:
+        time_range["$lt"] = until
+    if time_range:
+        query["timestamp"] = time_range
+    
     blocks = await db.pds_ledger.find(
-        {}, {"_id": 0}
-    ).sort("index", 1).to_list(1000)
+        query, {"_id": 0}
+    ).sort("index", 1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(blocks) > limit
+    blocks = blocks[:limit]
     
-    return LedgerResponse(
+    response = LedgerResponse(
         success=True,
         blocks=blocks,
-        total_blocks=len(blocks)
+        total_blocks=len(blocks),
+        next_after_index=blocks[-1]["index"] if has_more else None,
+        has_more=has_more
+    )
+    return Response(
+        content=response.model_dump_json(), media_type="application/json", headers={"ETag": etag}
     )
 
 
@@ -124,97 +208,173 @@ async def add_transaction(
     """
     Add a new transaction to the blockchain.
     
+    Appends are sequenced (and group-committed under load) by the ledger
+    writer, so concurrent requests never chain onto the same tip.
+    
     Originally: POST /transaction in kawach-ledger
     """
-    await ensure_genesis_block()
-    
-    db = get_database()
-    
-    # Get previous block
-    previous_block = await db.pds_ledger.find_one(
-        {}, sort=[("index", -1)]
-    )
-    
-    if not previous_block:
-        raise HTTPException(status_code=500, detail="Blockchain not initialized")
-    
-    # Create new block
-    new_block = {
-        "index": previous_block["index"] + 1,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "transaction": {
-            "shop_id": transaction.shop_id,
-            "dealer_id": transaction.dealer_id,
-            "beneficiary_id": transaction.beneficiary_id,
-            "item": transaction.item,
-            "quantity": transaction.quantity
-        },
-        "previous_hash": previous_block["hash"],
-        "hash": "",
-        "added_by": user["id"]
-    }
-    new_block["hash"] = hash_block(new_block)
-    
-    # Add to chain
-    await db.pds_ledger.insert_one(new_block)
+    try:
+        check_quantity(transaction.quantity)
+    except ValueError as e:
+        raise ValidationError(str(e))
+    
+    new_block = await get_ledger_writer().append({
+        "shop_id": transaction.shop_id,
+        "dealer_id": transaction.dealer_id,
+        "beneficiary_id": transaction.beneficiary_id,
+        "item": transaction.item,
+        "quantity": transaction.quantity
+    }, added_by=user["id"])
     
     logger.info(f"Block #{new_block['index']} added - {transaction.item} ({transaction.quantity}kg)")
     
     return {
         "success": True,
         "message": "Transaction added successfully",
-        "block": {k: v for k, v in new_block.items() if k != "_id"}
+        "block": new_block
     }
 
 
 @router.get("/verify", response_model=VerifyResponse)
 @log_request("ledger")
 async def verify_ledger(
+    full: bool = Query(False, description="Re-verify the whole chain instead of only blocks after the latest checkpoint"),
     user: dict = Depends(require_permission("ledger:read"))
 ):
     """
     Verify blockchain integrity by checking all hashes.
     
+    Only blocks after the latest signed checkpoint are streamed and checked;
+    checkpointed segments are covered by the background Merkle audit (see
+    services.ledger_merkle), except that segments marked as changed are
+    re-audited here. last_audit_at tells how current that coverage is.
+    full=true re-verifies the whole chain.
+    
     Originally: GET /verify in kawach-ledger
     """
     db = get_database()
-    blocks = await db.pds_ledger.find({}).sort("index", 1).to_list(1000)
-    
-    is_valid = True
-    tampered_block = None
-    
-    for i in range(1, len(blocks)):
-        current = blocks[i]
-        previous = blocks[i - 1]
-        
-        # Check if previous hash matches
-        if current["previous_hash"] != previous["hash"]:
-            is_valid = False
-            tampered_block = i
-            break
-        
-        # Recalculate and verify hash
-        recalculated = hash_block(current)
-        if current["hash"] != recalculated:
-            is_valid = False
-            tampered_block = i
-            break
-    
-    if is_valid:
+    if full:
+        result = await verify_chain_stream(db.pds_ledger)
+        result["verified_from_index"] = 0
+    else:
+        result = await verify_incremental(
+            db.pds_ledger, get_pds_ledger_checkpoints_collection(), signed_by=user["id"]
+        )
+    progress = {
+        "verified_from_index": result["verified_from_index"],
+        "watermark": result.get("watermark"),
+        "checkpoints_created": result.get("checkpoints_created", 0),
+        "segments_rechecked": result.get("segments_rechecked", 0),
+        "last_audit_at": result.get("last_audit_at")
+    }
+    
+    if result["is_valid"]:
         return VerifyResponse(
             success=True,
             status="SAFE",
             message="Blockchain is secure - No tampering detected",
-            total_blocks=len(blocks)
+            total_blocks=result["total_blocks"],
+            elapsed_seconds=result["elapsed_seconds"],
+            blocks_per_second=result["blocks_per_second"],
+            **progress
         )
     else:
+        invalid_count = len(set(result["tampered_blocks"]) | set(result["broken_links"]))
         return VerifyResponse(
             success=False,
             status="COMPROMISED",
-            message=f"Tampering detected at block #{tampered_block}",
-            total_blocks=len(blocks),
-            tampered_block=tampered_block
+            message=f"Tampering detected at block #{result['first_invalid']} ({invalid_count} blocks affected)",
+            total_blocks=result["total_blocks"],
+            tampered_block=result["first_invalid"],
+            tampered_blocks=result["tampered_blocks"],
+            broken_links=result["broken_links"],
+            elapsed_seconds=result["elapsed_seconds"],
+            blocks_per_second=result["blocks_per_second"],
+            **progress
+        )
+
+
+@router.get("/checkpoints")
+@log_request("ledger")
+async def get_checkpoints(
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """
+    List signed Merkle checkpoints with their latest audit results.
+    """
+    checkpoints = await get_pds_ledger_checkpoints_collection().find(
+        {}, {"_id": 0, "levels": 0}
+    ).sort("segment", 1).to_list(None)
+    
+    return {
+        "success": True,
+        "watermark": checkpoints[-1]["end_index"] if checkpoints else None,
+        "checkpoints": checkpoints
+    }
+
+
+@router.post("/checkpoints/audit")
+@log_request("ledger")
+async def audit_ledger_checkpoints(
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """
+    Re-audit every checkpointed segment against its Merkle root now,
+    instead of waiting for the background audit.
+    """
+    db = get_database()
+    result = await audit_checkpoints(db.pds_ledger, get_pds_ledger_checkpoints_collection())
+    
+    return {
+        "success": not result["compromised_segments"],
+        **result
+    }
+
+
+async def _proof_response(index: Optional[int] = None, block_hash: Optional[str] = None) -> dict:
+    db = get_database()
+    result = await inclusion_proof(
+        db.pds_ledger, get_pds_ledger_checkpoints_collection(), index=index, block_hash=block_hash
+    )
+    if result is None:
+        raise NotFoundError("Block", str(index if index is not None else block_hash))
+    if result["checkpoint"] is None:
+        raise ValidationError(
+            f"Block #{result['block']['index']} is not covered by a checkpoint yet",
+            {"index": result["block"]["index"]}
         )
+    
+    return {"success": True, **result}
+
+
+@router.get("/proof/{index}")
+@log_request("ledger")
+async def get_inclusion_proof(
+    index: int,
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """
+    Merkle inclusion proof for one block.
+    
+    Check it offline with services.ledger.verify_inclusion_proof(
+    hash_block(block), proof, merkle_root), and the checkpoint's signature.
+    Blocks after the latest checkpoint have no proof until the next
+    /verify checkpoints their segment.
+    """
+    return await _proof_response(index=index)
+
+
+@router.get("/proof/hash/{block_hash}")
+@log_request("ledger")
+async def get_inclusion_proof_by_hash(
+    block_hash: str,
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """
+    Merkle inclusion proof for the block with this hash (e.g. the hash
+    returned when a transaction was added).
+    """
+    return await _proof_response(block_hash=block_hash)
 
 
 @router.get("/stats")
@@ -225,38 +385,163 @@ async def get_ledger_stats(
     """
     Get ledger statistics.
     
+    Served from the incrementally maintained stats document (see
+    services.ledger_stats); unique shop/beneficiary counts are HyperLogLog
+    estimates unless an exact recount is current.
+    
     Originally: GET /stats in kawach-ledger
     """
     db = get_database()
+    writer = get_ledger_writer()
     
-    total_blocks = await db.pds_ledger.count_documents({})
-    
-    # Aggregate by item
-    pipeline = [
-        {"$match": {"index": {"$gt": 0}}},  # Exclude genesis
-        {"$group": {
-            "_id": "$transaction.item",
-            "total_quantity": {"$sum": "$transaction.quantity"},
-            "transaction_count": {"$sum": 1}
-        }},
-        {"$sort": {"total_quantity": -1}}
-    ]
-    item_stats = await db.pds_ledger.aggregate(pipeline).to_list(100)
-    
-    # Get unique entities
-    unique_shops = len(await db.pds_ledger.distinct("transaction.shop_id"))
-    unique_beneficiaries = len(await db.pds_ledger.distinct("transaction.beneficiary_id"))
+    tip = await db.pds_ledger.find_one({}, {"_id": 0, "index": 1, "hash": 1}, sort=[("index", -1)])
+    if not await writer.stats.is_current(tip):
+        async with writer.lock:
+            await writer.stats.refresh(tip)
     
     return {
         "success": True,
-        "total_blocks": total_blocks,
-        "total_transactions": total_blocks - 1,  # Exclude genesis
-        "unique_shops": unique_shops - 1,  # Exclude GENESIS
-        "unique_beneficiaries": unique_beneficiaries - 1,
-        "items": item_stats
+        **await writer.stats.snapshot()
     }
 
 
+@router.post("/stats/recount", status_code=202)
+@log_request("ledger")
+async def recount_ledger_stats(
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """Start an exact recount of unique shops and beneficiaries in the background."""
+    stats = get_ledger_writer().stats
+    
+    async def run():
+        try:
+            await stats.recount_exact()
+        except Exception as e:
+            logger.error(f"Exact ledger stats recount failed: {e}")
+    
+    task = asyncio.get_running_loop().create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    
+    return {"success": True, "message": "Exact recount started"}
+
+
+async def _save_upload(request: Request, path: str) -> int:
+    """
+    Stream the request body to path, off the event loop.
+    
+    Returns:
+        Bytes written
+    
+    Raises:
+        PayloadTooLargeError: Over MAX_IMPORT_BYTES (the partial file is removed)
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_IMPORT_BYTES:
+        raise PayloadTooLargeError(MAX_IMPORT_BYTES)
+    
+    size = 0
+    buffer = bytearray()
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_IMPORT_BYTES:
+                raise PayloadTooLargeError(MAX_IMPORT_BYTES)
+            buffer += chunk
+            if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                await asyncio.to_thread(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(f.write, bytes(buffer))
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        os.remove(path)
+        raise
+    await asyncio.to_thread(f.close)
+    return size
+
+
+def _start_import(path: str, fmt: str, import_id: str, imported_by: str):
+    async def run():
+        try:
+            await import_ledger(path, fmt=fmt, import_id=import_id, imported_by=imported_by)
+        except Exception as e:
+            logger.error(f"Ledger import {import_id} failed: {e}")
+    
+    task = asyncio.get_running_loop().create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@router.post("/import", status_code=202)
+@log_request("ledger")
+async def start_import(
+    request: Request,
+    format: str = Query("csv", description="Body format: csv or ndjson"),
+    user: dict = Depends(require_permission("ledger:write"))
+):
+    """
+    Bulk import historical disbursements.
+    
+    The request body is the raw CSV/NDJSON file (shop_id, dealer_id,
+    beneficiary_id, item, quantity, optional timestamp per record). It is
+    streamed to disk and imported in the background; poll
+    GET /import/{import_id} for progress. Bodies over MAX_IMPORT_BYTES
+    (LEDGER_IMPORT_MAX_BYTES) are rejected with 413.
+    """
+    if format not in FORMATS:
+        raise ValidationError(f"format must be one of {', '.join(FORMATS)}")
+    
+    import_id = new_import_id()
+    path = upload_path(import_id, format)
+    os.makedirs(IMPORTS_DIR, exist_ok=True)
+    size = await _save_upload(request, path)
+    if size == 0:
+        os.remove(path)
+        raise ValidationError("Import file is empty")
+    
+    _start_import(path, format, import_id, user["id"])
+    logger.info(f"Import {import_id} started by {user['id']} ({size} bytes)")
+    
+    return {"success": True, "import_id": import_id, "status": "running"}
+
+
+@router.post("/import/{import_id}/resume", status_code=202)
+@log_request("ledger")
+async def resume_import(
+    import_id: str,
+    user: dict = Depends(require_permission("ledger:write"))
+):
+    """Resume an interrupted or failed import from its last committed record."""
+    progress = await get_pds_ledger_imports_collection().find_one({"import_id": import_id}, {"_id": 0})
+    if progress is None:
+        raise NotFoundError("Import", import_id)
+    if progress["status"] == "completed":
+        return {"success": True, **progress}
+    
+    path = upload_path(import_id, progress["format"])
+    if not os.path.exists(path):
+        raise ValidationError(f"Upload for import {import_id} is no longer available")
+    
+    _start_import(path, progress["format"], import_id, progress["imported_by"])
+    return {"success": True, "import_id": import_id, "status": "running"}
+
+
+@router.get("/import/{import_id}")
+@log_request("ledger")
+async def get_import(
+    import_id: str,
+    user: dict = Depends(require_permission("ledger:read"))
+):
+    """Progress of a bulk import."""
+    progress = await get_pds_ledger_imports_collection().find_one({"import_id": import_id}, {"_id": 0})
+    if progress is None:
+        raise NotFoundError("Import", import_id)
+    
+    return {"success": True, **progress}
+
+
 @router.post("/simulate-tamper")
 @log_request("ledger")
 async def simulate_tamper(
@@ -285,6 +570,9 @@ async def simulate_tamper(
         {"$set": {"transaction.quantity": target["transaction"]["quantity"] + 100}}
     )
     
+    # Re-audited by the next /verify instead of the background audit
+    await mark_for_audit(get_pds_ledger_checkpoints_collection(), target["index"])
+    await _bump_ledger_revision()
     logger.warning(f"DEMO: Tampered block #{target['index']}")
     
     return {
@@ -306,9 +594,15 @@ async def reset_ledger(
     Originally: POST /reset in kawach-ledger
     """
     db = get_database()
-    
-    # Delete all blocks
-    await db.pds_ledger.delete_many({})
+    writer = get_ledger_writer()
+    
+    # Delete all blocks and the checkpoints over them; no appends meanwhile
+    async with writer.lock:
+        await db.pds_ledger.delete_many({})
+        await get_pds_ledger_checkpoints_collection().delete_many({})
+        await writer.stats.reset()
+        await _bump_ledger_revision()
+        writer.invalidate()
     
     # Recreate genesis
     await ensure_genesis_block()
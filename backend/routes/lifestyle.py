@@ -4,14 +4,17 @@ Integrated from: lifestyle_mismatch (SATARK-360)
 
 Endpoints:
 - POST /api/lifestyle/scan      - 360° profile scan
+- POST /api/lifestyle/scan/batch - 360° profile scan of many applicants
 - GET  /api/lifestyle/history   - Get scan history
 - GET  /api/lifestyle/stats     - Get scan statistics
+- GET  /api/lifestyle/registry  - Reference registry sizes and memory use
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
+import time
 import uuid
 
 from core.auth import require_official, require_permission
@@ -19,7 +22,7 @@ from core.database import get_database, get_lifestyle_scans_collection
 from core.logging import get_logger, log_request
 from core.exceptions import ValidationError
 
-from services.lifestyle import LifestyleScanner
+from services.lifestyle import get_lifestyle_scanner
 
 router = APIRouter(prefix="/api/lifestyle", tags=["Lifestyle Mismatch Detection"])
 logger = get_logger("lifestyle")
@@ -36,15 +39,61 @@ class ScanResultResponse(BaseModel):
     integrity_status: str  # "CLEAN", "REVIEW REQUIRED", "CRITICAL FRAUD"
     risk_score: int
     family_cluster: List[str]
+    extended_cluster: Optional[List[str]] = None
     assets_detected: List[str]
     system_message: str
     scanned_at: Optional[str] = None
 
 
+class BatchScanRequest(BaseModel):
+    profiles: List[ApplicantProfile]
+
+
+class BatchScanResponse(BaseModel):
+    count: int
+    results: List[ScanResultResponse]
+    timing: dict
+
+
+# Upper bound on profiles per batch request
+MAX_BATCH_SCAN = 1000
+
+
+def _scan_doc(applicant: ApplicantProfile, result: dict, user: dict, scanned_at: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "scanned_by": user["id"],
+        "scanned_by_name": user["full_name"],
+        "applicant_name": applicant.name,
+        "applicant_dob": applicant.dob,
+        "applicant_address": applicant.address,
+        "integrity_status": result["integrity_status"],
+        "risk_score": result["risk_score"],
+        "family_cluster": result["family_cluster"],
+        "extended_cluster": result.get("extended_cluster"),
+        "assets_detected": result.get("assets_detected", []),
+        "system_message": result["system_message"],
+        "scanned_at": scanned_at
+    }
+
+
+def _scan_response(result: dict, scanned_at: str) -> ScanResultResponse:
+    return ScanResultResponse(
+        integrity_status=result["integrity_status"],
+        risk_score=result["risk_score"],
+        family_cluster=result["family_cluster"],
+        extended_cluster=result.get("extended_cluster"),
+        assets_detected=result.get("assets_detected", []),
+        system_message=result["system_message"],
+        scanned_at=scanned_at
+    )
+
+
 @router.post("/scan", response_model=ScanResultResponse)
 @log_request("lifestyle")
 async def scan_applicant_360(
     applicant: ApplicantProfile,
+    hop_limit: Optional[int] = Query(None, ge=1),
     user: dict = Depends(require_permission("lifestyle:write"))
 ):
     """
@@ -53,39 +102,66 @@ async def scan_applicant_360(
     Checks:
     - Identity resolution via AI matching
     - Family cluster identification
+    - Extended household (shared address/identifiers), limited to
+      hop_limit shared identifiers if given
     - Asset detection (vehicles, high electricity bills)
     - Risk scoring
     
     Originally: POST /scan_applicant_360 in lifestyle_mismatch
     """
-    scanner = LifestyleScanner()
-    result = await scanner.scan(applicant.name, applicant.dob, applicant.address)
+    scanner = get_lifestyle_scanner()
+    result = await scanner.scan(applicant.name, applicant.dob, applicant.address, hop_limit)
     
     # Save to database
     db = get_database()
-    scan_doc = {
-        "id": str(uuid.uuid4()),
-        "scanned_by": user["id"],
-        "scanned_by_name": user["full_name"],
-        "applicant_name": applicant.name,
-        "applicant_dob": applicant.dob,
-        "applicant_address": applicant.address,
-        "integrity_status": result["integrity_status"],
-        "risk_score": result["risk_score"],
-        "family_cluster": result["family_cluster"],
-        "assets_detected": result.get("assets_detected", []),
-        "system_message": result["system_message"],
-        "scanned_at": datetime.now(timezone.utc).isoformat()
-    }
+    scan_doc = _scan_doc(applicant, result, user, datetime.now(timezone.utc).isoformat())
     await db.lifestyle_scans.insert_one(scan_doc)
     
-    return ScanResultResponse(
-        integrity_status=result["integrity_status"],
-        risk_score=result["risk_score"],
-        family_cluster=result["family_cluster"],
-        assets_detected=result.get("assets_detected", []),
-        system_message=result["system_message"],
-        scanned_at=scan_doc["scanned_at"]
+    return _scan_response(result, scan_doc["scanned_at"])
+
+
+@router.post("/scan/batch", response_model=BatchScanResponse)
+@log_request("lifestyle")
+async def scan_applicants_batch(
+    request: BatchScanRequest,
+    hop_limit: Optional[int] = Query(None, ge=1),
+    user: dict = Depends(require_permission("lifestyle:write"))
+):
+    """
+    360° profile scan of many applicants in one request.
+    
+    Identities are resolved in bulk, each household's assets are evaluated
+    once per batch, and all scans are saved with a single insert_many.
+    Results are returned in input order.
+    """
+    if not request.profiles:
+        raise ValidationError("At least one applicant profile is required")
+    if len(request.profiles) > MAX_BATCH_SCAN:
+        raise ValidationError(
+            f"Batch too large: {len(request.profiles)} profiles (max {MAX_BATCH_SCAN})",
+            {"max_batch_size": MAX_BATCH_SCAN}
+        )
+    
+    scanner = get_lifestyle_scanner()
+    results, timing = await scanner.scan_batch(
+        [profile.model_dump() for profile in request.profiles], hop_limit
+    )
+    
+    # Save to database
+    db = get_database()
+    persist_start = time.perf_counter()
+    scanned_at = datetime.now(timezone.utc).isoformat()
+    scan_docs = [
+        _scan_doc(applicant, result, user, scanned_at)
+        for applicant, result in zip(request.profiles, results)
+    ]
+    await db.lifestyle_scans.insert_many(scan_docs)
+    timing["persist_ms"] = round((time.perf_counter() - persist_start) * 1000, 2)
+    
+    return BatchScanResponse(
+        count=len(results),
+        results=[_scan_response(result, scanned_at) for result in results],
+        timing=timing
     )
 
 
@@ -161,6 +237,26 @@ async def get_lifestyle_stats(
     }
 
 
+@router.get("/registry")
+@log_request("lifestyle")
+async def get_registry_info(
+    user: dict = Depends(require_permission("lifestyle:read"))
+):
+    """
+    Sizes and in-memory footprint of the loaded reference registries,
+    including civil registry memory per million citizens.
+    """
+    scanner = get_lifestyle_scanner()
+    
+    return {
+        "citizens": len(scanner.df_civil),
+        "vehicles": len(scanner.df_vahan),
+        "discom_records": len(scanner.df_discom),
+        "households": len(scanner.family_index),
+        "memory": scanner.memory_report()
+    }
+
+
 @router.get("/scan/{scan_id}")
 @log_request("lifestyle")
 async def get_scan_detail(
@@ -12,11 +12,11 @@ import os
 from datetime import datetime, timezone, timedelta
 import random
 import uuid
-import hashlib
-import json
 from dotenv import load_dotenv
 from pathlib import Path
 
+from services.ledger import seal_block
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -169,17 +169,12 @@ async def create_welfare_applicants():
 # PDS LEDGER (BLOCKCHAIN) DATA
 # ============================================================================
 
-def hash_block(block: dict) -> str:
-    """Calculate SHA-256 hash of a block."""
-    block_copy = {k: v for k, v in block.items() if k != "hash" and k != "_id"}
-    block_string = json.dumps(block_copy, sort_keys=True)
-    return hashlib.sha256(block_string.encode()).hexdigest()
-
 async def create_pds_ledger():
     """Create mock PDS ledger transactions (blockchain)."""
     
-    # Delete existing ledger
+    # Delete existing ledger (and the checkpoints over it)
     await db.pds_ledger.delete_many({})
+    await db.pds_ledger_checkpoints.delete_many({})
     
     transactions = []
     previous_hash = "0" * 64
@@ -198,7 +193,7 @@ async def create_pds_ledger():
         "previous_hash": "0" * 64,
         "added_by": "SYSTEM"
     }
-    genesis["hash"] = hash_block(genesis)
+    seal_block(genesis)
     transactions.append(genesis)
     previous_hash = genesis["hash"]
     
@@ -228,7 +223,7 @@ async def create_pds_ledger():
             "previous_hash": previous_hash,
             "added_by": random.choice(["ADMIN", "OPERATOR_001", "OPERATOR_002", "SYSTEM"])
         }
-        block["hash"] = hash_block(block)
+        seal_block(block)
         transactions.append(block)
         previous_hash = block["hash"]
     
@@ -57,6 +57,10 @@ async def startup_event():
     init_database()
     logger.info("Core database module initialized")
 
+    if MODULES_AVAILABLE:
+        from services.ledger_merkle import start_background_audit
+        start_background_audit()
+
 class UserRegister(BaseModel):
     email: EmailStr
     password: str
@@ -369,4 +373,7 @@ if MODULES_AVAILABLE:
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if MODULES_AVAILABLE:
+        from services.ledger_merkle import stop_background_audit
+        stop_background_audit()
     client.close()
\ No newline at end of file
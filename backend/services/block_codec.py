@@ -0,0 +1,132 @@
+"""
+Block Codec
+Canonical encodings of PDS ledger blocks for hashing.
+
+Version 1 (blocks without a hash_version field) is the original
+json.dumps(sort_keys=True) of every stored field except hash and _id. It
+is kept so existing chains stay verifiable.
+
+Version 2 is a fixed binary layout hashed from a reusable per-thread
+buffer, with no dict copies or JSON formatting:
+
+    u8   version (2)
+    u64  index
+    str  timestamp
+    str  shop_id, dealer_id, beneficiary_id, item
+    i64  quantity in thousandths (must be exact)
+    32B  previous_hash (raw digest)
+    str  added_by
+
+Integers are big-endian. A str is a u32 byte length followed by UTF-8
+bytes; None is encoded as length 0xFFFFFFFF. Only these fields are
+covered, so v2 blocks carry no other fields besides hash and
+hash_version.
+
+A quantity that is not a whole number of thousandths has no v2 encoding
+(quantity_units raises ValueError): appends and imports reject it, and a
+stored v2 block holding one fails verification instead of hashing like
+its rounded neighbour.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional
+
+HASH_V1 = 1
+HASH_V2 = 2
+
+# Version used for new blocks; existing blocks keep the version they were hashed with
+LEDGER_HASH_VERSION = int(os.environ.get("LEDGER_HASH_VERSION", HASH_V2))
+
+QUANTITY_SCALE = 1000
+NONE_LENGTH = 0xFFFFFFFF
+
+_HEADER = struct.Struct(">BQ")
+_LENGTH = struct.Struct(">I")
+_QUANTITY = struct.Struct(">q")
+
+_local = threading.local()
+
+
+def _buffer() -> bytearray:
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray()
+    return buffer
+
+
+def _put_str(buffer: bytearray, value: Optional[str]):
+    if value is None:
+        buffer += _LENGTH.pack(NONE_LENGTH)
+        return
+    data = str(value).encode("utf-8")
+    buffer += _LENGTH.pack(len(data))
+    buffer += data
+
+
+def quantity_units(quantity) -> int:
+    """
+    Quantity as an integer number of thousandths.
+
+    Raises ValueError unless the quantity is exactly that many thousandths,
+    so two different quantities never share an encoding.
+    """
+    value = float(quantity)
+    try:
+        units = round(value * QUANTITY_SCALE)
+    except OverflowError:
+        raise ValueError(f"Quantity {quantity} is out of range")
+    if units / QUANTITY_SCALE != value or not -2 ** 63 <= units < 2 ** 63:
+        raise ValueError(f"Quantity {quantity} is not a whole number of thousandths")
+    return units
+
+
+def check_quantity(quantity, version: int = LEDGER_HASH_VERSION):
+    """Raises ValueError if a new block of this hash version cannot hold quantity."""
+    if version == HASH_V2:
+        quantity_units(quantity)
+
+
+def encode_v2(index: int, timestamp: str, transaction: Dict[str, Any], previous_hash: str,
+              added_by: Optional[str], buffer: Optional[bytearray] = None) -> bytearray:
+    """Writes a block's v2 encoding into buffer (cleared first) and returns it."""
+    if buffer is None:
+        buffer = bytearray()
+    buffer.clear()
+    buffer += _HEADER.pack(HASH_V2, index)
+    _put_str(buffer, timestamp)
+    _put_str(buffer, transaction.get("shop_id"))
+    _put_str(buffer, transaction.get("dealer_id"))
+    _put_str(buffer, transaction.get("beneficiary_id"))
+    _put_str(buffer, transaction.get("item"))
+    buffer += _QUANTITY.pack(quantity_units(transaction.get("quantity", 0)))
+    buffer += bytes.fromhex(previous_hash)
+    _put_str(buffer, added_by)
+    return buffer
+
+
+def hash_v2(index: int, timestamp: str, transaction: Dict[str, Any], previous_hash: str,
+            added_by: Optional[str]) -> str:
+    buffer = encode_v2(index, timestamp, transaction, previous_hash, added_by, _buffer())
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def hash_v1(fields: Dict[str, Any]) -> str:
+    block_string = json.dumps(fields, sort_keys=True)
+    return hashlib.sha256(block_string.encode()).hexdigest()
+
+
+def hash_document(block: Dict[str, Any]) -> str:
+    """Hash of a stored block with the version recorded on it."""
+    version = block.get("hash_version", HASH_V1)
+    if version == HASH_V2:
+        return hash_v2(
+            block["index"], block["timestamp"], block["transaction"],
+            block["previous_hash"], block.get("added_by")
+        )
+    if version == HASH_V1:
+        return hash_v1({k: v for k, v in block.items() if k != "hash" and k != "_id"})
+    raise ValueError(f"Unknown block hash version: {version}")
@@ -0,0 +1,241 @@
+"""
+Household Graph
+Civil registry records linked through shared identifiers, not just family_id.
+
+Two records are connected when they share a family_id, a normalized
+address or any other identifier column present in the registry (phone,
+mobile, email). Connected components are computed once with a
+path-compressed union-find and persisted together with the edge
+adjacency, so when the registry is unchanged a restart only hashes the
+identifier columns and loads the arrays. A scan gets a person's extended
+household in O(1); a hop limit restricts the cluster to records within
+that many shared identifiers of the person.
+"""
+
+import hashlib
+import os
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.logging import get_logger
+from services.lifestyle_index import normalize_address
+
+logger = get_logger("services.household_graph")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+HOUSEHOLD_GRAPH_PATH = os.path.join(DATA_DIR, 'household_graph.npz')
+
+# Identifier columns that link records, when present in the registry
+LINK_COLUMNS = ['family_id', 'address', 'phone', 'mobile', 'email']
+
+# Values shared by more records than this (a bare city name, an office
+# phone) are not household identifiers and do not create edges
+MAX_SHARED_KEY_GROUP = 50
+
+# Bumped when the persisted arrays change, so older files are rebuilt
+GRAPH_FORMAT = 2
+
+# Arrays persisted in the graph file besides the fingerprint
+GRAPH_ARRAYS = ('labels', 'key_rows', 'key_offsets', 'row_keys', 'row_offsets', 'members', 'member_offsets')
+
+
+def normalize_identifier(value) -> Optional[str]:
+    """Lowercase, whitespace-free identifier key (None for blank/missing)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    normalized = ''.join(str(value).lower().split())
+    return normalized or None
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path compression and union by size."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression: point every node on the path at the root
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+
+def _csr(groups: np.ndarray, values: np.ndarray, n_groups: int):
+    """Values grouped by group id (stable), as (values, offsets)."""
+    order = np.argsort(groups, kind='stable')
+    counts = np.bincount(groups, minlength=n_groups)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return values[order].astype(np.int64), offsets
+
+
+class HouseholdGraph:
+    """
+    Bipartite graph of registry rows and shared identifier keys.
+
+    - components: row -> component label, persisted with the row/key
+      adjacency and a fingerprint of the identifier columns, and rebuilt
+      when they change
+    - cluster(position): rows of the position's component, O(1) lookup
+    - cluster(position, hop_limit): breadth-first search over shared keys
+    """
+
+    def __init__(self, df_civil: pd.DataFrame, link_columns: Optional[List[str]] = None,
+                 max_group_size: int = MAX_SHARED_KEY_GROUP, path: Optional[str] = HOUSEHOLD_GRAPH_PATH):
+        self.path = path
+        self.n_rows = len(df_civil)
+        columns = [c for c in (link_columns or LINK_COLUMNS) if c in df_civil.columns]
+
+        fingerprint = self._fingerprint(df_civil, columns, max_group_size)
+        arrays = self._load(fingerprint)
+        if arrays is None:
+            arrays = self._build(df_civil, columns, max_group_size)
+            self._save(arrays, fingerprint)
+
+        self.labels = arrays['labels']
+        self._key_rows, self._key_offsets = arrays['key_rows'], arrays['key_offsets']
+        self._row_keys, self._row_offsets = arrays['row_keys'], arrays['row_offsets']
+        self._members, self._member_offsets = arrays['members'], arrays['member_offsets']
+
+    def _build(self, df_civil: pd.DataFrame, columns: List[str], max_group_size: int) -> Dict[str, np.ndarray]:
+        """Edges, adjacency in both directions, components and their members."""
+        edge_rows, edge_keys, n_keys = self._edges(df_civil, columns, max_group_size)
+        key_rows, key_offsets = _csr(edge_keys, edge_rows, n_keys)
+        row_keys, row_offsets = _csr(edge_rows, edge_keys, self.n_rows)
+
+        labels = self._components(key_rows, key_offsets)
+        n_components = int(labels.max()) + 1 if len(labels) else 0
+        members, member_offsets = _csr(labels, np.arange(self.n_rows), n_components)
+        return {
+            'labels': labels,
+            'key_rows': key_rows,
+            'key_offsets': key_offsets,
+            'row_keys': row_keys,
+            'row_offsets': row_offsets,
+            'members': members,
+            'member_offsets': member_offsets
+        }
+
+    @staticmethod
+    def _edges(df_civil: pd.DataFrame, columns: List[str], max_group_size: int):
+        """(row, key) edge arrays; each key is a (column, normalized value) pair."""
+        rows, labels = [], []
+        for column in columns:
+            normalize = normalize_address if column == 'address' else normalize_identifier
+            keys = df_civil[column].map(normalize).to_numpy(dtype=object)
+            valid = np.flatnonzero(pd.notna(keys))
+            rows.append(valid)
+            labels.append(np.array([f"{column}:{key}" for key in keys[valid]], dtype=object))
+
+        if not rows:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), 0
+
+        edge_rows = np.concatenate(rows)
+        codes, uniques = pd.factorize(np.concatenate(labels))
+
+        # Drop hub keys shared by too many records
+        group_sizes = np.bincount(codes, minlength=len(uniques))
+        keep = group_sizes[codes] <= max_group_size
+        kept_codes, _ = pd.factorize(codes[keep])
+        return edge_rows[keep], kept_codes.astype(np.int64), int(kept_codes.max()) + 1 if keep.any() else 0
+
+    def _components(self, key_rows: np.ndarray, key_offsets: np.ndarray) -> np.ndarray:
+        """Union-find over the key groups; labels numbered in registry order."""
+        uf = UnionFind(self.n_rows)
+        for key in range(len(key_offsets) - 1):
+            group = key_rows[key_offsets[key]:key_offsets[key + 1]]
+            first = int(group[0])
+            for row in group[1:]:
+                uf.union(first, int(row))
+
+        roots = np.array([uf.find(row) for row in range(self.n_rows)], dtype=np.int64)
+        labels, _ = pd.factorize(roots)
+        return labels.astype(np.int32)
+
+    @staticmethod
+    def _fingerprint(df_civil: pd.DataFrame, columns: List[str], max_group_size: int) -> str:
+        digest = hashlib.sha256(f"{GRAPH_FORMAT}|{columns}|{max_group_size}|{len(df_civil)}".encode())
+        if columns:
+            hashes = pd.util.hash_pandas_object(df_civil[columns].astype(str), index=False)
+            digest.update(hashes.to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def _load(self, fingerprint: str) -> Optional[Dict[str, np.ndarray]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data['fingerprint']) != fingerprint:
+                    return None
+                arrays = {name: data[name] for name in GRAPH_ARRAYS}
+            logger.info(f"Loaded household graph: {len(arrays['member_offsets']) - 1} components")
+            return arrays
+        except Exception as e:
+            logger.warning(f"Could not load household graph, rebuilding: {e}")
+            return None
+
+    def _save(self, arrays: Dict[str, np.ndarray], fingerprint: str):
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, fingerprint=np.array(fingerprint), **arrays)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist household graph: {e}")
+
+    def component(self, position: int) -> np.ndarray:
+        """Row positions in the same component as position, in registry order."""
+        label = self.labels[position]
+        return self._members[self._member_offsets[label]:self._member_offsets[label + 1]]
+
+    def cluster(self, position: int, hop_limit: Optional[int] = None) -> np.ndarray:
+        """
+        Extended household of a registry row.
+
+        Args:
+            position: Row position in the civil registry
+            hop_limit: Maximum number of shared identifiers between the row
+                and a cluster member (None for the whole component)
+
+        Returns:
+            Row positions in registry order, including position itself
+        """
+        if hop_limit is None:
+            return self.component(position)
+
+        hops: Dict[int, int] = {position: 0}
+        seen_keys = set()
+        queue = deque([position])
+        while queue:
+            row = queue.popleft()
+            if hops[row] >= hop_limit:
+                continue
+            for key in self._row_keys[self._row_offsets[row]:self._row_offsets[row + 1]]:
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                for neighbour in self._key_rows[self._key_offsets[key]:self._key_offsets[key + 1]]:
+                    neighbour = int(neighbour)
+                    if neighbour not in hops:
+                        hops[neighbour] = hops[row] + 1
+                        queue.append(neighbour)
+
+        return np.array(sorted(hops), dtype=np.int64)
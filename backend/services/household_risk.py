@@ -0,0 +1,171 @@
+"""
+Household Risk Table
+Materialized per-family asset flags and risk scores.
+
+Every household's vehicle and electricity checks are evaluated once, in a
+single pass over the civil registry joined to the Vahan and Discom
+indexes, and kept keyed by family_id. Scans read a household's entry
+instead of re-checking every member; when registry rows change only the
+affected families are re-evaluated.
+
+Scoring matches LifestyleScanner._check_family_assets: +50 per member who
+owns a vehicle, +40 per member whose address has a bill above ₹8000,
+flags listed per member in registry order (vehicle, then bill).
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.logging import get_logger
+from services.lifestyle_index import AssetIndex, FamilyIndex, normalize_address
+
+logger = get_logger("services.household_risk")
+
+VEHICLE_RISK = 50
+HIGH_BILL_RISK = 40
+HIGH_BILL_THRESHOLD = 8000
+
+
+def evaluate_members(members: pd.DataFrame, asset_index: AssetIndex) -> Dict[Any, Dict[str, Any]]:
+    """
+    Risk entries for every family in members.
+
+    Args:
+        members: Civil registry rows (whole families, in registry order)
+        asset_index: Vahan/Discom lookups
+
+    Returns:
+        family_id -> {'risk_score', 'flags', 'evidence', 'members'}
+    """
+    if members.empty or 'family_id' not in members.columns:
+        return {}
+
+    index = members.index
+    ids = members['unique_id'] if 'unique_id' in members.columns else pd.Series('', index=index)
+    addresses = members['address'] if 'address' in members.columns else pd.Series('', index=index)
+    names = members['name'] if 'name' in members.columns else pd.Series('Unknown', index=index)
+
+    vehicles = asset_index.vehicle_models(ids)
+    has_vehicle = ids.astype(str).map(asset_index.has_vehicle).to_numpy(dtype=bool)
+    bills = asset_index.monthly_bills(addresses)
+    high_bill = (pd.to_numeric(bills, errors='coerce') > HIGH_BILL_THRESHOLD).to_numpy(dtype=bool)
+
+    family_ids = members['family_id']
+    scores = has_vehicle * VEHICLE_RISK + high_bill * HIGH_BILL_RISK
+    totals = pd.Series(scores, index=index).groupby(family_ids, sort=False, observed=True).sum()
+    sizes = family_ids.groupby(family_ids, sort=False, observed=True).size()
+
+    table = {
+        family_id: {'risk_score': int(total), 'flags': [], 'evidence': [], 'members': int(sizes[family_id])}
+        for family_id, total in totals.items()
+    }
+
+    # Flag strings only for the (few) members with an asset hit
+    flagged = np.flatnonzero(has_vehicle | high_bill)
+    for i in flagged:
+        family_id = family_ids.iat[i]
+        if family_id not in table:
+            continue
+        entry = table[family_id]
+        evidence = {'unique_id': ids.iat[i], 'name': names.iat[i]}
+        if has_vehicle[i]:
+            entry['flags'].append(f"🚗 Family Member ({names.iat[i]}) owns {vehicles.iat[i]}")
+            evidence['vehicle_model'] = vehicles.iat[i]
+        if high_bill[i]:
+            entry['flags'].append(f"⚡ High Monthly Bill Detected: ₹{bills.iat[i]}")
+            evidence['avg_monthly_bill'] = bills.iat[i]
+        entry['evidence'].append(evidence)
+
+    return table
+
+
+class HouseholdRiskTable:
+    """family_id -> materialized risk score, flags and asset evidence."""
+
+    def __init__(self, df_civil: pd.DataFrame, asset_index: AssetIndex):
+        self._entries: Dict[Any, Dict[str, Any]] = evaluate_members(df_civil, asset_index)
+        logger.info(f"Household risk table built: {len(self._entries)} families")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, family_id) -> Optional[Dict[str, Any]]:
+        return self._entries.get(family_id)
+
+    def lookup(self, family_id) -> Optional[Tuple[List[str], int]]:
+        """(flags, risk_score) for a family, or None if it is not in the table."""
+        entry = self._entries.get(family_id)
+        if entry is None:
+            return None
+        return list(entry['flags']), entry['risk_score']
+
+    def refresh(self, family_ids: Iterable, df_civil: pd.DataFrame, family_index: FamilyIndex,
+                asset_index: AssetIndex) -> int:
+        """
+        Re-evaluates only the given families against the current registries.
+
+        Families with no remaining members are dropped.
+
+        Returns:
+            Number of families refreshed
+        """
+        family_ids = [f for f in set(family_ids) if pd.notna(f)]
+        if not family_ids:
+            return 0
+
+        positions = np.concatenate([family_index.members(f) for f in family_ids])
+        positions.sort()
+        updated = evaluate_members(df_civil.iloc[positions], asset_index)
+
+        for family_id in family_ids:
+            if family_id in updated:
+                self._entries[family_id] = updated[family_id]
+            else:
+                self._entries.pop(family_id, None)
+
+        logger.info(f"Household risk table refreshed: {len(family_ids)} families")
+        return len(family_ids)
+
+
+def affected_families(old_civil: pd.DataFrame, new_civil: pd.DataFrame,
+                      old_assets: AssetIndex, new_assets: AssetIndex) -> Set:
+    """
+    Families whose risk entry can differ between two registry snapshots.
+
+    - Civil rows added, removed or edited: their old and new families
+    - Vehicle ownership changed: the owner's family
+    - Electricity bill changed at an address: families living there
+    """
+    affected = set()
+    key_columns = [c for c in ('unique_id', 'family_id', 'name', 'address') if c in new_civil.columns]
+
+    def row_counts(df):
+        """(unique_id, row hash) -> number of rows; a unique_id may appear more than once."""
+        if df.empty or 'unique_id' not in df.columns:
+            keys = pd.MultiIndex.from_arrays([np.array([], dtype=object), np.array([], dtype=np.uint64)])
+            return pd.Series(0, index=keys, dtype=np.int64)
+        columns = [c for c in key_columns if c in df.columns]
+        hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+        keys = pd.MultiIndex.from_arrays([df['unique_id'].astype(str).to_numpy(), hashes])
+        return pd.Series(1, index=keys, dtype=np.int64).groupby(level=[0, 1]).sum()
+
+    # Compare each unique_id's rows as a multiset, so duplicate ids neither
+    # break the alignment nor hide an edit to a later copy
+    delta = row_counts(old_civil).sub(row_counts(new_civil), fill_value=0)
+    changed_ids = set(delta.index[delta.ne(0)].get_level_values(0))
+
+    owners = old_assets.changed_owners(new_assets)
+    addresses = old_assets.changed_addresses(new_assets)
+
+    for df in (old_civil, new_civil):
+        if df.empty or 'family_id' not in df.columns:
+            continue
+        ids = df['unique_id'].astype(str) if 'unique_id' in df.columns else pd.Series('', index=df.index)
+        mask = ids.isin(changed_ids | owners)
+        if addresses and 'address' in df.columns:
+            mask |= df['address'].map(normalize_address).isin(addresses)
+        affected.update(df.loc[mask, 'family_id'].dropna())
+
+    return affected
@@ -0,0 +1,355 @@
+"""
+Batch Identity Linkage
+Offline Splink link_only job from welfare applicants to the Civil Registry.
+
+One prediction runs for every applicant not yet linked (or whose name
+or date of birth changed since it was linked), blocked on the same name keys as the online linker, on all DuckDB threads. Each
+applicant's best registry match (or none) is stored in the indexed
+applicant_identity table, which lifestyle scans read instead of resolving
+identities per request.
+
+The results database is rewritten to a temporary file and swapped in
+atomically, so readers in a running server keep their open handle until
+they notice the new file.
+
+Usage:
+    python -m services.identity_batch          # link new and changed applicants only
+    python -m services.identity_batch --full   # relink everyone
+"""
+
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.logging import get_logger
+from services.identity_linker import (
+    DATA_DIR, U_MAX_PAIRS, add_name_keys, linkage_settings,
+    prepare_registry, registry_fingerprint
+)
+
+logger = get_logger("services.identity_batch")
+
+APPLICANTS_CSV = os.path.join(DATA_DIR, 'welfare_applicants.csv')
+CIVIL_REGISTRY_CSV = os.path.join(DATA_DIR, 'civil_registry.csv')
+APPLICANT_IDENTITY_DB_PATH = os.path.join(DATA_DIR, 'applicant_identity.duckdb')
+
+IDENTITY_TABLE = 'applicant_identity'
+META_TABLE = 'linkage_meta'
+
+# Predictions below this probability are not kept as candidates
+PREDICT_THRESHOLD = 0.01
+
+
+def prepare_applicants(df_applicants: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linkage view of the applicants: unique_id (applicant_id), name keys,
+    ISO dob and linkage_hash (changes when name or dob does).
+    """
+    prepared = pd.DataFrame({
+        'unique_id': df_applicants['applicant_id'].astype(str).to_numpy(),
+        'name': df_applicants['name'].fillna('').astype(str).to_numpy(),
+        'dob': _iso_dates(df_applicants['dob']).to_numpy()
+            if 'dob' in df_applicants.columns else None,
+    })
+    prepared = prepared.drop_duplicates('unique_id').reset_index(drop=True)
+    prepared['linkage_hash'] = pd.util.hash_pandas_object(
+        prepared[['name', 'dob']].astype(str), index=False
+    ).astype(str).to_numpy()
+    return add_name_keys(prepared)
+
+
+def _iso_dates(values: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(values, errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None)
+
+
+def identity_key(name: str, dob: Optional[str]) -> tuple:
+    """Lookup key used by online scans: lowercase collapsed name and ISO dob."""
+    name_key = ' '.join(str(name).lower().split())
+    return name_key, _iso_dates(pd.Series([dob])).iloc[0]
+
+
+def _create_schema(con):
+    con.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key VARCHAR PRIMARY KEY, value VARCHAR)")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {IDENTITY_TABLE} (
+            applicant_id VARCHAR PRIMARY KEY,
+            name_key VARCHAR,
+            dob VARCHAR,
+            unique_id VARCHAR,
+            matched_name VARCHAR,
+            match_probability DOUBLE,
+            linked_at TIMESTAMP,
+            linkage_hash VARCHAR
+        )
+    """)
+    # Tables from before linkage_hash: their rows read as changed and are relinked
+    con.execute(f"ALTER TABLE {IDENTITY_TABLE} ADD COLUMN IF NOT EXISTS linkage_hash VARCHAR")
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_{IDENTITY_TABLE}_name_dob ON {IDENTITY_TABLE}(name_key, dob)")
+
+
+def _best_matches(applicants: pd.DataFrame, registry: pd.DataFrame, threads: int) -> pd.DataFrame:
+    """Runs one link_only prediction and keeps each applicant's best candidate."""
+    import duckdb
+    from splink import DuckDBAPI, Linker
+
+    con = duckdb.connect()
+    con.execute(f"SET threads TO {threads}")
+
+    db_api = DuckDBAPI(connection=con)
+
+    # u values come from pairs of registry records, as in the online linker;
+    # a capped sample of applicant-citizen pairs leaves the rare levels empty
+    registry_linker = Linker(
+        registry, linkage_settings("dedupe_only", len(registry)), db_api, set_up_basic_logging=False
+    )
+    registry_linker.training.estimate_u_using_random_sampling(max_pairs=U_MAX_PAIRS, seed=42)
+    settings = registry_linker.misc.save_model_to_json()
+    settings['link_type'] = 'link_only'
+
+    linker = Linker(
+        [applicants[['unique_id', 'name', 'first_name', 'surname']], registry],
+        settings,
+        db_api,
+        input_table_aliases=['applicants', 'civil_registry'],
+        set_up_basic_logging=False,
+    )
+    predictions = linker.inference.predict(threshold_match_probability=PREDICT_THRESHOLD)
+
+    # Splink orders each pair by source dataset, so applicants are on the left
+    best = con.execute(f"""
+        SELECT unique_id_l AS applicant_id, unique_id_r AS unique_id,
+               name_r AS matched_name, match_probability
+        FROM {predictions.physical_name}
+        WHERE source_dataset_l = 'applicants'
+        QUALIFY row_number() OVER (
+            PARTITION BY unique_id_l ORDER BY match_probability DESC, unique_id_r
+        ) = 1
+    """).df()
+    con.close()
+
+    matched = applicants[['unique_id', 'name', 'dob', 'linkage_hash']].rename(
+        columns={'unique_id': 'applicant_id', 'name': 'name_key'}
+    ).merge(best, on='applicant_id', how='left')
+    matched['match_probability'] = matched['match_probability'].astype(float)
+    return matched
+
+
+def run_batch_linkage(applicants_csv: str = APPLICANTS_CSV, civil_csv: str = CIVIL_REGISTRY_CSV,
+                      db_path: str = APPLICANT_IDENTITY_DB_PATH, full: bool = False,
+                      threads: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Links applicants to the civil registry and stores their best matches.
+
+    Incremental by default: only applicants missing from the table, or
+    whose name or dob changed (linkage_hash), are linked. Everyone is
+    relinked when full is set or the registry changed since the last run.
+
+    Returns:
+        Run statistics (identity rows written, matched, total, seconds)
+    """
+    import duckdb
+
+    start = time.perf_counter()
+    threads = threads or os.cpu_count() or 1
+
+    registry = prepare_registry(pd.read_csv(civil_csv, dtype={'unique_id': str}))
+    applicants = prepare_applicants(pd.read_csv(applicants_csv, dtype={'applicant_id': str}))
+    fingerprint = registry_fingerprint(registry)
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    if not full and os.path.exists(db_path):
+        shutil.copyfile(db_path, tmp_path)
+
+    con = duckdb.connect(tmp_path)
+    try:
+        _create_schema(con)
+        stored = con.execute(f"SELECT value FROM {META_TABLE} WHERE key = 'registry_fingerprint'").fetchone()
+        if stored is None or stored[0] != fingerprint:
+            if stored is not None:
+                logger.info("Civil registry changed since last run, relinking all applicants")
+            con.execute(f"DELETE FROM {IDENTITY_TABLE}")
+
+        linked = dict(con.execute(f"SELECT applicant_id, linkage_hash FROM {IDENTITY_TABLE}").fetchall())
+        stored_hashes = applicants['unique_id'].map(linked)
+        pending = applicants[stored_hashes.ne(applicants['linkage_hash'])]
+
+        written = 0
+        matched_count = 0
+        if not pending.empty and not registry.empty:
+            logger.info(f"Linking {len(pending)} applicants against {len(registry)} citizens on {threads} threads")
+            matches = _best_matches(pending, registry, threads)
+            matched_count = int(matches['unique_id'].notna().sum())
+
+            con.register('_matches', matches)
+            con.execute(f"DELETE FROM {IDENTITY_TABLE} WHERE applicant_id IN (SELECT applicant_id FROM _matches)")
+            written = con.execute(f"""
+                INSERT INTO {IDENTITY_TABLE}
+                SELECT applicant_id, name_key, dob, unique_id, matched_name,
+                       match_probability, current_timestamp, linkage_hash
+                FROM _matches
+            """).fetchone()[0]
+            con.unregister('_matches')
+
+        con.execute(f"INSERT OR REPLACE INTO {META_TABLE} VALUES ('registry_fingerprint', ?)", [fingerprint])
+        total = con.execute(f"SELECT count(*) FROM {IDENTITY_TABLE}").fetchone()[0]
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+
+    os.replace(tmp_path, db_path)
+
+    stats = {
+        'linked': int(written),
+        'matched': matched_count,
+        'total_applicants': int(total),
+        'threads': threads,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    logger.info(f"Batch linkage complete: {stats}")
+    return stats
+
+
+class ApplicantIdentityLookup:
+    """
+    Read-only view of the applicant_identity table for online scans.
+
+    The database is reopened when the batch job swaps in a new file. Once a
+    registry fingerprint is expected (expect_registry), links computed
+    against any other registry snapshot are not served.
+    """
+
+    def __init__(self, db_path: str = APPLICANT_IDENTITY_DB_PATH):
+        self.db_path = db_path
+        self.registry_fingerprint: Optional[str] = None
+        self._con = None
+        self._mtime = None
+        self._linked_fingerprint: Optional[str] = None
+        self._warned = False
+        self._lock = threading.Lock()
+
+    def expect_registry(self, fingerprint: Optional[str]):
+        """Only serve links computed against the registry with this fingerprint."""
+        with self._lock:
+            if fingerprint != self.registry_fingerprint:
+                self.registry_fingerprint = fingerprint
+                self._warned = False
+
+    def _connection(self):
+        try:
+            mtime = os.path.getmtime(self.db_path)
+        except OSError:
+            return None
+
+        if self._con is None or mtime != self._mtime:
+            import duckdb
+            if self._con is not None:
+                self._con.close()
+            self._con = duckdb.connect(self.db_path, read_only=True)
+            self._mtime = mtime
+            row = self._con.execute(
+                f"SELECT value FROM {META_TABLE} WHERE key = 'registry_fingerprint'"
+            ).fetchone()
+            self._linked_fingerprint = row[0] if row else None
+            self._warned = False
+
+        if self.registry_fingerprint is not None and self._linked_fingerprint != self.registry_fingerprint:
+            if not self._warned:
+                logger.warning("Applicant identities were linked against another civil registry snapshot, "
+                               "ignoring them until the batch linkage job is rerun")
+                self._warned = True
+            return None
+        return self._con
+
+    def lookup(self, name: str, dob: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Precomputed best match for an applicant.
+
+        Returns:
+            Dict with unique_id, matched_name and match_probability, or None
+            if the applicant was never linked or had no candidate
+        """
+        name_key, iso_dob = identity_key(name, dob)
+        with self._lock:
+            try:
+                con = self._connection()
+                if con is None:
+                    return None
+                row = con.execute(
+                    f"SELECT unique_id, matched_name, match_probability FROM {IDENTITY_TABLE} "
+                    f"WHERE name_key = ? AND dob IS NOT DISTINCT FROM ? AND unique_id IS NOT NULL "
+                    f"ORDER BY match_probability DESC LIMIT 1",
+                    [name_key, iso_dob]
+                ).fetchone()
+            except Exception as e:
+                logger.warning(f"Applicant identity lookup failed: {e}")
+                return None
+
+        if row is None:
+            return None
+        return {'unique_id': row[0], 'matched_name': row[1], 'match_probability': row[2]}
+
+    def lookup_many(self, people: List[Tuple[str, Optional[str]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Precomputed best matches for many (name, dob) pairs in one query.
+
+        Returns:
+            One lookup() result per input pair, in input order
+        """
+        if not people:
+            return []
+
+        keys = pd.DataFrame([identity_key(name, dob) for name, dob in people], columns=['name_key', 'dob'])
+        keys['position'] = np.arange(len(keys))
+        with self._lock:
+            try:
+                con = self._connection()
+                if con is None:
+                    return [None] * len(people)
+                con.register('_lookup_keys', keys)
+                try:
+                    rows = con.execute(f"""
+                        SELECT k.position, i.unique_id, i.matched_name, i.match_probability
+                        FROM _lookup_keys k
+                        JOIN {IDENTITY_TABLE} i
+                          ON i.name_key = k.name_key AND i.dob IS NOT DISTINCT FROM k.dob
+                        WHERE i.unique_id IS NOT NULL
+                        QUALIFY row_number() OVER (
+                            PARTITION BY k.position ORDER BY i.match_probability DESC
+                        ) = 1
+                    """).fetchall()
+                finally:
+                    con.unregister('_lookup_keys')
+            except Exception as e:
+                logger.warning(f"Applicant identity lookup failed: {e}")
+                return [None] * len(people)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(people)
+        for position, unique_id, matched_name, probability in rows:
+            results[position] = {'unique_id': unique_id, 'matched_name': matched_name, 'match_probability': probability}
+        return results
+
+
+# Singleton lookup shared by scanner instances
+_identity_lookup = None
+
+def get_applicant_identity_lookup() -> ApplicantIdentityLookup:
+    global _identity_lookup
+    if _identity_lookup is None:
+        _identity_lookup = ApplicantIdentityLookup()
+    return _identity_lookup
+
+
+if __name__ == '__main__':
+    import sys
+
+    stats = run_batch_linkage(full='--full' in sys.argv)
+    print(f"Linked {stats['linked']} applicants ({stats['matched']} matched) "
+          f"in {stats['seconds']}s; {stats['total_applicants']} applicants stored")
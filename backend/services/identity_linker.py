@@ -0,0 +1,255 @@
+"""
+Identity Linker Service
+Long-lived Splink linker for AI identity resolution against the Civil Registry.
+
+The civil registry is registered once as a table in a persistent DuckDB
+database, and the trained Splink model (u values estimated by random
+sampling over the registry, m values from configured priors) is saved
+next to it. Single-applicant lookups then only compare the applicant
+against registry rows sharing a blocking key, instead of building a new
+linker and predicting against every row on each call.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from core.logging import get_logger
+
+logger = get_logger("services.identity_linker")
+
+# Data paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+LINKAGE_DB_PATH = os.path.join(DATA_DIR, 'identity_linkage.duckdb')
+LINKAGE_MODEL_PATH = os.path.join(DATA_DIR, 'identity_linkage_model.json')
+
+REGISTRY_TABLE = 'civil_registry'
+META_TABLE = 'linkage_meta'
+
+# Name part similarity levels and their m priors (exact, >=0.92, >=0.8, else),
+# compared separately so a shared first name alone is not a match.
+# EM on a deduplicated registry has no true matches to learn m from.
+NAME_PART_THRESHOLDS = [0.92, 0.8]
+NAME_PART_M_PROBABILITIES = [0.85, 0.1, 0.04, 0.01]
+
+# Pairs sampled to estimate u. Splink salts the sampling join across all
+# CPUs above 1e4 pairs, which fails on single-core hosts.
+U_MAX_PAIRS = 1e6 if (os.cpu_count() or 1) > 1 else 1e4
+
+# Candidates below this weight are not returned by lookups
+MATCH_WEIGHT_THRESHOLD = -10
+
+
+def prepare_registry(df_civil: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linkage view of the civil registry: unique_id, lowercase name and the
+    first_name / surname blocking keys.
+    """
+    names = df_civil['name'] if 'name' in df_civil.columns else pd.Series(dtype=object)
+    ids = df_civil['unique_id'] if 'unique_id' in df_civil.columns else pd.Series(df_civil.index)
+
+    prepared = pd.DataFrame({
+        'unique_id': ids.astype(str).to_numpy(),
+        'name': names.where(names.notna(), None).astype(object).to_numpy(),
+    })
+    prepared = prepared[prepared['name'].map(lambda n: isinstance(n, str) and bool(n.strip()))]
+    prepared = prepared.drop_duplicates('unique_id').reset_index(drop=True)
+    return add_name_keys(prepared)
+
+
+def add_name_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds lowercase name, first_name and surname columns."""
+    df = df.copy()
+    df['name'] = df['name'].str.lower().str.split().str.join(' ')
+    tokens = df['name'].str.split()
+    df['first_name'] = tokens.str[0]
+    df['surname'] = tokens.map(lambda t: t[-1] if len(t) > 1 else None)
+    return df
+
+
+def registry_fingerprint(prepared: pd.DataFrame) -> str:
+    """Digest of the prepared registry, used to detect registry changes."""
+    hashes = pd.util.hash_pandas_object(prepared[['unique_id', 'name']], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def blocking_rules():
+    from splink import block_on
+    return [block_on("first_name"), block_on("surname"), block_on("substr(name, 1, 3)")]
+
+
+def linkage_settings(link_type: str, registry_size: int):
+    """
+    Splink settings shared by the online linker and the batch job.
+
+    The match prior assumes each record has at most one registry match.
+    """
+    from splink import SettingsCreator
+    import splink.comparison_library as cl
+
+    return SettingsCreator(
+        link_type=link_type,
+        probability_two_random_records_match=1 / max(registry_size, 2),
+        blocking_rules_to_generate_predictions=blocking_rules(),
+        comparisons=[
+            cl.JaroWinklerAtThresholds(column, NAME_PART_THRESHOLDS).configure(
+                m_probabilities=NAME_PART_M_PROBABILITIES
+            )
+            for column in ('first_name', 'surname')
+        ],
+    )
+
+
+class IdentityLinker:
+    """
+    Splink linker over a persistent DuckDB copy of the civil registry.
+
+    The registry table and model are rebuilt only when the registry's
+    fingerprint differs from the one stored in the database.
+    """
+
+    def __init__(self, df_civil: pd.DataFrame, db_path: str = LINKAGE_DB_PATH,
+                 model_path: str = LINKAGE_MODEL_PATH):
+        import duckdb
+        from splink import DuckDBAPI
+
+        self.db_path = db_path
+        self.model_path = model_path
+        self._lock = threading.Lock()
+
+        try:
+            self.con = duckdb.connect(db_path)
+        except duckdb.Error as e:
+            # Another process holds the file lock; keep working in memory
+            logger.warning(f"Linkage database unavailable ({e}), using in-memory database")
+            self.con = duckdb.connect()
+        self.con.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key VARCHAR PRIMARY KEY, value VARCHAR)")
+        self.db_api = DuckDBAPI(connection=self.con)
+
+        prepared = prepare_registry(df_civil)
+        self.registry_size = len(prepared)
+        self.fingerprint = fingerprint = registry_fingerprint(prepared)
+
+        if self._meta('registry_fingerprint') != fingerprint or not self._has_registry():
+            self._register_registry(prepared, fingerprint)
+            self.linker = self._train()
+        elif os.path.exists(model_path):
+            self.linker = self._linker(model_path)
+            logger.info(f"Loaded identity linkage model from {model_path}")
+        else:
+            self.linker = self._train()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.con.execute(f"SELECT value FROM {META_TABLE} WHERE key = ?", [key]).fetchone()
+        return row[0] if row else None
+
+    def _has_registry(self) -> bool:
+        tables = self.con.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_name = ?", [REGISTRY_TABLE]
+        ).fetchall()
+        return bool(tables)
+
+    def _register_registry(self, prepared: pd.DataFrame, fingerprint: str):
+        self.con.register('_registry_frame', prepared)
+        self.con.execute(f"CREATE OR REPLACE TABLE {REGISTRY_TABLE} AS SELECT * FROM _registry_frame")
+        self.con.unregister('_registry_frame')
+        self.con.execute(f"CREATE INDEX IF NOT EXISTS idx_{REGISTRY_TABLE}_uid ON {REGISTRY_TABLE}(unique_id)")
+        self.con.execute(
+            f"INSERT OR REPLACE INTO {META_TABLE} VALUES ('registry_fingerprint', ?)", [fingerprint]
+        )
+        logger.info(f"Registered {len(prepared)} citizens in linkage database")
+
+    def _settings(self):
+        return linkage_settings("dedupe_only", self.registry_size)
+
+    def _linker(self, settings):
+        from splink import Linker
+        return Linker(REGISTRY_TABLE, settings, self.db_api, set_up_basic_logging=False)
+
+    def _train(self):
+        """Estimate u values over the registry and save the model."""
+        linker = self._linker(self._settings())
+        linker.training.estimate_u_using_random_sampling(max_pairs=U_MAX_PAIRS, seed=42)
+        linker.misc.save_model_to_json(self.model_path, overwrite=True)
+        logger.info(f"Trained identity linkage model, saved to {self.model_path}")
+        return linker
+
+    def match(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Best registry match for an applicant name.
+
+        Returns:
+            Dict with unique_id, name and match_probability, or None when no
+            registry row shares a blocking key with the name
+        """
+        query = add_name_keys(pd.DataFrame([{'unique_id': '__applicant__', 'name': name}]))
+        if not query['name'].iloc[0]:
+            return None
+
+        with self._lock:
+            results = self.linker.inference.find_matches_to_new_records(
+                query,
+                blocking_rules=blocking_rules(),
+                match_weight_threshold=MATCH_WEIGHT_THRESHOLD,
+            )
+            try:
+                matches = results.as_pandas_dataframe()
+            finally:
+                results.drop_table_from_database_and_remove_from_cache()
+                self._drop_scratch_tables()
+
+        if matches.empty:
+            return None
+
+        best = matches.sort_values('match_probability', ascending=False, kind='stable').iloc[0]
+        return {
+            'unique_id': best['unique_id_l'],
+            'name': best['name_l'],
+            'match_probability': float(best['match_probability'])
+        }
+
+    def _drop_scratch_tables(self):
+        """Unregisters the per-query record frames Splink leaves behind."""
+        scratch = self.con.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_name LIKE '\\_\\_splink\\_\\_df\\_new\\_records%' ESCAPE '\\'"
+        ).fetchall()
+        for (table_name,) in scratch:
+            self.con.unregister(table_name)
+
+    def close(self):
+        self.con.close()
+
+
+# Singleton linker shared by scanner instances
+_identity_linker = None
+_identity_linker_lock = threading.Lock()
+
+def get_identity_linker(df_civil: pd.DataFrame) -> IdentityLinker:
+    global _identity_linker
+    if _identity_linker is None:
+        with _identity_linker_lock:
+            if _identity_linker is None:
+                _identity_linker = IdentityLinker(df_civil)
+    return _identity_linker
+
+
+def reset_identity_linker(fingerprint: Optional[str] = None):
+    """
+    Drops the shared linker unless it was built over the registry with this
+    fingerprint; the next get_identity_linker() builds one over the new
+    registry.
+    """
+    global _identity_linker
+    with _identity_linker_lock:
+        linker = _identity_linker
+        if linker is None or (fingerprint is not None and linker.fingerprint == fingerprint):
+            return
+        _identity_linker = None
+    with linker._lock:
+        linker.close()
+    logger.info("Civil registry changed, identity linker will be rebuilt")
@@ -7,48 +7,180 @@ For persistent storage, use routes/ledger.py which uses MongoDB.
 """
 
 import hashlib
-import json
+from collections.abc import Sequence
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 
 from core.logging import get_logger
+from services.block_codec import HASH_V1, HASH_V2, LEDGER_HASH_VERSION, hash_document, hash_v1, hash_v2
+from services.ledger_compact import CompactChain
 
 logger = get_logger("services.ledger")
 
 
+def hash_block(block: Dict[str, Any]) -> str:
+    """
+    Calculate SHA-256 hash of a stored block document.
+    
+    Uses the block's hash_version (see services.block_codec): v2 blocks hash
+    their binary encoding, v1 blocks the sorted JSON of every field except
+    the hash itself and MongoDB's _id. A block that cannot be encoded
+    (a mangled field) hashes to "" so it never matches.
+    """
+    try:
+        return hash_document(block)
+    except (KeyError, TypeError, ValueError):
+        return ""
+
+
+def seal_block(block: Dict[str, Any], version: int = LEDGER_HASH_VERSION) -> Dict[str, Any]:
+    """
+    Stamps a new block with the hash version and its hash.
+    
+    Raises ValueError if the block cannot be encoded (e.g. a v2 quantity
+    that is not a whole number of thousandths) rather than sealing it
+    with an empty hash.
+    """
+    block.pop("hash", None)
+    if version == HASH_V2:
+        block["hash_version"] = HASH_V2
+    else:
+        block.pop("hash_version", None)
+    block["hash"] = hash_document(block)
+    return block
+
+
+def utc_timestamp(value: str) -> str:
+    """
+    ISO 8601 timestamp normalized like stored block timestamps: converted
+    to UTC (naive means UTC) and formatted with isoformat(). Raises
+    ValueError if value is not an ISO timestamp string.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Not an ISO 8601 timestamp: {value!r}")
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+# Merkle trees over block hashes. Leaves and internal nodes are hashed with
+# distinct prefixes so a leaf can never be passed off as a node; an odd node
+# at the end of a level is promoted to the next level unchanged.
+
+def merkle_leaf(block_hash: str) -> bytes:
+    """Leaf digest for a block's hex hash."""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(block_hash)).digest()
+
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    """Parent digest of two child digests."""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    All levels of the Merkle tree over leaves.
+
+    Returns:
+        levels[0] is the leaves, levels[-1] is [root]
+    """
+    if not leaves:
+        return [[]]
+
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [merkle_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_proof(levels: List[List[bytes]], position: int) -> List[Dict[str, str]]:
+    """
+    Inclusion proof for the leaf at position: the sibling digest at each
+    level, bottom-up, and which side it sits on. Levels where the node is
+    promoted without a sibling are skipped.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append({
+                "hash": level[sibling].hex(),
+                "side": "left" if sibling < position else "right"
+            })
+        position //= 2
+    return proof
+
+
+def verify_inclusion_proof(block_hash: str, proof: List[Dict[str, str]], root: str) -> bool:
+    """
+    Check offline that a block hash is included under a checkpoint's Merkle root.
+
+    Args:
+        block_hash: Hex hash of the block (recompute it from the block's
+            contents with hash_block to also check they are unmodified)
+        proof: Sibling list from merkle_proof / GET /api/ledger/proof
+        root: Hex Merkle root of the checkpoint
+
+    Returns:
+        True if the proof folds the block hash up to root
+    """
+    try:
+        digest = merkle_leaf(block_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["side"] == "left":
+                digest = merkle_node(sibling, digest)
+            elif step["side"] == "right":
+                digest = merkle_node(digest, sibling)
+            else:
+                return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    return digest.hex() == root
+
+
 class Block:
     """Represents a single block in the chain."""
     
+    __slots__ = ("index", "timestamp", "transaction", "previous_hash", "added_by", "hash_version", "hash")
+    
     def __init__(
         self,
         index: int,
         transaction: Dict[str, Any],
         previous_hash: str,
         timestamp: Optional[str] = None,
-        added_by: Optional[str] = None
+        added_by: Optional[str] = None,
+        hash_version: int = LEDGER_HASH_VERSION
     ):
         self.index = index
         self.timestamp = timestamp or datetime.now(timezone.utc).isoformat()
         self.transaction = transaction
         self.previous_hash = previous_hash
         self.added_by = added_by
+        self.hash_version = hash_version
         self.hash = self.calculate_hash()
     
     def calculate_hash(self) -> str:
-        """Calculate SHA-256 hash of block contents."""
-        block_data = {
+        """Calculate SHA-256 hash of block contents (same as hash_block(self.to_dict()))."""
+        if self.hash_version == HASH_V2:
+            return hash_v2(self.index, self.timestamp, self.transaction, self.previous_hash, self.added_by)
+        return hash_v1({
             "index": self.index,
             "timestamp": self.timestamp,
             "transaction": self.transaction,
             "previous_hash": self.previous_hash,
             "added_by": self.added_by
-        }
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        })
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert block to dictionary."""
-        return {
+        block = {
             "index": self.index,
             "timestamp": self.timestamp,
             "transaction": self.transaction,
@@ -56,19 +188,107 @@ class Block:
             "hash": self.hash,
             "added_by": self.added_by
         }
+        if self.hash_version != HASH_V1:
+            block["hash_version"] = self.hash_version
+        return block
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Block":
+        """Block from a to_dict()/stored document, keeping its stored hash."""
+        block = cls.__new__(cls)
+        block.index = data["index"]
+        block.timestamp = data["timestamp"]
+        block.transaction = data["transaction"]
+        block.previous_hash = data["previous_hash"]
+        block.added_by = data.get("added_by")
+        block.hash_version = data.get("hash_version", HASH_V1)
+        block.hash = data["hash"]
+        return block
+
+
+class ChainView(Sequence):
+    """
+    Read-only list of a LedgerChain's blocks, each materialized on access.
+    
+    Item assignment raises TypeError. Every access returns a new Block
+    copy, so editing one (e.g. chain[i].transaction["quantity"] = ...)
+    does not change the stored chain; use LedgerChain.simulate_tamper().
+    """
+    
+    def __init__(self, store: CompactChain):
+        self._store = store
+    
+    def __len__(self) -> int:
+        return len(self._store)
+    
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("block index out of range")
+        return Block.from_dict(self._store.block_dict(position))
 
 
 class LedgerChain:
     """
     In-memory blockchain implementation for PDS transactions.
     
+    Blocks are stored column-wise in a CompactChain (integer timestamps,
+    interned IDs, raw digests); chain, get_latest_block() and get_ledger()
+    materialize Block objects / dicts only when asked for.
+    
+    chain used to be a plain list of Blocks that callers could edit in
+    place. It is now a read-only ChainView of copies: assigning to chain
+    or chain[i] raises, and edits to a returned Block are not stored.
+    
+    With a path, blocks are persisted in an append-only memory-mapped
+    segment log (services.ledger_store) and an existing chain there is
+    reopened; call flush() or close() to make the last appends durable.
+    
     Note: For production, use MongoDB persistence via routes/ledger.py
     This class is provided for utility operations and testing.
     """
     
-    def __init__(self):
-        self.chain: List[Block] = []
-        self._create_genesis_block()
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            from services.ledger_store import SegmentLog
+            self._store = SegmentLog(path)
+        else:
+            self._store = CompactChain()
+        if len(self._store) == 0:
+            self._create_genesis_block()
+    
+    def __enter__(self) -> "LedgerChain":
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def flush(self):
+        """Write buffered blocks to disk (persistent chains only)."""
+        if self.path:
+            self._store.flush()
+    
+    def close(self):
+        if self.path:
+            self._store.close()
+    
+    @property
+    def chain(self) -> ChainView:
+        """Blocks in index order (read-only; items are materialized copies, see ChainView)."""
+        return ChainView(self._store)
+    
+    def __len__(self) -> int:
+        return len(self._store)
+    
+    def _append(self, block: Block):
+        self._store.append(
+            block.timestamp, block.transaction, block.previous_hash,
+            block.added_by, block.hash_version, block.hash
+        )
     
     def _create_genesis_block(self):
         """Create the initial genesis block."""
@@ -85,7 +305,7 @@ class LedgerChain:
             previous_hash="0" * 64,
             added_by="SYSTEM"
         )
-        self.chain.append(genesis)
+        self._append(genesis)
         logger.info("Genesis block created")
     
     def get_latest_block(self) -> Block:
@@ -115,7 +335,7 @@ class LedgerChain:
         Returns:
             The newly created block
         """
-        previous_block = self.get_latest_block()
+        store = self._store
         
         transaction = {
             "shop_id": shop_id,
@@ -126,13 +346,13 @@ class LedgerChain:
         }
         
         new_block = Block(
-            index=len(self.chain),
+            index=len(store),
             transaction=transaction,
-            previous_hash=previous_block.hash,
+            previous_hash=store.hash_bytes(len(store) - 1).hex(),
             added_by=added_by
         )
         
-        self.chain.append(new_block)
+        self._append(new_block)
         logger.info(f"Block #{new_block.index} added - {item} ({quantity}kg)")
         
         return new_block
@@ -141,15 +361,17 @@ class LedgerChain:
         """
         Verify the integrity of the entire blockchain.
         
+        Runs over the stored columns (or the mapped segment log) without
+        materializing blocks.
+        
         Returns:
             Dict with verification status and details
         """
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i - 1]
-            
+        store = self._store
+        
+        for i in range(1, len(store)):
             # Check if previous hash reference is correct
-            if current.previous_hash != previous.hash:
+            if store.previous_hash_bytes(i) != store.hash_bytes(i - 1):
                 return {
                     "is_valid": False,
                     "status": "COMPROMISED",
@@ -158,7 +380,7 @@ class LedgerChain:
                 }
             
             # Verify current block's hash
-            if current.hash != current.calculate_hash():
+            if store.recompute_hash(i) != store.hash_bytes(i).hex():
                 return {
                     "is_valid": False,
                     "status": "COMPROMISED",
@@ -170,12 +392,12 @@ class LedgerChain:
             "is_valid": True,
             "status": "SAFE",
             "message": "Blockchain integrity verified",
-            "total_blocks": len(self.chain)
+            "total_blocks": len(store)
         }
     
     def get_ledger(self) -> List[Dict[str, Any]]:
         """Get all blocks as dictionaries."""
-        return [block.to_dict() for block in self.chain]
+        return [self._store.block_dict(i) for i in range(len(self._store))]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get ledger statistics."""
@@ -183,9 +405,10 @@ class LedgerChain:
         items: Dict[str, Dict[str, float]] = {}
         unique_shops = set()
         unique_beneficiaries = set()
+        store = self._store
         
-        for block in self.chain[1:]:  # Skip genesis
-            tx = block.transaction
+        for i in range(1, len(store)):  # Skip genesis
+            tx = store.transaction(i)
             item = tx.get("item", "Unknown")
             quantity = tx.get("quantity", 0)
             
@@ -199,8 +422,8 @@ class LedgerChain:
             unique_beneficiaries.add(tx.get("beneficiary_id", ""))
         
         return {
-            "total_blocks": len(self.chain),
-            "total_transactions": len(self.chain) - 1,
+            "total_blocks": len(store),
+            "total_transactions": len(store) - 1,
             "unique_shops": len(unique_shops),
             "unique_beneficiaries": len(unique_beneficiaries),
             "items": [
@@ -208,6 +431,10 @@ class LedgerChain:
             ]
         }
     
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the stored blocks."""
+        return self._store.memory_bytes()
+    
     def simulate_tamper(self, block_index: Optional[int] = None) -> Dict[str, Any]:
         """
         Simulate tampering for demonstration.
@@ -220,18 +447,18 @@ class LedgerChain:
         """
         import random
         
-        if len(self.chain) < 2:
+        if len(self._store) < 2:
             return {"success": False, "message": "No blocks to tamper"}
         
         if block_index is None:
-            block_index = random.randint(1, len(self.chain) - 1)
+            block_index = random.randint(1, len(self._store) - 1)
         
-        if block_index < 1 or block_index >= len(self.chain):
+        if block_index < 1 or block_index >= len(self._store):
             return {"success": False, "message": "Invalid block index"}
         
         # Modify the transaction
-        original_quantity = self.chain[block_index].transaction.get("quantity", 0)
-        self.chain[block_index].transaction["quantity"] = original_quantity + 100
+        original_quantity = self._store.transaction(block_index).get("quantity", 0)
+        self._store.set_quantity(block_index, original_quantity + 100)
         
         logger.warning(f"DEMO: Tampered block #{block_index}")
         
@@ -243,6 +470,9 @@ class LedgerChain:
     
     def reset(self):
         """Reset blockchain to genesis state."""
-        self.chain = []
+        if self.path:
+            self._store.clear()
+        else:
+            self._store = CompactChain()
         self._create_genesis_block()
         logger.info("Ledger reset to genesis state")
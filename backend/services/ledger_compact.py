@@ -0,0 +1,254 @@
+"""
+Compact Ledger Storage
+Column arrays backing the in-memory LedgerChain.
+
+A Block object per disbursement (a transaction dict, an ISO timestamp
+string and two 64-character hex hashes) costs around a kilobyte, which
+does not scale to offline replays of millions of blocks. CompactChain
+stores one row per block in typed arrays instead:
+
+- timestamps as int64 microseconds since the epoch
+- shop, dealer, beneficiary, item and added_by as int32 codes into a
+  shared string table (each distinct ID is stored once)
+- quantity as float64, plus a flag for integer quantities (v1 JSON hashes
+  tell 0 from 0.0)
+- hash and previous hash as raw 32-byte digests
+
+Rows are materialized as dicts only on demand. A block that does not fit
+this layout (extra transaction fields, a timestamp that does not
+round-trip, non-string IDs) is kept whole in an overrides map so that it
+still hashes identically.
+"""
+
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from services.block_codec import HASH_V1, HASH_V2, hash_v1, hash_v2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+TRANSACTION_FIELDS = ("shop_id", "dealer_id", "beneficiary_id", "item", "quantity")
+ID_COLUMNS = ("shop_id", "dealer_id", "beneficiary_id", "item")
+DIGEST_SIZE = 32
+NONE_CODE = -1
+
+
+class StringTable:
+    """Interned strings with int codes (None is NONE_CODE)."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE_CODE
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        return None if code == NONE_CODE else self.values[code]
+
+
+def timestamp_micros(timestamp: str) -> Optional[int]:
+    """Microseconds since the epoch, if the ISO string round-trips exactly."""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if parsed.utcoffset() != timedelta(0):
+        return None
+    delta = parsed - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return micros if micros_timestamp(micros) == timestamp else None
+
+
+def micros_timestamp(micros: int) -> str:
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _fits(transaction: Dict[str, Any], timestamp: str, added_by, hash_version: int) -> bool:
+    return (
+        hash_version in (HASH_V1, HASH_V2)
+        and set(transaction) == set(TRANSACTION_FIELDS)
+        and all(isinstance(transaction[column], str) for column in ID_COLUMNS)
+        and isinstance(transaction["quantity"], (int, float))
+        and not isinstance(transaction["quantity"], bool)
+        and (isinstance(transaction["quantity"], float) or abs(transaction["quantity"]) < 2 ** 53)
+        and (added_by is None or isinstance(added_by, str))
+        and timestamp_micros(timestamp) is not None
+    )
+
+
+def encode_columns(strings: StringTable, timestamp: str, transaction: Dict[str, Any],
+                   added_by: Optional[str], hash_version: int) -> Optional[tuple]:
+    """
+    (micros, shop, dealer, beneficiary, item, added_by, quantity,
+    integer_quantity) for a block, or None if it needs an override.
+    """
+    if not _fits(transaction, timestamp, added_by, hash_version):
+        return None
+    return (
+        timestamp_micros(timestamp),
+        *(strings.code(transaction[column]) for column in ID_COLUMNS),
+        strings.code(added_by),
+        float(transaction["quantity"]),
+        isinstance(transaction["quantity"], int)
+    )
+
+
+class BlockRows:
+    """
+    Block accessors shared by the column stores; row i is block index i.
+
+    Subclasses provide __len__, strings (value(code)), overrides
+    (row -> timestamp/transaction/added_by dict), columns(row) (as
+    returned by encode_columns), hash_version(row), hash_bytes(row) and
+    previous_hash_bytes(row).
+    """
+
+    overrides: Dict[int, Dict[str, Any]]
+
+    def fields(self, row: int):
+        """(timestamp, transaction, added_by) of a row."""
+        override = self.overrides.get(row)
+        if override:
+            return override["timestamp"], dict(override["transaction"]), override["added_by"]
+
+        micros, shop, dealer, beneficiary, item, added_by, quantity, integer = self.columns(row)
+        value = self.strings.value
+        transaction = {
+            "shop_id": value(shop),
+            "dealer_id": value(dealer),
+            "beneficiary_id": value(beneficiary),
+            "item": value(item),
+            "quantity": int(quantity) if integer else quantity
+        }
+        return micros_timestamp(micros), transaction, value(added_by)
+
+    def transaction(self, row: int) -> Dict[str, Any]:
+        return self.fields(row)[1]
+
+    def block_dict(self, row: int) -> Dict[str, Any]:
+        """The block as Block.to_dict() would return it."""
+        timestamp, transaction, added_by = self.fields(row)
+        block = {
+            "index": row,
+            "timestamp": timestamp,
+            "transaction": transaction,
+            "previous_hash": self.previous_hash_bytes(row).hex(),
+            "hash": self.hash_bytes(row).hex(),
+            "added_by": added_by
+        }
+        version = self.hash_version(row)
+        if version != HASH_V1:
+            block["hash_version"] = version
+        return block
+
+    def recompute_hash(self, row: int) -> str:
+        """
+        Hash of a row's contents, without materializing a Block; "" if the
+        contents cannot be encoded (like services.ledger.hash_block).
+        """
+        timestamp, transaction, added_by = self.fields(row)
+        previous_hash = self.previous_hash_bytes(row).hex()
+        if self.hash_version(row) == HASH_V2:
+            try:
+                return hash_v2(row, timestamp, transaction, previous_hash, added_by)
+            except ValueError:
+                return ""
+        return hash_v1({
+            "index": row,
+            "timestamp": timestamp,
+            "transaction": transaction,
+            "previous_hash": previous_hash,
+            "added_by": added_by
+        })
+
+
+class CompactChain(BlockRows):
+    """
+    In-memory column store of ledger blocks.
+
+    - append(...): add a block
+    - block_dict(i): the block as Block.to_dict() would return it
+    - hash_bytes(i) / previous_hash_bytes(i): raw digests
+    - recompute_hash(i): hash of row i's contents, without materializing it
+    """
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.timestamps = array('q')
+        self.id_codes = {column: array('i') for column in ID_COLUMNS}
+        self.added_by = array('i')
+        self.quantities = array('d')
+        self.integer_quantity = bytearray()
+        self.hash_versions = bytearray()
+        self.hashes = bytearray()
+        self.previous_hashes = bytearray()
+        self.overrides: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: str, transaction: Dict[str, Any], previous_hash: str,
+               added_by: Optional[str], hash_version: int, block_hash: str):
+        row = len(self)
+        columns = encode_columns(self.strings, timestamp, transaction, added_by, hash_version)
+        if columns is None:
+            self.overrides[row] = {
+                "timestamp": timestamp, "transaction": dict(transaction), "added_by": added_by
+            }
+            columns = (0, NONE_CODE, NONE_CODE, NONE_CODE, NONE_CODE, NONE_CODE, 0.0, False)
+
+        micros, *codes, added_by_code, quantity, integer = columns
+        self.timestamps.append(micros)
+        for column, code in zip(ID_COLUMNS, codes):
+            self.id_codes[column].append(code)
+        self.added_by.append(added_by_code)
+        self.quantities.append(quantity)
+        self.integer_quantity.append(integer)
+        self.hash_versions.append(hash_version)
+        self.hashes += bytes.fromhex(block_hash)
+        self.previous_hashes += bytes.fromhex(previous_hash)
+
+    def columns(self, row: int) -> tuple:
+        return (
+            self.timestamps[row],
+            *(self.id_codes[column][row] for column in ID_COLUMNS),
+            self.added_by[row],
+            self.quantities[row],
+            self.integer_quantity[row]
+        )
+
+    def hash_version(self, row: int) -> int:
+        return self.hash_versions[row]
+
+    def hash_bytes(self, row: int) -> bytes:
+        return bytes(self.hashes[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE])
+
+    def previous_hash_bytes(self, row: int) -> bytes:
+        return bytes(self.previous_hashes[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE])
+
+    def set_quantity(self, row: int, quantity):
+        override = self.overrides.get(row)
+        if override:
+            override["transaction"]["quantity"] = quantity
+        else:
+            self.quantities[row] = float(quantity)
+            self.integer_quantity[row] = isinstance(quantity, int)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the columns and the string table."""
+        columns = [self.timestamps, self.added_by, self.quantities, *self.id_codes.values()]
+        total = sum(column.itemsize * len(column) for column in columns)
+        total += len(self.integer_quantity) + len(self.hash_versions) + len(self.hashes) + len(self.previous_hashes)
+        total += sum(sys.getsizeof(value) for value in self.strings.values)
+        return total
@@ -0,0 +1,244 @@
+"""
+Bulk PDS Ledger Import
+Loads historical fair-price-shop disbursements into the ledger in bulk.
+
+Records are streamed from a CSV or NDJSON file, chained onto the tip in a
+tight loop and written with large ordered insert_many batches through the
+ledger writer, so live appends interleave between batches without
+forking the chain. Each import's blocks are added_by "import:<import_id>"
+and its progress is stored in pds_ledger_imports after every batch; a
+resumed import counts its committed blocks on the chain and skips that
+many records, so an interruption (even mid-batch) never duplicates or
+drops a record.
+
+Usage:
+    python -m services.ledger_import disbursements.csv
+    python -m services.ledger_import disbursements.ndjson --import-id <id>   # resume
+"""
+
+import csv
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from core.exceptions import ValidationError
+from core.logging import get_logger
+from services.block_codec import check_quantity
+from services.ledger import utc_timestamp
+from services.ledger_writer import LedgerWriter
+
+logger = get_logger("services.ledger_import")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTS_DIR = os.path.join(BASE_DIR, 'data', 'ledger_imports')
+
+# Blocks per insert_many
+IMPORT_BATCH_SIZE = 5000
+
+# Largest accepted upload (POST /api/ledger/import)
+MAX_IMPORT_BYTES = int(os.environ.get("LEDGER_IMPORT_MAX_BYTES", 256 * 1024 * 1024))
+
+FORMATS = ('csv', 'ndjson')
+TRANSACTION_FIELDS = ('shop_id', 'dealer_id', 'beneficiary_id', 'item', 'quantity')
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    raise ValidationError(f"Cannot tell the format of {os.path.basename(path)}; use .csv or .ndjson")
+
+
+def read_records(path: str, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(record number, raw record) pairs, streamed from the file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                yield number, row
+        else:
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValidationError(f"Record {number}: invalid JSON ({e})")
+
+
+def to_entry(number: int, record: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Ledger transaction and original timestamp (normalized to UTC) of one record."""
+    missing = [field for field in TRANSACTION_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValidationError(f"Record {number}: missing {', '.join(missing)}")
+    try:
+        quantity = float(record['quantity'])
+    except (TypeError, ValueError):
+        raise ValidationError(f"Record {number}: quantity must be a number")
+    try:
+        check_quantity(quantity)
+    except ValueError:
+        raise ValidationError(f"Record {number}: quantity must be a whole number of thousandths")
+
+    timestamp = record.get('timestamp')
+    if timestamp in (None, ''):
+        timestamp = None
+    else:
+        try:
+            # Normalized before hashing: the stored string is sealed into the block
+            timestamp = utc_timestamp(timestamp)
+        except ValueError:
+            raise ValidationError(f"Record {number}: invalid timestamp")
+
+    transaction = {
+        "shop_id": str(record['shop_id']),
+        "dealer_id": str(record['dealer_id']),
+        "beneficiary_id": str(record['beneficiary_id']),
+        "item": str(record['item']),
+        "quantity": quantity
+    }
+    return transaction, timestamp
+
+
+def upload_path(import_id: str, fmt: str) -> str:
+    """Where an uploaded import file is kept, so the import can be resumed."""
+    return os.path.join(IMPORTS_DIR, f"{import_id}.{fmt}")
+
+
+def new_import_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def import_marker(import_id: str) -> str:
+    return f"import:{import_id}"
+
+
+async def _committed_records(ledger, progress: Dict[str, Any]) -> int:
+    """Records of this import on the chain, including any written after the last progress update."""
+    last_index = progress.get("last_index")
+    unrecorded = await ledger.count_documents({
+        "index": {"$gt": last_index if last_index is not None else -1},
+        "added_by": import_marker(progress["import_id"])
+    })
+    return progress.get("records_committed", 0) + unrecorded
+
+
+async def import_ledger(path: str, fmt: Optional[str] = None, import_id: Optional[str] = None,
+                        imported_by: str = "SYSTEM", writer: Optional[LedgerWriter] = None,
+                        imports=None, batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Import (or resume importing) a file of transactions.
+
+    Args:
+        path: CSV or NDJSON file with shop_id, dealer_id, beneficiary_id,
+            item, quantity and an optional timestamp per record
+        fmt: 'csv' or 'ndjson' (from the extension if None)
+        import_id: Existing import to resume; a new one is started if None
+        imported_by: User recorded on the import
+        writer: Ledger writer (the PDS ledger's by default)
+        imports: Progress collection (pds_ledger_imports by default)
+        batch_size: Blocks per insert_many
+
+    Returns:
+        The import's progress document
+    """
+    if writer is None:
+        from services.ledger_writer import get_ledger_writer
+        writer = get_ledger_writer()
+    if imports is None:
+        from core.database import get_pds_ledger_imports_collection
+        imports = get_pds_ledger_imports_collection()
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValidationError(f"Unsupported import format: {fmt}")
+
+    import_id = import_id or new_import_id()
+    progress = await imports.find_one({"import_id": import_id}, {"_id": 0})
+    if progress is None:
+        progress = {
+            "import_id": import_id,
+            "source": os.path.basename(path),
+            "format": fmt,
+            "status": "running",
+            "records_committed": 0,
+            "first_index": None,
+            "last_index": None,
+            "last_hash": None,
+            "imported_by": imported_by,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "updated_at": None,
+            "error": None
+        }
+        await imports.insert_one(dict(progress))
+    elif progress["status"] == "completed":
+        return progress
+    progress["status"] = "running"
+
+    async with writer.lock:
+        committed = await _committed_records(writer.collection, progress)
+    logger.info(f"Import {import_id}: starting at record {committed + 1} of {progress['source']}")
+
+    marker = import_marker(import_id)
+    records = islice(read_records(path, fmt), committed, None)
+    try:
+        while True:
+            batch = [to_entry(number, record) for number, record in islice(records, batch_size)]
+            if not batch:
+                break
+
+            written = []
+            try:
+                async with writer.lock:
+                    await writer.commit(
+                        [(transaction, marker, timestamp) for transaction, timestamp in batch], written
+                    )
+            finally:
+                if written:
+                    progress["records_committed"] = committed = committed + len(written)
+                    progress["first_index"] = progress["first_index"] if progress["first_index"] is not None else written[0]["index"]
+                    progress["last_index"] = written[-1]["index"]
+                    progress["last_hash"] = written[-1]["hash"]
+                    progress["updated_at"] = datetime.now(timezone.utc).isoformat()
+                    await imports.update_one({"import_id": import_id}, {"$set": progress})
+
+        progress.update(status="completed", error=None, updated_at=datetime.now(timezone.utc).isoformat())
+        logger.info(f"Import {import_id}: {committed} records committed, chain at #{progress['last_index']}")
+    except Exception as e:
+        progress.update(status="failed", error=str(e), updated_at=datetime.now(timezone.utc).isoformat())
+        logger.error(f"Import {import_id} stopped after {committed} records: {e}")
+        raise
+    finally:
+        await imports.update_one({"import_id": import_id}, {"$set": progress})
+
+    return progress
+
+
+if __name__ == '__main__':
+    import argparse
+    import asyncio
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Bulk import historical PDS transactions into the ledger")
+    parser.add_argument('path', help="CSV or NDJSON file of transactions")
+    parser.add_argument('--format', choices=FORMATS, help="File format (default: from the extension)")
+    parser.add_argument('--import-id', help="Resume this import")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    load_dotenv(Path(BASE_DIR) / '.env')
+    from core.database import init_database
+    init_database()
+
+    result = asyncio.run(import_ledger(
+        args.path, fmt=args.format, import_id=args.import_id, batch_size=args.batch_size
+    ))
+    print(f"Import {result['import_id']} {result['status']}: {result['records_committed']} records, "
+          f"blocks #{result['first_index']}-#{result['last_index']}")
@@ -0,0 +1,380 @@
+"""
+Ledger Merkle Checkpoints
+Signed checkpoints that let /verify skip already-verified ledger segments.
+
+Every CHECKPOINT_INTERVAL blocks form a segment. Once a segment has been
+verified, a checkpoint is stored with the Merkle tree over its block
+hashes, the hash of its last block and an HMAC signature. The latest
+checkpoint's end index is the "verified up to" watermark: /verify only
+streams blocks after it, linked to the checkpoint's tip hash.
+
+Old segments are re-checked against their roots by a background audit.
+When a segment's recomputed root differs, the stored tree is bisected
+top-down (only subtrees whose digests differ are descended into) to find
+the tampered blocks. A segment known to have changed (simulate-tamper) is
+marked audit_pending and re-audited by the next /verify instead of
+waiting for the background audit; /verify also reports when the
+checkpointed segments were last audited.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.logging import get_logger
+from services.ledger import hash_block, merkle_leaf, merkle_levels, merkle_proof
+from services.ledger_verifier import verify_chain_stream
+
+logger = get_logger("services.ledger_merkle")
+
+CHECKPOINT_INTERVAL = int(os.environ.get("LEDGER_CHECKPOINT_INTERVAL", 1000))
+AUDIT_INTERVAL_SECONDS = int(os.environ.get("LEDGER_AUDIT_INTERVAL", 3600))
+
+DIGEST_SIZE = 32
+
+
+def _signing_key() -> bytes:
+    secret = os.environ.get("LEDGER_CHECKPOINT_SECRET")
+    if not secret:
+        from core.auth import get_jwt_secret
+        secret = get_jwt_secret()
+    return secret.encode()
+
+
+def _signed_payload(checkpoint: Dict[str, Any]) -> bytes:
+    return "|".join(str(checkpoint[key]) for key in (
+        "segment", "start_index", "end_index", "merkle_root", "tip_hash", "signed_by"
+    )).encode()
+
+
+def sign_checkpoint(checkpoint: Dict[str, Any]) -> str:
+    return hmac.new(_signing_key(), _signed_payload(checkpoint), hashlib.sha256).hexdigest()
+
+
+def checkpoint_signature_valid(checkpoint: Dict[str, Any]) -> bool:
+    try:
+        return hmac.compare_digest(checkpoint.get("signature", ""), sign_checkpoint(checkpoint))
+    except (KeyError, ValueError):
+        return False
+
+
+def pack_levels(levels: List[List[bytes]]) -> List[bytes]:
+    """Tree levels as one concatenated byte string per level (BSON binary)."""
+    return [b"".join(level) for level in levels]
+
+
+def unpack_levels(packed: List[bytes]) -> List[List[bytes]]:
+    return [
+        [bytes(level[i:i + DIGEST_SIZE]) for i in range(0, len(level), DIGEST_SIZE)]
+        for level in packed
+    ]
+
+
+def localize_mismatches(stored: List[List[bytes]], current: List[List[bytes]]) -> List[int]:
+    """
+    Leaf positions whose digests differ, found by bisecting from the root.
+
+    Both trees must have the same number of leaves.
+    """
+    mismatched = []
+    top = len(stored) - 1
+    stack = [(top, 0)]
+    while stack:
+        level, position = stack.pop()
+        if stored[level][position] == current[level][position]:
+            continue
+        if level == 0:
+            mismatched.append(position)
+            continue
+        for child in (2 * position + 1, 2 * position):
+            if child < len(stored[level - 1]):
+                stack.append((level - 1, child))
+    return sorted(mismatched)
+
+
+def segment_bounds(segment: int) -> tuple:
+    start = segment * CHECKPOINT_INTERVAL
+    return start, start + CHECKPOINT_INTERVAL - 1
+
+
+_indexed_collections = set()
+
+
+async def ensure_checkpoint_indexes(checkpoints):
+    """
+    Indexes behind the per-verify lookups (latest segment, pending and
+    compromised segments, oldest audit), so none of them scans every
+    checkpoint.
+    """
+    if checkpoints.full_name in _indexed_collections:
+        return
+    await checkpoints.create_index("segment", unique=True)
+    await checkpoints.create_index([("audited_at", 1), ("segment", 1)])
+    await checkpoints.create_index("audit_status")
+    await checkpoints.create_index("audit_pending")
+    _indexed_collections.add(checkpoints.full_name)
+
+
+async def latest_checkpoint(checkpoints) -> Optional[Dict[str, Any]]:
+    return await checkpoints.find_one({}, {"_id": 0, "levels": 0}, sort=[("segment", -1)])
+
+
+async def create_checkpoints(ledger, checkpoints, signed_by: str = "SYSTEM") -> List[Dict[str, Any]]:
+    """
+    Checkpoint every complete segment after the current watermark.
+
+    Callers must have verified those blocks first.
+
+    Returns:
+        The new checkpoints (without their trees)
+    """
+    latest = await latest_checkpoint(checkpoints)
+    segment = latest["segment"] + 1 if latest else 0
+    created = []
+
+    while True:
+        start, end = segment_bounds(segment)
+        blocks = await ledger.find(
+            {"index": {"$gte": start, "$lte": end}}, {"_id": 0, "index": 1, "hash": 1}
+        ).sort("index", 1).to_list(CHECKPOINT_INTERVAL)
+        if len(blocks) < CHECKPOINT_INTERVAL:
+            break
+
+        levels = merkle_levels([merkle_leaf(block["hash"]) for block in blocks])
+        created_at = datetime.now(timezone.utc).isoformat()
+        checkpoint = {
+            "segment": segment,
+            "start_index": start,
+            "end_index": end,
+            "merkle_root": levels[-1][0].hex(),
+            "tip_hash": blocks[-1]["hash"],
+            "signed_by": signed_by,
+            "created_at": created_at,
+            "audit_status": "SAFE",
+            "tampered_blocks": [],
+            "audited_at": created_at  # Verified just before checkpointing
+        }
+        checkpoint["signature"] = sign_checkpoint(checkpoint)
+        await checkpoints.insert_one({**checkpoint, "levels": pack_levels(levels)})
+
+        created.append(checkpoint)
+        segment += 1
+
+    if created:
+        logger.info(f"Created {len(created)} ledger checkpoints, watermark now #{created[-1]['end_index']}")
+    return created
+
+
+async def verify_incremental(ledger, checkpoints, signed_by: str = "SYSTEM") -> Dict[str, Any]:
+    """
+    Verify only blocks after the latest trusted checkpoint, then checkpoint
+    any newly completed segments.
+
+    Falls back to a full verification when there is no checkpoint or the
+    latest one's signature does not check out. Segments marked
+    audit_pending are re-audited first, and segments an audit found
+    tampered are reported as well. Other checkpointed segments are not
+    rechecked; last_audit_at says since when they are covered.
+
+    Apart from the blocks after the watermark, only indexed lookups are
+    made (latest checkpoint, pending and compromised segments, oldest
+    audit), so the cost does not grow with the number of checkpoints.
+    """
+    await ensure_checkpoint_indexes(checkpoints)
+    latest = await latest_checkpoint(checkpoints)
+    if latest is not None and not checkpoint_signature_valid(latest):
+        logger.warning(f"Checkpoint for segment {latest['segment']} has an invalid signature, verifying full chain")
+        latest = None
+
+    if latest is None:
+        result = await verify_chain_stream(ledger)
+    else:
+        result = await verify_chain_stream(
+            ledger, after_index=latest["end_index"], previous_hash=latest["tip_hash"]
+        )
+    result["verified_from_index"] = latest["end_index"] + 1 if latest else 0
+
+    created = []
+    if result["is_valid"]:
+        created = await create_checkpoints(ledger, checkpoints, signed_by)
+
+    # Segments marked as changed are re-audited now rather than by the background audit
+    pending = await checkpoints.find({"audit_pending": True}, {"_id": 0}).sort("segment", 1).to_list(None)
+    for checkpoint in pending:
+        await _audit_and_record(ledger, checkpoints, checkpoint)
+
+    # Tampering found in checkpointed segments by the audit
+    audited = await checkpoints.find(
+        {"audit_status": "COMPROMISED"}, {"_id": 0, "tampered_blocks": 1}
+    ).to_list(None)
+    old_tampered = sorted({index for doc in audited for index in doc.get("tampered_blocks", [])})
+    if old_tampered:
+        result["tampered_blocks"] = sorted(set(result["tampered_blocks"]) | set(old_tampered))
+        result["is_valid"] = False
+        result["status"] = "COMPROMISED"
+        result["first_invalid"] = min(old_tampered + ([result["first_invalid"]] if result["first_invalid"] is not None else []))
+
+    watermark = created[-1] if created else latest
+    result["watermark"] = watermark["end_index"] if watermark else None
+    result["checkpoints_created"] = len(created)
+    result["segments_rechecked"] = len(pending)
+    result["last_audit_at"] = await last_audit_at(checkpoints)
+    return result
+
+
+async def last_audit_at(checkpoints) -> Optional[str]:
+    """
+    Time since which every checkpointed segment has been checked: the
+    oldest of the segments' last audits (creation counts as one).
+    """
+    oldest = await checkpoints.find_one(
+        {}, {"_id": 0, "audited_at": 1, "created_at": 1}, sort=[("audited_at", 1), ("segment", 1)]
+    )
+    if oldest is None:
+        return None
+    # Checkpoints from before audited_at was set on creation sort first
+    return oldest.get("audited_at") or oldest["created_at"]
+
+
+async def mark_for_audit(checkpoints, index: int) -> bool:
+    """
+    Flag the checkpointed segment containing block index as changed, so
+    the next verification re-audits it.
+
+    Returns:
+        Whether the block is covered by a checkpoint
+    """
+    result = await checkpoints.update_one(
+        {"start_index": {"$lte": index}, "end_index": {"$gte": index}},
+        {"$set": {"audit_pending": True}}
+    )
+    return result.matched_count > 0
+
+
+async def inclusion_proof(ledger, checkpoints, index: Optional[int] = None,
+                          block_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Merkle inclusion proof for one block, by index or by block hash.
+
+    The proof is taken from the stored tree of the checkpoint covering the
+    block, so it is O(log n) siblings and checks against the signed root.
+
+    Returns:
+        Dict with block, proof, merkle_root and the checkpoint's segment,
+        bounds, signature and audit status; None if the block does not
+        exist. checkpoint is None when the block is after the watermark.
+    """
+    query = {"index": index} if index is not None else {"hash": block_hash}
+    block = await ledger.find_one(query, {"_id": 0})
+    if block is None:
+        return None
+
+    checkpoint = await checkpoints.find_one(
+        {"start_index": {"$lte": block["index"]}, "end_index": {"$gte": block["index"]}}, {"_id": 0}
+    )
+    if checkpoint is None:
+        return {"block": block, "checkpoint": None}
+
+    levels = unpack_levels(checkpoint.pop("levels"))
+    position = block["index"] - checkpoint["start_index"]
+    return {
+        "block": block,
+        "leaf": levels[0][position].hex(),
+        "proof": merkle_proof(levels, position),
+        "merkle_root": checkpoint["merkle_root"],
+        "checkpoint": checkpoint
+    }
+
+
+async def audit_segment(ledger, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Re-check one checkpointed segment against its stored Merkle tree.
+
+    Leaves are recomputed from block contents, so both edited contents and
+    rewritten hashes change the root.
+    """
+    start, end = checkpoint["start_index"], checkpoint["end_index"]
+    blocks = await ledger.find(
+        {"index": {"$gte": start, "$lte": end}}, {"_id": 0}
+    ).sort("index", 1).to_list(end - start + 1)
+
+    tampered = []
+    if not checkpoint_signature_valid(checkpoint):
+        tampered = list(range(start, end + 1))
+    elif [block.get("index") for block in blocks] != list(range(start, end + 1)):
+        present = {block.get("index") for block in blocks}
+        tampered = [index for index in range(start, end + 1) if index not in present]
+        tampered += [block.get("index") for block in blocks if not start <= block.get("index", -1) <= end]
+    else:
+        current = merkle_levels([merkle_leaf(hash_block(block)) for block in blocks])
+        if current[-1][0].hex() != checkpoint["merkle_root"]:
+            stored = unpack_levels(checkpoint["levels"])
+            tampered = [start + position for position in localize_mismatches(stored, current)]
+
+    return {
+        "segment": checkpoint["segment"],
+        "status": "COMPROMISED" if tampered else "SAFE",
+        "tampered_blocks": sorted(tampered)
+    }
+
+
+async def _audit_and_record(ledger, checkpoints, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+    """Audit one segment and record the outcome on its checkpoint."""
+    result = await audit_segment(ledger, checkpoint)
+    if result["tampered_blocks"]:
+        logger.warning(f"Audit: segment {result['segment']} tampered at blocks {result['tampered_blocks']}")
+    await checkpoints.update_one(
+        {"segment": checkpoint["segment"]},
+        {"$set": {
+            "audit_status": result["status"],
+            "tampered_blocks": result["tampered_blocks"],
+            "audited_at": datetime.now(timezone.utc).isoformat(),
+            "audit_pending": False
+        }}
+    )
+    return result
+
+
+async def audit_checkpoints(ledger, checkpoints) -> Dict[str, Any]:
+    """Audit every checkpointed segment and record the outcome on each checkpoint."""
+    audited = 0
+    compromised = []
+    async for checkpoint in checkpoints.find({}, {"_id": 0}).sort("segment", 1):
+        result = await _audit_and_record(ledger, checkpoints, checkpoint)
+        audited += 1
+        if result["tampered_blocks"]:
+            compromised.append(result)
+
+    logger.info(f"Audited {audited} ledger checkpoints, {len(compromised)} compromised")
+    return {"segments_audited": audited, "compromised_segments": compromised}
+
+
+async def _audit_loop(interval: int):
+    from core.database import get_pds_ledger_collection, get_pds_ledger_checkpoints_collection
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await audit_checkpoints(get_pds_ledger_collection(), get_pds_ledger_checkpoints_collection())
+        except Exception as e:
+            logger.error(f"Ledger checkpoint audit failed: {e}")
+
+
+_audit_task: Optional[asyncio.Task] = None
+
+def start_background_audit(interval: int = AUDIT_INTERVAL_SECONDS) -> Optional[asyncio.Task]:
+    """Schedule periodic checkpoint audits on the running event loop."""
+    global _audit_task
+    if interval > 0 and (_audit_task is None or _audit_task.done()):
+        _audit_task = asyncio.get_running_loop().create_task(_audit_loop(interval))
+        logger.info(f"Ledger checkpoint audit scheduled every {interval}s")
+    return _audit_task
+
+
+def stop_background_audit():
+    global _audit_task
+    if _audit_task is not None:
+        _audit_task.cancel()
+        _audit_task = None
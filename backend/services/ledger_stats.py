@@ -0,0 +1,255 @@
+"""
+Ledger Statistics
+Incrementally maintained PDS ledger statistics.
+
+/api/ledger/stats used to aggregate the whole chain and materialize every
+shop and beneficiary ID with distinct() on each request. Instead a single
+stats document in pds_ledger_stats holds per-item totals, the block count
+and HyperLogLog sketches of the shop and beneficiary IDs, and is updated
+by the ledger writer as blocks are committed. The document records the
+last block it covers; blocks written by anything else (the seed script,
+another process) are folded in by catching up from there.
+
+The sketches estimate unique counts within about 1%. An exact recount
+(an aggregation, not distinct()) can be run in the background and is
+reported alongside while it is still current.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import mmh3
+
+from core.logging import get_logger
+
+logger = get_logger("services.ledger_stats")
+
+STATS_ID = "pds_ledger"
+
+# HyperLogLog precision: 2^14 registers, ~0.8% standard error, 16 KB each
+HLL_PRECISION = 14
+
+# Blocks read per batch when catching up
+CATCH_UP_BATCH = 5000
+
+
+class HyperLogLog:
+    """HyperLogLog cardinality sketch over 64-bit MurmurHash3."""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError("Register count does not match precision")
+
+    def add(self, value: str):
+        h = mmh3.hash64(value.encode("utf-8"), signed=False)[0]
+        register = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small sets
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {
+        "tip_index": -1,
+        "tip_hash": None,
+        "total_blocks": 0,
+        "items": {},
+        "shops": HyperLogLog(),
+        "beneficiaries": HyperLogLog()
+    }
+
+
+class LedgerStats:
+    """
+    Stats document for one ledger collection.
+
+    record() and catch_up() change the state; callers serialize them by
+    holding the ledger writer's lock.
+    """
+
+    def __init__(self, collection, ledger):
+        self.collection = collection
+        self.ledger = ledger
+        self._state: Optional[Dict[str, Any]] = None
+        self._exact: Optional[Dict[str, Any]] = None
+
+    async def _load(self) -> Dict[str, Any]:
+        if self._state is None:
+            doc = await self.collection.find_one({"_id": STATS_ID})
+            state = _empty_state()
+            if doc is not None:
+                state.update(
+                    tip_index=doc["tip_index"],
+                    tip_hash=doc.get("tip_hash"),
+                    total_blocks=doc["total_blocks"],
+                    items=doc.get("items", {}),
+                    shops=HyperLogLog(registers=doc["shops_hll"]),
+                    beneficiaries=HyperLogLog(registers=doc["beneficiaries_hll"])
+                )
+                self._exact = doc.get("exact")
+            self._state = state
+        return self._state
+
+    def _apply(self, blocks: List[Dict[str, Any]]) -> int:
+        state = self._state
+        applied = 0
+        for block in blocks:
+            if block["index"] <= state["tip_index"]:
+                continue
+            state["tip_index"] = block["index"]
+            state["tip_hash"] = block.get("hash")
+            state["total_blocks"] += 1
+            applied += 1
+            if block["index"] == 0:
+                continue  # Genesis
+
+            tx = block.get("transaction", {})
+            item = state["items"].setdefault(
+                str(tx.get("item", "Unknown")), {"total_quantity": 0, "transaction_count": 0}
+            )
+            item["total_quantity"] += tx.get("quantity", 0)
+            item["transaction_count"] += 1
+            state["shops"].add(str(tx.get("shop_id", "")))
+            state["beneficiaries"].add(str(tx.get("beneficiary_id", "")))
+        return applied
+
+    async def _save(self):
+        state = self._state
+        await self.collection.replace_one({"_id": STATS_ID}, {
+            "_id": STATS_ID,
+            "tip_index": state["tip_index"],
+            "tip_hash": state["tip_hash"],
+            "total_blocks": state["total_blocks"],
+            "items": state["items"],
+            "shops_hll": state["shops"].to_bytes(),
+            "beneficiaries_hll": state["beneficiaries"].to_bytes(),
+            "exact": self._exact,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, upsert=True)
+
+    async def catch_up(self) -> int:
+        """Folds in every block after the last one covered."""
+        state = await self._load()
+        applied = 0
+        cursor = self.ledger.find(
+            {"index": {"$gt": state["tip_index"]}}, {"_id": 0, "index": 1, "hash": 1, "transaction": 1}
+        ).sort("index", 1).batch_size(CATCH_UP_BATCH)
+        while True:
+            batch = await cursor.to_list(CATCH_UP_BATCH)
+            if not batch:
+                break
+            applied += self._apply(batch)
+        if applied:
+            await self._save()
+            logger.info(f"Ledger stats caught up {applied} blocks to #{state['tip_index']}")
+        return applied
+
+    async def record(self, blocks: List[Dict[str, Any]]):
+        """Adds newly committed blocks (consecutive, in index order)."""
+        if not blocks:
+            return
+        state = await self._load()
+        if blocks[0]["index"] != state["tip_index"] + 1:
+            await self.catch_up()
+        else:
+            self._apply(blocks)
+            await self._save()
+
+    async def is_current(self, tip: Optional[Dict[str, Any]]) -> bool:
+        """Whether the stats cover exactly the chain ending at tip."""
+        state = await self._load()
+        if tip is None:
+            return state["tip_index"] == -1
+        return state["tip_index"] == tip["index"] and state["tip_hash"] == tip.get("hash")
+
+    async def refresh(self, tip: Optional[Dict[str, Any]]) -> int:
+        """
+        Brings the stats up to tip: catches up on new blocks, or recounts
+        from scratch if the chain was rewritten under them.
+        """
+        state = await self._load()
+        tip_index = tip["index"] if tip else -1
+        if state["tip_index"] > tip_index or (
+            state["tip_index"] == tip_index and tip is not None and state["tip_hash"] != tip.get("hash")
+        ):
+            logger.warning("Ledger changed under the stats document, recounting")
+            self._state = _empty_state()
+            self._exact = None
+            if tip is None:
+                await self._save()
+                return 0
+        return await self.catch_up()
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Current statistics from the stats document."""
+        state = await self._load()
+        items = sorted(
+            ({"_id": item, **totals} for item, totals in state["items"].items()),
+            key=lambda entry: entry["total_quantity"], reverse=True
+        )
+        stats = {
+            "total_blocks": state["total_blocks"],
+            "total_transactions": max(state["total_blocks"] - 1, 0),  # Exclude genesis
+            "unique_shops": state["shops"].count(),
+            "unique_beneficiaries": state["beneficiaries"].count(),
+            "unique_counts": "approximate",
+            "items": items,
+            "as_of_index": state["tip_index"]
+        }
+        exact = self._exact
+        if exact and exact.get("tip_index") == state["tip_index"]:
+            stats.update(
+                unique_shops=exact["unique_shops"],
+                unique_beneficiaries=exact["unique_beneficiaries"],
+                unique_counts="exact"
+            )
+        return stats
+
+    async def recount_exact(self) -> Dict[str, Any]:
+        """
+        Exact unique shop/beneficiary counts up to the covered tip, by
+        grouping on the server (no distinct() result size limit).
+        """
+        state = await self._load()
+        tip_index = state["tip_index"]
+
+        async def unique(field: str) -> int:
+            result = await self.ledger.aggregate([
+                {"$match": {"index": {"$gt": 0, "$lte": tip_index}}},
+                {"$group": {"_id": f"$transaction.{field}"}},
+                {"$count": "count"}
+            ], allowDiskUse=True).to_list(1)
+            return result[0]["count"] if result else 0
+
+        self._exact = {
+            "tip_index": tip_index,
+            "unique_shops": await unique("shop_id"),
+            "unique_beneficiaries": await unique("beneficiary_id"),
+            "counted_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self._save()
+        logger.info(f"Exact ledger unique counts at #{tip_index}: {self._exact}")
+        return self._exact
+
+    async def reset(self):
+        """Drops the stats (the ledger was cleared)."""
+        await self.collection.delete_one({"_id": STATS_ID})
+        self._state = None
+        self._exact = None
@@ -0,0 +1,348 @@
+"""
+Ledger Segment Log
+Append-only, memory-mapped persistence for the in-memory LedgerChain.
+
+A chain directory holds:
+
+- ledger-NNNNNN.seg: fixed-size block records, RECORDS_PER_SEGMENT per file
+- strings.dat / strings.idx: the interned string table (UTF-8 bytes, and
+  each string's u64 end offset)
+- overrides.ndjson: blocks that do not fit the record layout (see
+  services.ledger_compact), last line per row wins
+- index.json: record/string/override counts covered by the last fsync
+
+Appends are buffered and written with one fsync per FSYNC_BATCH blocks (or
+on flush/close); index.json is replaced only after the data it counts is
+on disk, so on reopen anything past it (a torn write) is truncated.
+Reopening only reads index.json and the overrides and maps the files, so
+it takes milliseconds regardless of chain length; records are decoded from
+the maps row by row, and the string lookup dict used for appends is built
+on the first append.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional
+
+from core.logging import get_logger
+from services.ledger_compact import DIGEST_SIZE, NONE_CODE, BlockRows, encode_columns
+
+logger = get_logger("services.ledger_store")
+
+# micros, shop, dealer, beneficiary, item, added_by, quantity,
+# integer_quantity, hash_version, hash, previous_hash (104 bytes)
+RECORD = struct.Struct("<q5idBB2x32s32s")
+QUANTITY_OFFSET = 28
+OFFSET = struct.Struct("<Q")
+
+RECORDS_PER_SEGMENT = 1 << 20
+FSYNC_BATCH = 1024
+
+FORMAT_VERSION = 1
+INDEX_FILE = "index.json"
+STRINGS_DATA = "strings.dat"
+STRINGS_INDEX = "strings.idx"
+OVERRIDES_FILE = "overrides.ndjson"
+
+
+def _fsync_append(path: str, data: bytes):
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _truncate(path: str, size: int):
+    if os.path.exists(path) and os.path.getsize(path) != size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SegmentStrings:
+    """String table of a segment log: flushed strings from the maps, plus pending ones."""
+
+    def __init__(self, log: "SegmentLog"):
+        self._log = log
+        self.pending: List[str] = []
+        self._codes: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self._log._string_count + len(self.pending)
+
+    def value(self, code: int) -> Optional[str]:
+        if code == NONE_CODE:
+            return None
+        log = self._log
+        if code >= log._string_count:
+            return self.pending[code - log._string_count]
+        end = OFFSET.unpack_from(log._string_offsets, code * OFFSET.size)[0]
+        start = OFFSET.unpack_from(log._string_offsets, (code - 1) * OFFSET.size)[0] if code else 0
+        return log._string_data[start:end].decode("utf-8")
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return NONE_CODE
+        if self._codes is None:
+            self._codes = {self.value(code): code for code in range(len(self))}
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self)
+            self.pending.append(value)
+        return code
+
+
+class SegmentLog(BlockRows):
+    """
+    Persistent block store with the same interface as CompactChain.
+
+    - append(...): buffer a block (fsynced every fsync_batch blocks)
+    - flush(): write and fsync buffered blocks, then update index.json
+    - close(): flush and unmap
+    - clear(): delete every block
+    """
+
+    def __init__(self, path: str, records_per_segment: int = RECORDS_PER_SEGMENT,
+                 fsync_batch: int = FSYNC_BATCH):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        os.makedirs(path, exist_ok=True)
+
+        index = self._read_index()
+        self.records_per_segment = index.get("records_per_segment", records_per_segment)
+        self._records = index.get("records", 0)
+        self._string_count = index.get("strings", 0)
+        self._string_bytes = index.get("string_bytes", 0)
+        self._override_bytes = index.get("override_bytes", 0)
+        self._discard_unindexed()
+
+        self._segments: Dict[int, mmap.mmap] = {}
+        self._string_data = _map(self._file(STRINGS_DATA))
+        self._string_offsets = _map(self._file(STRINGS_INDEX))
+        self.overrides: Dict[int, Dict[str, Any]] = self._read_overrides()
+        self.strings = SegmentStrings(self)
+
+        self._pending = bytearray()
+        self._pending_overrides: List[str] = []
+        self._cached_row = -1
+        self._cached_record: Optional[tuple] = None
+
+        logger.info(f"Opened ledger segment log {path}: {self._records} blocks")
+
+    # Files
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _segment_file(self, segment: int) -> str:
+        return self._file(f"ledger-{segment:06d}.seg")
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self._file(INDEX_FILE)) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if index.get("format") != FORMAT_VERSION or index.get("record_size") != RECORD.size:
+            raise ValueError(f"Unsupported ledger segment log format in {self.path}")
+        return index
+
+    def _write_index(self):
+        tmp_path = self._file(INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "record_size": RECORD.size,
+                "records_per_segment": self.records_per_segment,
+                "records": self._records,
+                "strings": self._string_count,
+                "string_bytes": self._string_bytes,
+                "override_bytes": self._override_bytes
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file(INDEX_FILE))
+
+    def _discard_unindexed(self):
+        """Truncates data written after the last index update (a torn append)."""
+        full, partial = divmod(self._records, self.records_per_segment)
+        segment = full
+        if partial:
+            _truncate(self._segment_file(segment), partial * RECORD.size)
+            segment += 1
+        while os.path.exists(self._segment_file(segment)):
+            os.remove(self._segment_file(segment))
+            segment += 1
+        _truncate(self._file(STRINGS_DATA), self._string_bytes)
+        _truncate(self._file(STRINGS_INDEX), self._string_count * OFFSET.size)
+        _truncate(self._file(OVERRIDES_FILE), self._override_bytes)
+
+    def _read_overrides(self) -> Dict[int, Dict[str, Any]]:
+        overrides = {}
+        if self._override_bytes:
+            with open(self._file(OVERRIDES_FILE), encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    overrides[entry.pop("row")] = entry
+        return overrides
+
+    # Rows
+
+    def __len__(self) -> int:
+        return self._records + len(self._pending) // RECORD.size
+
+    def _record(self, row: int) -> tuple:
+        if row == self._cached_row:
+            return self._cached_record
+        if row >= self._records:
+            record = RECORD.unpack_from(self._pending, (row - self._records) * RECORD.size)
+        else:
+            segment, position = divmod(row, self.records_per_segment)
+            offset = position * RECORD.size
+            mapped = self._segments.get(segment)
+            if mapped is None or len(mapped) < offset + RECORD.size:
+                if mapped is not None:
+                    mapped.close()
+                mapped = self._segments[segment] = _map(self._segment_file(segment))
+            record = RECORD.unpack_from(mapped, offset)
+        self._cached_row, self._cached_record = row, record
+        return record
+
+    def columns(self, row: int) -> tuple:
+        return self._record(row)[:8]
+
+    def hash_version(self, row: int) -> int:
+        return self._record(row)[8]
+
+    def hash_bytes(self, row: int) -> bytes:
+        return self._record(row)[9]
+
+    def previous_hash_bytes(self, row: int) -> bytes:
+        return self._record(row)[10]
+
+    # Writes
+
+    def append(self, timestamp: str, transaction: Dict[str, Any], previous_hash: str,
+               added_by: Optional[str], hash_version: int, block_hash: str):
+        row = len(self)
+        columns = encode_columns(self.strings, timestamp, transaction, added_by, hash_version)
+        if columns is None:
+            self._set_override(row, {
+                "timestamp": timestamp, "transaction": dict(transaction), "added_by": added_by
+            })
+            columns = (0, NONE_CODE, NONE_CODE, NONE_CODE, NONE_CODE, NONE_CODE, 0.0, False)
+
+        self._pending += RECORD.pack(
+            *columns, hash_version, bytes.fromhex(block_hash), bytes.fromhex(previous_hash)
+        )
+        if len(self._pending) >= self.fsync_batch * RECORD.size:
+            self.flush()
+
+    def _set_override(self, row: int, entry: Dict[str, Any]):
+        self.overrides[row] = entry
+        self._pending_overrides.append(json.dumps({"row": row, **entry}) + "\n")
+
+    def set_quantity(self, row: int, quantity):
+        """Rewrites a block's quantity in place (tamper simulation)."""
+        override = self.overrides.get(row)
+        if override:
+            override["transaction"]["quantity"] = quantity
+            self._set_override(row, override)
+        elif row >= self._records:
+            struct.pack_into("<dB", self._pending, (row - self._records) * RECORD.size + QUANTITY_OFFSET,
+                             float(quantity), isinstance(quantity, int))
+        else:
+            segment, position = divmod(row, self.records_per_segment)
+            with open(self._segment_file(segment), "r+b") as f:
+                os.pwrite(f.fileno(), struct.pack("<dB", float(quantity), isinstance(quantity, int)),
+                          position * RECORD.size + QUANTITY_OFFSET)
+        self._cached_row = -1
+
+    def flush(self):
+        """Writes buffered blocks, strings and overrides, fsyncs them, then the index."""
+        if not self._pending and not self._pending_overrides and not self.strings.pending:
+            return
+
+        if self.strings.pending:
+            data = bytearray()
+            offsets = bytearray()
+            end = self._string_bytes
+            for value in self.strings.pending:
+                encoded = value.encode("utf-8")
+                data += encoded
+                end += len(encoded)
+                offsets += OFFSET.pack(end)
+            _fsync_append(self._file(STRINGS_DATA), data)
+            _fsync_append(self._file(STRINGS_INDEX), offsets)
+
+        if self._pending_overrides:
+            data = "".join(self._pending_overrides).encode("utf-8")
+            _fsync_append(self._file(OVERRIDES_FILE), data)
+
+        records = self._records
+        pending = memoryview(self._pending)
+        while pending:
+            segment, position = divmod(records, self.records_per_segment)
+            count = min(len(pending) // RECORD.size, self.records_per_segment - position)
+            _fsync_append(self._segment_file(segment), pending[:count * RECORD.size])
+            pending = pending[count * RECORD.size:]
+            records += count
+        pending.release()
+
+        # Counts only move once the data is durable
+        self._records = records
+        self._string_bytes += sum(len(value.encode("utf-8")) for value in self.strings.pending)
+        self._string_count += len(self.strings.pending)
+        self._override_bytes += sum(len(line.encode("utf-8")) for line in self._pending_overrides)
+        self._write_index()
+
+        self._pending = bytearray()
+        self._pending_overrides = []
+        self.strings.pending = []
+        self._cached_row = -1
+        self._remap_strings()
+
+    def _remap_strings(self):
+        for mapped in (self._string_data, self._string_offsets):
+            if mapped is not None:
+                mapped.close()
+        self._string_data = _map(self._file(STRINGS_DATA))
+        self._string_offsets = _map(self._file(STRINGS_INDEX))
+
+    def _unmap(self):
+        for mapped in self._segments.values():
+            mapped.close()
+        self._segments = {}
+        for mapped in (self._string_data, self._string_offsets):
+            if mapped is not None:
+                mapped.close()
+        self._string_data = self._string_offsets = None
+
+    def close(self):
+        self.flush()
+        self._unmap()
+
+    def clear(self):
+        """Deletes every block of the log."""
+        self._unmap()
+        for name in os.listdir(self.path):
+            if name.endswith(".seg") or name in (STRINGS_DATA, STRINGS_INDEX, OVERRIDES_FILE, INDEX_FILE):
+                os.remove(self._file(name))
+        self._records = self._string_count = self._string_bytes = self._override_bytes = 0
+        self.overrides = {}
+        self.strings = SegmentStrings(self)
+        self._pending = bytearray()
+        self._pending_overrides = []
+        self._cached_row = -1
+
+    def memory_bytes(self) -> int:
+        """Bytes buffered in memory (mapped files are paged in by the OS)."""
+        return len(self._pending) + sum(len(value) for value in self.strings.pending)
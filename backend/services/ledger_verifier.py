@@ -0,0 +1,153 @@
+"""
+Ledger Verifier
+Streaming, parallel integrity check of the MongoDB PDS ledger.
+
+The chain is read from a cursor in index order, one batch at a time, so
+verification covers every block without loading the collection into
+memory. Link checks (previous_hash against the prior block's hash, index
+continuity) are cheap and run in order; hash recomputation depends only on
+each block's own fields, so whole batches are hashed in a process pool
+(or, for small batches and single-CPU hosts, a worker thread) while the
+next batch is fetched.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from core.logging import get_logger
+from services.ledger import hash_block
+
+logger = get_logger("services.ledger_verifier")
+
+# Blocks fetched from the cursor per batch
+VERIFY_BATCH_SIZE = 5000
+
+# Batches smaller than this are hashed in one thread (pool round-trips cost more)
+PARALLEL_MIN_BATCH = 2000
+
+# Hashing worker processes (1 disables the pool)
+VERIFY_WORKERS = int(os.environ.get("LEDGER_VERIFY_WORKERS", os.cpu_count() or 1))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared hashing pool, created on first use."""
+    global _pool
+    if VERIFY_WORKERS <= 1:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+    return _pool
+
+
+def hash_blocks(blocks: List[Dict[str, Any]]) -> List[str]:
+    """Recomputed hashes of a list of stored blocks (runs in pool workers)."""
+    return [hash_block(block) for block in blocks]
+
+
+async def _hash_batch(blocks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Hashes a batch off the event loop: split across the pool when it is
+    large enough, otherwise in a worker thread so fetching can continue.
+    """
+    pool = _get_pool()
+    if pool is None or len(blocks) < PARALLEL_MIN_BATCH:
+        return await asyncio.to_thread(hash_blocks, blocks)
+
+    loop = asyncio.get_running_loop()
+    chunk = -(-len(blocks) // VERIFY_WORKERS)
+    futures = [
+        loop.run_in_executor(pool, hash_blocks, blocks[i:i + chunk])
+        for i in range(0, len(blocks), chunk)
+    ]
+    hashes: List[str] = []
+    for part in await asyncio.gather(*futures):
+        hashes.extend(part)
+    return hashes
+
+
+async def verify_chain_stream(collection, batch_size: int = VERIFY_BATCH_SIZE,
+                              after_index: Optional[int] = None,
+                              previous_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verify every block of a ledger collection.
+
+    Args:
+        collection: Motor collection holding the chain
+        batch_size: Blocks fetched and hashed per batch
+        after_index: Only verify blocks after this index (already trusted)
+        previous_hash: Hash of block after_index, for the first link check
+
+    Returns:
+        Dict with is_valid, total_blocks, tampered_blocks (stored hash does
+        not match contents), broken_links (previous_hash or index does not
+        follow the prior block), first_invalid, elapsed_seconds and
+        blocks_per_second
+    """
+    start = time.perf_counter()
+
+    tampered: List[int] = []
+    broken: List[int] = []
+    total = 0
+    previous: Optional[Dict[str, Any]] = None
+    query: Dict[str, Any] = {}
+    if after_index is not None:
+        query = {"index": {"$gt": after_index}}
+        previous = {"index": after_index, "hash": previous_hash}
+
+    async def check(batch: List[Dict[str, Any]], hashing: "asyncio.Future"):
+        nonlocal previous
+        hashes = await hashing
+        for block, recalculated in zip(batch, hashes):
+            if previous is not None and (
+                block.get("previous_hash") != previous.get("hash")
+                or block.get("index") != previous.get("index", -1) + 1
+            ):
+                broken.append(block.get("index"))
+            if block.get("hash") != recalculated:
+                tampered.append(block.get("index"))
+            previous = block
+
+    cursor = collection.find(query, {"_id": 0}).sort("index", 1).batch_size(batch_size)
+
+    # Batch k+1 is fetched and hashed while batch k's results are checked
+    pending = None
+    while True:
+        batch = await cursor.to_list(batch_size)
+        if not batch:
+            break
+        hashing = asyncio.ensure_future(_hash_batch(batch))
+        if pending is not None:
+            await check(*pending)
+        pending = (batch, hashing)
+        total += len(batch)
+
+    if pending is not None:
+        await check(*pending)
+
+    elapsed = time.perf_counter() - start
+    invalid = sorted(set(tampered) | set(broken))
+
+    result = {
+        "is_valid": not invalid,
+        "status": "SAFE" if not invalid else "COMPROMISED",
+        "total_blocks": total,
+        "tampered_blocks": tampered,
+        "broken_links": broken,
+        "first_invalid": invalid[0] if invalid else None,
+        "elapsed_seconds": round(elapsed, 4),
+        "blocks_per_second": round(total / elapsed, 1) if elapsed > 0 else None
+    }
+    logger.info(
+        f"Verified {total} blocks in {elapsed:.3f}s ({result['blocks_per_second']} blocks/s): "
+        f"{len(tampered)} tampered, {len(broken)} broken links"
+    )
+    return result
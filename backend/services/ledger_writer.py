@@ -0,0 +1,242 @@
+"""
+Ledger Writer
+Single in-process sequencer for PDS ledger appends.
+
+Appending used to read the tip with find_one and then insert, so two
+concurrent requests could chain onto the same tip and fork the ledger.
+All appends now go through one queue drained by one task, which keeps the
+chain tip cached in memory. Transactions that queue up while a write is in
+flight are chained into consecutive blocks and group-committed with a
+single ordered insert_many, so throughput grows with concurrency.
+
+A unique index on `index` guards against other writers (another worker
+process, the seed script): a duplicate-key error reloads the tip from
+MongoDB and re-chains the blocks that were not written.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core.logging import get_logger
+from services.block_codec import check_quantity
+from services.ledger import seal_block
+from services.ledger_stats import LedgerStats
+
+logger = get_logger("services.ledger_writer")
+
+# Most transactions chained into one insert_many
+MAX_GROUP_COMMIT = 256
+
+# Tip reloads after duplicate-key conflicts before a batch fails
+MAX_CONFLICT_RETRIES = 5
+
+DUPLICATE_KEY = 11000
+
+GENESIS_TRANSACTION = {
+    "shop_id": "GENESIS",
+    "dealer_id": "GENESIS",
+    "beneficiary_id": "GENESIS",
+    "item": "Genesis Block",
+    "quantity": 0
+}
+
+
+def make_block(index: int, transaction: Dict[str, Any], previous_hash: str,
+               added_by: Optional[str], timestamp: Optional[str] = None) -> Dict[str, Any]:
+    return seal_block({
+        "index": index,
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
+        "transaction": transaction,
+        "previous_hash": previous_hash,
+        "added_by": added_by
+    })
+
+
+def _public(block: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in block.items() if k != "_id"}
+
+
+class LedgerWriter:
+    """
+    Serializes appends to a ledger collection.
+
+    - append(transaction, added_by): queue a transaction, returns its block
+    - tip(): cached latest block (creates the genesis block on an empty chain)
+    - lock: held while a batch is written; hold it for other chain writes
+      (reset) and call invalidate() afterwards
+    - commit(entries, written): chain and write a batch while holding lock
+      (bulk import)
+    - stats: LedgerStats updated with every committed batch
+    """
+
+    def __init__(self, collection, max_group_commit: int = MAX_GROUP_COMMIT,
+                 stats: Optional[LedgerStats] = None):
+        self.collection = collection
+        self.stats = stats
+        self.max_group_commit = max_group_commit
+        self._tip: Optional[Dict[str, Any]] = None
+        self._index_ready = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _bind_loop(self):
+        """Queue, lock and sequencer task belong to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._lock = asyncio.Lock()
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        self._bind_loop()
+        return self._lock
+
+    def invalidate(self):
+        """Forget the cached tip (the chain was changed outside the writer)."""
+        self._tip = None
+
+    async def _ensure_index(self):
+        if not self._index_ready:
+            await self.collection.create_index("index", unique=True)
+            await self.collection.create_index("timestamp")
+            self._index_ready = True
+
+    async def _load_tip(self) -> Dict[str, Any]:
+        await self._ensure_index()
+        tip = await self.collection.find_one({}, {"_id": 0}, sort=[("index", -1)])
+        if tip is None:
+            genesis = make_block(0, dict(GENESIS_TRANSACTION), "0" * 64, "SYSTEM")
+            try:
+                await self.collection.insert_one(genesis)
+                logger.info("Genesis block created")
+                tip = _public(genesis)
+            except DuplicateKeyError:
+                tip = await self.collection.find_one({}, {"_id": 0}, sort=[("index", -1)])
+        self._tip = tip
+        return tip
+
+    async def tip(self) -> Dict[str, Any]:
+        """Latest block, from the cache when possible."""
+        if self._tip is not None:
+            return self._tip
+        async with self.lock:
+            return self._tip or await self._load_tip()
+
+    async def append(self, transaction: Dict[str, Any], added_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a transaction and wait until its block is committed.
+
+        Raises ValueError for a quantity the current hash version cannot
+        seal, before it is queued with (and could fail) other appends.
+        """
+        check_quantity(transaction.get("quantity", 0))
+        self._bind_loop()
+        future = self._loop.create_future()
+        await self._queue.put((transaction, added_by, future))
+        return await future
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_group_commit and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            pending = [item for item in batch if not item[2].cancelled()]
+            if not pending:
+                continue
+            written: List[Dict[str, Any]] = []
+            try:
+                async with self._lock:
+                    await self.commit([(transaction, added_by, None) for transaction, added_by, _ in pending], written)
+            except Exception as e:
+                logger.error(f"Ledger append of {len(pending)} transactions failed: {e}")
+                self._tip = None
+                for _, _, future in pending[len(written):]:
+                    if not future.done():
+                        future.set_exception(e)
+            for block, (_, _, future) in zip(written, pending):
+                if not future.done():
+                    future.set_result(block)
+
+    async def _record_stats(self, blocks: List[Dict[str, Any]]):
+        if self.stats is None:
+            return
+        try:
+            await self.stats.record(blocks)
+        except Exception as e:
+            # Stats catch up from the chain later; never fail an append over them
+            logger.error(f"Ledger stats update failed: {e}")
+
+    async def current_tip(self) -> Dict[str, Any]:
+        """Latest block; the caller must hold lock."""
+        return self._tip or await self._load_tip()
+
+    async def commit(self, entries: List[Tuple[Dict[str, Any], Optional[str], Optional[str]]],
+                     written: List[Dict[str, Any]]):
+        """
+        Chain (transaction, added_by, timestamp) entries onto the tip and
+        write them in order with insert_many. The caller must hold lock.
+
+        Committed blocks are appended to written as they land, so a caller
+        knows how far a failed commit got.
+        """
+        pending = list(entries)
+        conflicts = 0
+        while pending:
+            tip = await self.current_tip()
+            blocks = []
+            previous = tip
+            for transaction, added_by, timestamp in pending:
+                block = make_block(previous["index"] + 1, transaction, previous["hash"], added_by, timestamp)
+                blocks.append(block)
+                previous = block
+
+            try:
+                await self.collection.insert_many(blocks, ordered=True)
+                inserted, conflict = len(blocks), False
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if not errors or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                inserted, conflict = e.details.get("nInserted", 0), True
+
+            committed = [_public(block) for block in blocks[:inserted]]
+            written.extend(committed)
+            if committed:
+                self._tip = committed[-1]
+                await self._record_stats(committed)
+            pending = pending[inserted:]
+
+            if conflict:
+                conflicts += 1
+                if conflicts > MAX_CONFLICT_RETRIES:
+                    raise RuntimeError("Ledger tip kept moving under concurrent writers")
+                logger.warning(f"Ledger tip moved at block #{blocks[inserted]['index']}, reloading")
+                self._tip = None
+
+        if len(blocks) > 1:
+            logger.info(f"Group-committed blocks #{blocks[0]['index']}-#{blocks[-1]['index']}")
+
+
+_writer: Optional[LedgerWriter] = None
+_writer_db = None
+
+def get_ledger_writer() -> LedgerWriter:
+    """Writer for the PDS ledger collection, created on first use."""
+    global _writer, _writer_db
+    from core.database import get_database
+    db = get_database()
+    if _writer is None or _writer_db is not db:
+        _writer = LedgerWriter(db.pds_ledger, stats=LedgerStats(db.pds_ledger_stats, db.pds_ledger))
+        _writer_db = db
+    return _writer
@@ -11,10 +11,18 @@ Performs 360° profile scans:
 
 import pandas as pd
 import os
+import threading
+import time
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timezone
 
 from core.logging import get_logger
+from services.lifestyle_index import NameIndex, FamilyIndex, AssetIndex
+from services.identity_batch import get_applicant_identity_lookup
+from services.identity_linker import prepare_registry, registry_fingerprint, reset_identity_linker
+from services.household_graph import HouseholdGraph
+from services.household_risk import HouseholdRiskTable, affected_families
+from services.lifestyle_registry import compact_civil, compact_vahan, compact_discom, memory_report
 
 logger = get_logger("services.lifestyle")
 
@@ -25,6 +33,29 @@ CIVIL_REGISTRY_CSV = os.path.join(DATA_DIR, 'civil_registry.csv')
 VAHAN_REGISTRY_CSV = os.path.join(DATA_DIR, 'vahan_registry.csv')
 DISCOM_DATA_CSV = os.path.join(DATA_DIR, 'discom_data.csv')
 
+# Minimum Splink match probability to accept an AI identity match
+AI_MATCH_THRESHOLD = 0.6
+
+
+def _household_hop_limit() -> Optional[int]:
+    """HOUSEHOLD_HOP_LIMIT from the environment; unset or invalid means no limit."""
+    value = os.environ.get('HOUSEHOLD_HOP_LIMIT', '').strip()
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid HOUSEHOLD_HOP_LIMIT={value!r}; using whole household components")
+        return None
+    if limit < 0:
+        logger.warning(f"Ignoring negative HOUSEHOLD_HOP_LIMIT={limit}; using whole household components")
+        return None
+    return limit
+
+
+# Default hop limit for extended household clusters (unset: whole component)
+HOUSEHOLD_HOP_LIMIT = _household_hop_limit()
+
 
 class LifestyleScanner:
     """
@@ -63,6 +94,11 @@ class LifestyleScanner:
             else:
                 self.df_discom = pd.DataFrame(columns=["address", "avg_monthly_bill"])
             
+            # Dictionary-encoded layout (see services.lifestyle_registry)
+            self.df_civil = compact_civil(self.df_civil)
+            self.df_vahan = compact_vahan(self.df_vahan)
+            self.df_discom = compact_discom(self.df_discom)
+            
             logger.info(f"Loaded: {len(self.df_civil)} citizens, {len(self.df_vahan)} vehicles, {len(self.df_discom)} discom records")
             
         except Exception as e:
@@ -70,6 +106,81 @@ class LifestyleScanner:
             self.df_civil = pd.DataFrame()
             self.df_vahan = pd.DataFrame()
             self.df_discom = pd.DataFrame()
+        
+        memory = self.memory_report()
+        logger.info(
+            f"Registry memory: {memory['total_bytes'] / (1024 * 1024):.1f} MB "
+            f"({memory['mb_per_million_citizens']} MB per million citizens)"
+        )
+        self._build_indexes()
+    
+    def _build_indexes(self, household_risk: bool = True, asset_index: Optional[AssetIndex] = None):
+        """Build lookup indexes (and the household risk table) over the loaded registries."""
+        if 'name_lower' in self.df_civil.columns:
+            names = self.df_civil['name_lower']
+        else:
+            names = self.df_civil['name'] if 'name' in self.df_civil.columns else []
+        self.name_index = NameIndex(names)
+        
+        family_ids = self.df_civil['family_id'] if 'family_id' in self.df_civil.columns else []
+        self.family_index = FamilyIndex(family_ids)
+        
+        self.asset_index = asset_index if asset_index is not None else AssetIndex(self.df_vahan, self.df_discom)
+        
+        self.household_graph = HouseholdGraph(self.df_civil)
+        
+        # unique_id -> first row position, for resolving linker matches
+        self.citizen_positions: Dict[str, int] = {}
+        if 'unique_id' in self.df_civil.columns:
+            for position, unique_id in enumerate(self.df_civil['unique_id'].astype(str)):
+                self.citizen_positions.setdefault(unique_id, position)
+        
+        if household_risk:
+            self.household_risk = HouseholdRiskTable(self.df_civil, self.asset_index)
+        
+        # Identity services keyed to the civil registry must match this snapshot:
+        # the shared linker is rebuilt and stale batch links are ignored
+        self.registry_fingerprint = registry_fingerprint(prepare_registry(self.df_civil))
+        reset_identity_linker(self.registry_fingerprint)
+        get_applicant_identity_lookup().expect_registry(self.registry_fingerprint)
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """Deep memory use of the loaded registries."""
+        return memory_report({'civil': self.df_civil, 'vahan': self.df_vahan, 'discom': self.df_discom})
+    
+    def apply_registry_changes(self, df_civil: Optional[pd.DataFrame] = None,
+                               df_vahan: Optional[pd.DataFrame] = None,
+                               df_discom: Optional[pd.DataFrame] = None) -> int:
+        """
+        Swap in updated registry snapshots.
+        
+        Lookup indexes are rebuilt, the shared identity linker is rebuilt
+        and batch-linked identities are ignored if the civil registry
+        changed; the household risk table is only re-evaluated for families
+        touched by the changes. The affected families are worked out before
+        any scanner state is replaced, so a snapshot that cannot be diffed
+        leaves the scanner on the previous registries.
+        
+        Returns:
+            Number of families whose risk entry was refreshed
+        """
+        new_civil = compact_civil(df_civil) if df_civil is not None else self.df_civil
+        new_vahan = compact_vahan(df_vahan) if df_vahan is not None else self.df_vahan
+        new_discom = compact_discom(df_discom) if df_discom is not None else self.df_discom
+        if df_vahan is not None or df_discom is not None:
+            new_assets = AssetIndex(new_vahan, new_discom)
+        else:
+            new_assets = self.asset_index
+        
+        families = affected_families(self.df_civil, new_civil, self.asset_index, new_assets)
+        
+        self.df_civil, self.df_vahan, self.df_discom = new_civil, new_vahan, new_discom
+        self._build_indexes(household_risk=False, asset_index=new_assets)
+        return self.household_risk.refresh(families, self.df_civil, self.family_index, self.asset_index)
+    
+    def _family_members(self, family_id) -> pd.DataFrame:
+        """Civil registry rows sharing family_id, in registry order."""
+        return self.df_civil.iloc[self.family_index.members(family_id)]
     
     def _identify_citizen(self, applicant_name: str) -> Tuple[Optional[pd.Series], str]:
         """
@@ -85,43 +196,52 @@ class LifestyleScanner:
         clean_input = applicant_name.lower().strip()
         
         # 1. EXACT MATCH
-        exact = self.df_civil[self.df_civil['name'].str.lower() == clean_input]
-        if not exact.empty:
+        exact = self.name_index.exact(clean_input)
+        if exact is not None:
             logger.info(f"Exact match found for '{applicant_name}'")
-            return exact.iloc[0], "EXACT_MATCH"
+            return self.df_civil.iloc[exact], "EXACT_MATCH"
         
         # 2. PREFIX MATCH (for partial names like "Turvi L")
         if len(clean_input) >= 3:
-            prefix = self.df_civil[self.df_civil['name'].str.lower().str.startswith(clean_input)]
-            if not prefix.empty:
-                logger.info(f"Prefix match: '{clean_input}' -> '{prefix.iloc[0]['name']}'")
-                return prefix.iloc[0], "PREFIX_MATCH"
-        
-        # 3. FUZZY MATCH (Simple word overlap)
-        input_words = set(clean_input.split())
-        best_match = None
-        best_score = 0
-        
-        for _, row in self.df_civil.iterrows():
-            name = row.get('name', '')
-            if not name:
-                continue
-            
-            name_words = set(str(name).lower().split())
-            overlap = len(input_words & name_words)
-            score = overlap / max(len(input_words), len(name_words))
-            
-            if score > best_score and score > 0.5:
-                best_score = score
-                best_match = row
+            prefix = self.name_index.prefix(clean_input)
+            if prefix is not None:
+                person = self.df_civil.iloc[prefix]
+                logger.info(f"Prefix match: '{clean_input}' -> '{person['name']}'")
+                return person, "PREFIX_MATCH"
         
-        if best_match is not None:
+        # 3. FUZZY MATCH (Word overlap, tolerant of single-character typos)
+        position, best_score, examined = self.name_index.fuzzy(clean_input)
+        logger.info(f"Fuzzy search for '{applicant_name}' examined {examined} of {len(self.name_index)} citizens")
+        
+        if position is not None:
+            best_match = self.df_civil.iloc[position]
             logger.info(f"Fuzzy match: '{applicant_name}' -> '{best_match['name']}' (score: {best_score:.2f})")
             return best_match, "FUZZY_MATCH"
         
         # No match found
         return None, "NEW_APPLICANT"
     
+    def _linked_identity(self, name: str, dob: str) -> Tuple[Optional[pd.Series], str]:
+        """
+        Identity precomputed by the batch linkage job (services.identity_batch).
+        
+        Returns:
+            Tuple of (matched_person, match_type), person None if not linked
+        """
+        return self._resolve_linked(name, get_applicant_identity_lookup().lookup(name, dob))
+    
+    def _resolve_linked(self, name: str, linked: Optional[Dict[str, Any]]) -> Tuple[Optional[pd.Series], str]:
+        """Registry row for a batch-linked identity, if confident enough."""
+        if linked is None or linked['match_probability'] <= AI_MATCH_THRESHOLD:
+            return None, "NEW_APPLICANT"
+        
+        position = self.citizen_positions.get(linked['unique_id'])
+        if position is None:
+            return None, "NEW_APPLICANT"
+        
+        logger.info(f"Linked match: '{name}' -> '{linked['matched_name']}' (Score: {linked['match_probability']:.2f})")
+        return self.df_civil.iloc[position], "LINKED_MATCH"
+    
     def _get_family_cluster(self, person: pd.Series) -> List[str]:
         """Get all family members of a person."""
         if self.df_civil.empty:
@@ -131,9 +251,31 @@ class LifestyleScanner:
         if not family_id:
             return [person.get('name', 'Unknown')]
         
-        family = self.df_civil[self.df_civil['family_id'] == family_id]
+        family = self._family_members(family_id)
         return family['name'].tolist()
     
+    def _extended_cluster(self, person: pd.Series, hop_limit: Optional[int] = None) -> List[str]:
+        """
+        Names linked to a person through shared family IDs, addresses or
+        other identifiers (see services.household_graph).
+        """
+        try:
+            position = self.df_civil.index.get_loc(person.name)
+        except KeyError:
+            return [person.get('name', 'Unknown')]
+        
+        if hop_limit is None:
+            hop_limit = HOUSEHOLD_HOP_LIMIT
+        cluster = self.household_graph.cluster(position, hop_limit)
+        return self.df_civil['name'].iloc[cluster].tolist()
+    
+    def _household_assets(self, family_id, family_members: pd.DataFrame) -> Tuple[List[str], int]:
+        """Flags and risk score from the household risk table, checked live if absent."""
+        materialized = self.household_risk.lookup(family_id) if family_id else None
+        if materialized is not None:
+            return materialized
+        return self._check_family_assets(family_members)
+    
     def _check_family_assets(self, family_members: pd.DataFrame) -> Tuple[List[str], int]:
         """
         Check assets for all family members.
@@ -144,31 +286,36 @@ class LifestyleScanner:
         flags = []
         risk_score = 0
         
-        for _, member in family_members.iterrows():
-            member_id = str(member.get('unique_id', ''))
-            member_name = member.get('name', 'Unknown')
-            member_address = member.get('address', '')
-            
+        if family_members.empty:
+            return flags, risk_score
+        
+        # Resolve every member's assets in one keyed lookup per registry
+        ids = family_members['unique_id'] if 'unique_id' in family_members.columns \
+            else pd.Series('', index=family_members.index)
+        addresses = family_members['address'] if 'address' in family_members.columns \
+            else pd.Series('', index=family_members.index)
+        names = family_members['name'] if 'name' in family_members.columns \
+            else pd.Series('Unknown', index=family_members.index)
+        
+        vehicles = self.asset_index.vehicle_models(ids)
+        has_vehicle = ids.astype(str).map(self.asset_index.has_vehicle)
+        bills = self.asset_index.monthly_bills(addresses)
+        
+        for member_name, owns_vehicle, vehicle, avg_bill in zip(names, has_vehicle, vehicles, bills):
             # Check Vahan (Vehicles)
-            if not self.df_vahan.empty and 'owner_id' in self.df_vahan.columns:
-                cars = self.df_vahan[self.df_vahan['owner_id'] == member_id]
-                if not cars.empty:
-                    vehicle = cars.iloc[0].get('vehicle_model', 'Vehicle')
-                    flags.append(f"🚗 Family Member ({member_name}) owns {vehicle}")
-                    risk_score += 50
+            if owns_vehicle:
+                flags.append(f"🚗 Family Member ({member_name}) owns {vehicle}")
+                risk_score += 50
             
             # Check Discom (Electricity)
-            if not self.df_discom.empty and member_address:
-                bills = self.df_discom[self.df_discom['address'] == member_address]
-                if not bills.empty:
-                    avg_bill = bills.iloc[0].get('avg_monthly_bill', 0)
-                    if avg_bill > 8000:
-                        flags.append(f"⚡ High Monthly Bill Detected: ₹{avg_bill}")
-                        risk_score += 40
+            if pd.notna(avg_bill) and avg_bill > 8000:
+                flags.append(f"⚡ High Monthly Bill Detected: ₹{avg_bill}")
+                risk_score += 40
         
         return flags, risk_score
     
-    async def scan(self, name: str, dob: str, address: str) -> Dict[str, Any]:
+    async def scan(self, name: str, dob: str, address: str,
+                   hop_limit: Optional[int] = None) -> Dict[str, Any]:
         """
         Perform 360° profile scan on an applicant.
         
@@ -176,15 +323,31 @@ class LifestyleScanner:
             name: Applicant's name
             dob: Date of birth (ISO format)
             address: Declared address
+            hop_limit: Hop limit for the extended household cluster
+                (defaults to HOUSEHOLD_HOP_LIMIT)
         
         Returns:
             Scan result with integrity status, risk score, family cluster, etc.
         """
         logger.info(f"Processing application: '{name}'")
         
-        # Step 1: Identity Resolution
-        person, match_type = self._identify_citizen(name)
+        # Step 1: Identity Resolution (batch-linked identity first)
+        person, match_type = self._linked_identity(name, dob)
+        if person is None:
+            person, match_type = self._identify_citizen(name)
         
+        return self._scan_result(name, person, match_type, hop_limit)
+    
+    def _scan_result(self, name: str, person: Optional[pd.Series], match_type: str,
+                     hop_limit: Optional[int] = None,
+                     households: Optional[Dict[Any, Tuple[List[str], List[str], int]]] = None) -> Dict[str, Any]:
+        """
+        Scan result for a resolved identity.
+        
+        Args:
+            households: Optional family_id -> (family_names, flags, risk_score)
+                cache, so a batch evaluates each household once
+        """
         # Step 2: Handle new applicants (no prior records)
         if person is None:
             logger.info(f"Unknown applicant '{name}' - treating as new entry")
@@ -192,23 +355,31 @@ class LifestyleScanner:
                 "integrity_status": "CLEAN",
                 "risk_score": 0,
                 "family_cluster": [name],
+                "extended_cluster": [name],
                 "assets_detected": [],
                 "system_message": "No prior financial records found. Applicant is ELIGIBLE for enrollment.",
                 "match_type": match_type
             }
         
-        # Step 3: Get family cluster
         family_id = person.get('family_id')
-        if family_id and not self.df_civil.empty:
-            family_members = self.df_civil[self.df_civil['family_id'] == family_id]
+        cached = households.get(family_id) if households is not None and family_id else None
+        if cached is not None:
+            family_names, flags, risk_score = cached
         else:
-            family_members = pd.DataFrame([person])
-        
-        family_names = family_members['name'].tolist()
-        logger.info(f"Family cluster: {family_names}")
-        
-        # Step 4: Check family assets
-        flags, risk_score = self._check_family_assets(family_members)
+            # Step 3: Get family cluster
+            if family_id and not self.df_civil.empty:
+                family_members = self._family_members(family_id)
+            else:
+                family_members = pd.DataFrame([person])
+            
+            family_names = family_members['name'].tolist()
+            logger.info(f"Family cluster: {family_names}")
+            
+            # Step 4: Check family assets
+            flags, risk_score = self._household_assets(family_id, family_members)
+            
+            if households is not None and family_id:
+                households[family_id] = (family_names, flags, risk_score)
         
         # Step 5: Determine status
         if risk_score >= 50:
@@ -224,57 +395,97 @@ class LifestyleScanner:
         return {
             "integrity_status": status,
             "risk_score": risk_score,
-            "family_cluster": family_names,
-            "assets_detected": flags,
+            "family_cluster": list(family_names),
+            "extended_cluster": self._extended_cluster(person, hop_limit),
+            "assets_detected": list(flags),
             "system_message": message,
             "match_type": match_type
         }
     
-    async def scan_with_ai(self, name: str, dob: str, address: str) -> Dict[str, Any]:
+    async def scan_batch(self, profiles: List[Dict[str, str]],
+                         hop_limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        360° scan of many applicants.
+        
+        Batch-linked identities are fetched in one query and the remaining
+        names resolved once per distinct name; each household's assets are
+        evaluated once per batch.
+        
+        Args:
+            profiles: Dicts with name, dob, address
+            hop_limit: Hop limit for extended household clusters
+        
+        Returns:
+            Tuple of (results in input order, timing in milliseconds)
+        """
+        start = time.perf_counter()
+        logger.info(f"Processing batch of {len(profiles)} applications")
+        
+        # Step 1: Identity Resolution in bulk
+        linked = get_applicant_identity_lookup().lookup_many(
+            [(profile['name'], profile.get('dob')) for profile in profiles]
+        )
+        resolved_by_name: Dict[str, Tuple[Optional[pd.Series], str]] = {}
+        identities = []
+        for profile, link in zip(profiles, linked):
+            person, match_type = self._resolve_linked(profile['name'], link)
+            if person is None:
+                clean_name = profile['name'].lower().strip()
+                if clean_name not in resolved_by_name:
+                    resolved_by_name[clean_name] = self._identify_citizen(profile['name'])
+                person, match_type = resolved_by_name[clean_name]
+            identities.append((person, match_type))
+        resolved = time.perf_counter()
+        
+        # Steps 2-5, one household evaluation per family
+        households: Dict[Any, Tuple[List[str], List[str], int]] = {}
+        results = [
+            self._scan_result(profile['name'], person, match_type, hop_limit, households)
+            for profile, (person, match_type) in zip(profiles, identities)
+        ]
+        finished = time.perf_counter()
+        
+        timing = {
+            "identity_ms": round((resolved - start) * 1000, 2),
+            "households_ms": round((finished - resolved) * 1000, 2),
+            "total_ms": round((finished - start) * 1000, 2),
+            "households_evaluated": len(households)
+        }
+        return results, timing
+    
+    async def scan_with_ai(self, name: str, dob: str, address: str,
+                           hop_limit: Optional[int] = None) -> Dict[str, Any]:
         """
         Enhanced scan using Splink AI matching (if available).
         Falls back to basic scan if Splink not installed.
         """
         try:
-            from splink import DuckDBAPI, Linker, SettingsCreator
-            import splink.comparison_library as cl
+            import splink  # noqa: F401
+            from services.identity_linker import get_identity_linker
             
             # Use AI matching for identity resolution
             logger.info("🧠 Running AI-powered identity scan...")
             
-            # Create a temporary entry for the applicant
-            new_entry = pd.DataFrame([{"name": name, "unique_id": "TEMP"}])
-            
-            # Configure Splink with fuzzy matching
-            settings = SettingsCreator(
-                link_type="link_only",
-                blocking_rules_to_generate_predictions=[],
-                comparisons=[cl.JaroWinklerAtThresholds("name", [0.60])]
-            )
-            
             try:
-                linker = Linker([new_entry, self.df_civil], settings, DuckDBAPI())
-                results = linker.inference.predict(threshold_match_probability=0.01).as_pandas_dataframe()
+                best = get_identity_linker(self.df_civil).match(name)
                 
-                if not results.empty:
-                    best = results.sort_values(by="match_probability", ascending=False).iloc[0]
-                    
-                    if best['match_probability'] > 0.6:
-                        matched_name = best['name_r']
-                        logger.info(f"AI matched '{name}' -> '{matched_name}' (Score: {best['match_probability']:.2f})")
+                if best is not None and best['match_probability'] > AI_MATCH_THRESHOLD:
+                    position = self.citizen_positions.get(best['unique_id'])
+                    if position is not None:
+                        logger.info(f"AI matched '{name}' -> '{self.df_civil.iloc[position]['name']}' (Score: {best['match_probability']:.2f})")
                         
                         # Get matched person and continue with regular scan
-                        matched_person = self.df_civil[self.df_civil['name'] == matched_name].iloc[0]
+                        matched_person = self.df_civil.iloc[position]
                         
                         # Continue with family/asset checks using the AI-matched identity
                         family_id = matched_person.get('family_id')
                         if family_id:
-                            family_members = self.df_civil[self.df_civil['family_id'] == family_id]
+                            family_members = self._family_members(family_id)
                         else:
                             family_members = pd.DataFrame([matched_person])
                         
                         family_names = family_members['name'].tolist()
-                        flags, risk_score = self._check_family_assets(family_members)
+                        flags, risk_score = self._household_assets(family_id, family_members)
                         
                         if risk_score >= 50:
                             status = "CRITICAL FRAUD"
@@ -290,6 +501,7 @@ class LifestyleScanner:
                             "integrity_status": status,
                             "risk_score": risk_score,
                             "family_cluster": family_names,
+                            "extended_cluster": self._extended_cluster(matched_person, hop_limit),
                             "assets_detected": flags,
                             "system_message": message,
                             "match_type": "AI_MATCH",
@@ -303,4 +515,17 @@ class LifestyleScanner:
             logger.info("Splink not available, using basic scan")
         
         # Fallback to basic scan
-        return await self.scan(name, dob, address)
+        return await self.scan(name, dob, address, hop_limit)
+
+
+# Singleton scanner shared by all requests (registries load once per process)
+_lifestyle_scanner = None
+_lifestyle_scanner_lock = threading.Lock()
+
+def get_lifestyle_scanner() -> LifestyleScanner:
+    global _lifestyle_scanner
+    if _lifestyle_scanner is None:
+        with _lifestyle_scanner_lock:
+            if _lifestyle_scanner is None:
+                _lifestyle_scanner = LifestyleScanner()
+    return _lifestyle_scanner
@@ -0,0 +1,265 @@
+"""
+Lifestyle Scanner Indexes
+Lookup structures built once when the reference registries load, so
+per-request identity resolution does not scan the whole civil registry.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.lifestyle_registry import decoded
+
+
+class NameIndex:
+    """
+    Lowercase-name index over the civil registry.
+
+    - Exact match: hash map of lowercase name -> first row position, O(1)
+    - Prefix match: sorted array of lowercase names bisected to the range
+      of names starting with the prefix, O(log n)
+    - Fuzzy match: token postings (token -> rows containing it) plus a
+      symmetric-delete index over the token vocabulary, so only rows
+      sharing a token (or, when no exact-word match scores, a token
+      within max_edit_distance) with the query are scored
+
+    All lookups return the earliest registry row among equally good
+    matches, which is the same row a full scan in registry order returns.
+    """
+
+    def __init__(self, names: Iterable, max_edit_distance: int = 1, min_fuzzy_token_length: int = 4):
+        lowered = [name.lower() if isinstance(name, str) else None for name in names]
+        self.max_edit_distance = max_edit_distance
+        self.min_fuzzy_token_length = min_fuzzy_token_length
+
+        self._exact: Dict[str, int] = {}
+        for position, name in enumerate(lowered):
+            if name is not None and name not in self._exact:
+                self._exact[name] = position
+
+        indexed = [(name, position) for position, name in enumerate(lowered) if name is not None]
+        indexed.sort()
+        self._sorted_names = [name for name, _ in indexed]
+        self._sorted_positions = np.array([position for _, position in indexed], dtype=np.int64)
+
+        # Token postings, in registry order
+        self._row_tokens: List[frozenset] = []
+        self._postings: Dict[str, List[int]] = {}
+        for position, name in enumerate(lowered):
+            tokens = frozenset(name.split()) if name else frozenset()
+            self._row_tokens.append(tokens)
+            for token in tokens:
+                self._postings.setdefault(token, []).append(position)
+
+        # Symmetric-delete index: delete-variant -> vocabulary tokens
+        self._deletes: Dict[str, Set[str]] = {}
+        if max_edit_distance > 0:
+            for token in self._postings:
+                if len(token) >= min_fuzzy_token_length:
+                    for variant in _deletes(token, max_edit_distance):
+                        self._deletes.setdefault(variant, set()).add(token)
+
+    def __len__(self) -> int:
+        return len(self._sorted_names)
+
+    def exact(self, clean_name: str) -> Optional[int]:
+        """Row position of the first citizen whose lowercase name equals clean_name."""
+        return self._exact.get(clean_name)
+
+    def prefix(self, clean_prefix: str) -> Optional[int]:
+        """Row position of the first citizen whose lowercase name starts with clean_prefix."""
+        if not clean_prefix:
+            return None
+
+        start = bisect_left(self._sorted_names, clean_prefix)
+        # Smallest string greater than every string with this prefix
+        upper = clean_prefix[:-1] + chr(ord(clean_prefix[-1]) + 1)
+        end = bisect_left(self._sorted_names, upper, lo=start)
+
+        if start == end:
+            return None
+        return int(self._sorted_positions[start:end].min())
+
+    def _similar_tokens(self, token: str) -> Set[str]:
+        """Vocabulary tokens equal to token or within max_edit_distance of it."""
+        similar = {token} if token in self._postings else set()
+        if self.max_edit_distance == 0 or len(token) < self.min_fuzzy_token_length:
+            return similar
+
+        for variant in _deletes(token, self.max_edit_distance):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate not in similar and _edit_distance(token, candidate) <= self.max_edit_distance:
+                    similar.add(candidate)
+        return similar
+
+    def fuzzy(self, clean_name: str, threshold: float = 0.5) -> Tuple[Optional[int], float, int]:
+        """
+        Best word-overlap match for clean_name.
+
+        Score is overlap / max(len(query words), len(name words)). Names are
+        first scored on exact word overlap; only if none scores above
+        threshold does a query word also overlap a name containing a word
+        within max_edit_distance of it. Among typo matches, ties go to the
+        name with more exact word overlap. Only scores above threshold count.
+
+        Returns:
+            Tuple of (row position or None, best score, candidates examined)
+        """
+        query_tokens = set(clean_name.split())
+        if not query_tokens:
+            return None, 0.0, 0
+
+        exact = {token: {token} & self._postings.keys() for token in query_tokens}
+        position, score, examined = self._best_overlap(query_tokens, exact, exact, threshold)
+        if position is not None or self.max_edit_distance == 0:
+            return position, score, examined
+
+        # No exact-word match: allow misspelled query words
+        expansions = {token: self._similar_tokens(token) for token in query_tokens}
+        position, score, typo_examined = self._best_overlap(query_tokens, expansions, exact, threshold)
+        return position, score, examined + typo_examined
+
+    def _best_overlap(self, query_tokens: Set[str], expansions: Dict[str, Set[str]],
+                      exact: Dict[str, Set[str]], threshold: float) -> Tuple[Optional[int], float, int]:
+        """Highest-scoring row sharing a token from expansions, ranked by (score, exact score)."""
+        candidates = set()
+        for similar in expansions.values():
+            for token in similar:
+                candidates.update(self._postings[token])
+
+        best_position, best_rank = None, (0.0, 0.0)
+        for position in sorted(candidates):
+            name_tokens = self._row_tokens[position]
+            denominator = max(len(query_tokens), len(name_tokens))
+            overlap = min(sum(1 for similar in expansions.values() if similar & name_tokens), len(name_tokens))
+            exact_overlap = sum(1 for token in exact.values() if token & name_tokens)
+            rank = (overlap / denominator, exact_overlap / denominator)
+
+            if rank > best_rank and rank[0] > threshold:
+                best_rank = rank
+                best_position = position
+
+        return best_position, best_rank[0], len(candidates)
+
+
+class FamilyIndex:
+    """
+    family_id -> member row positions, stored CSR-style.
+
+    Row positions are sorted by family (stably, so members keep registry
+    order) into one array; offsets[slot]:offsets[slot + 1] is a family's
+    slice. Expanding a household costs O(household size), not a mask over
+    the whole registry.
+    """
+
+    def __init__(self, family_ids: Iterable):
+        codes, uniques = pd.factorize(pd.Series(list(family_ids), dtype=object))
+        valid = codes >= 0
+
+        order = np.argsort(codes, kind='stable')
+        self._positions = order[valid[order]].astype(np.int64)
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._slots: Dict[object, int] = {family_id: slot for slot, family_id in enumerate(uniques)}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def members(self, family_id) -> np.ndarray:
+        """Row positions of a family's members in registry order (empty if unknown)."""
+        slot = self._slots.get(family_id)
+        if slot is None:
+            return self._positions[:0]
+        return self._positions[self._offsets[slot]:self._offsets[slot + 1]]
+
+
+def normalize_address(address) -> Optional[str]:
+    """Lowercase, whitespace-collapsed address key (None for blank/missing)."""
+    if not isinstance(address, str):
+        return None
+    normalized = ' '.join(address.lower().split())
+    return normalized or None
+
+
+class AssetIndex:
+    """
+    Keyed views of the Vahan and Discom registries.
+
+    - owner_id -> first registered vehicle model
+    - normalized address -> first electricity connection's average bill
+
+    Lookups take a whole family's column at once and resolve it with a
+    single vectorized map.
+    """
+
+    def __init__(self, df_vahan: pd.DataFrame, df_discom: pd.DataFrame):
+        self._vehicles: Dict[str, object] = {}
+        if not df_vahan.empty and 'owner_id' in df_vahan.columns:
+            models = df_vahan['vehicle_model'] if 'vehicle_model' in df_vahan.columns \
+                else pd.Series('Vehicle', index=df_vahan.index)
+            owners = decoded(df_vahan['owner_id']).astype(str)
+            first = ~owners.duplicated()
+            self._vehicles = dict(zip(owners[first], models[first]))
+
+        self._bills: Dict[str, object] = {}
+        if not df_discom.empty and 'address' in df_discom.columns:
+            bills = df_discom['avg_monthly_bill'] if 'avg_monthly_bill' in df_discom.columns \
+                else pd.Series(0, index=df_discom.index)
+            keys = decoded(df_discom['address']).map(normalize_address)
+            first = keys.notna() & ~keys.duplicated()
+            self._bills = dict(zip(keys[first], bills[first]))
+
+    def vehicle_models(self, owner_ids: pd.Series) -> pd.Series:
+        """Vehicle model per owner ID (NaN where the owner has no vehicle)."""
+        return decoded(owner_ids).astype(str).map(self._vehicles)
+
+    def monthly_bills(self, addresses: pd.Series) -> pd.Series:
+        """Average monthly bill per address (NaN where no connection matches)."""
+        return decoded(addresses).map(normalize_address).map(self._bills)
+
+    def has_vehicle(self, owner_id) -> bool:
+        return str(owner_id) in self._vehicles
+
+    def changed_owners(self, other: 'AssetIndex') -> Set[str]:
+        """Owner IDs whose vehicle differs between this index and other."""
+        return _changed_keys(self._vehicles, other._vehicles)
+
+    def changed_addresses(self, other: 'AssetIndex') -> Set[str]:
+        """Normalized addresses whose bill differs between this index and other."""
+        return _changed_keys(self._bills, other._bills)
+
+
+def _changed_keys(old: Dict, new: Dict) -> Set:
+    """Keys added, removed or mapped to a different value."""
+    changed = set(old.keys() ^ new.keys())
+    changed.update(key for key in old.keys() & new.keys() if old[key] != new[key])
+    return changed
+
+
+def _deletes(token: str, max_distance: int) -> Set[str]:
+    """All strings reachable from token by up to max_distance deletions."""
+    variants = {token}
+    frontier = {token}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between a and b."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
@@ -0,0 +1,107 @@
+"""
+Compact Registry Frames
+Dictionary-encoded in-memory layout for the lifestyle reference registries.
+
+Object-dtype string cells cost a Python object each (tens of bytes before
+the characters), which does not scale to a state-level civil registry per
+worker. Repeated values (family IDs, addresses, dates of birth, relations,
+vehicle models) are stored as categoricals, mostly-unique strings as Arrow
+strings when pyarrow is available, and family_id / unique_id also get
+int32 codes. The lowercase name used for matching is computed once at load.
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Columns with few distinct values relative to rows
+CIVIL_CATEGORICAL = ['family_id', 'address', 'dob', 'relation']
+VAHAN_CATEGORICAL = ['vehicle_model']
+DISCOM_CATEGORICAL = []
+
+
+def _string_dtype():
+    """Arrow-backed strings if pyarrow is installed, else pandas' default."""
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype()
+
+
+def _compact(df: pd.DataFrame, categorical: Iterable[str]) -> pd.DataFrame:
+    """Categoricals for the given columns, compact strings for other text columns."""
+    df = df.copy()
+    categorical = set(categorical)
+    string_dtype = _string_dtype()
+    for column in df.columns:
+        if column in categorical:
+            df[column] = df[column].astype('category')
+        elif pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype(string_dtype)
+    return df
+
+
+def compact_civil(df_civil: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compact civil registry.
+
+    Adds name_lower (lowercased, stripped name), family_code and
+    unique_code (int32 codes; -1 for a missing family_id).
+    """
+    if df_civil.empty:
+        return df_civil
+
+    df = _compact(df_civil, [c for c in CIVIL_CATEGORICAL if c in df_civil.columns])
+    if 'name' in df.columns:
+        df['name_lower'] = df['name'].str.lower().str.strip()
+    if 'family_id' in df.columns:
+        df['family_code'] = df['family_id'].cat.codes.astype(np.int32)
+    if 'unique_id' in df.columns:
+        codes, _ = pd.factorize(df['unique_id'])
+        df['unique_code'] = codes.astype(np.int32)
+    return df
+
+
+def compact_vahan(df_vahan: pd.DataFrame) -> pd.DataFrame:
+    if df_vahan.empty:
+        return df_vahan
+    return _compact(df_vahan, [c for c in VAHAN_CATEGORICAL if c in df_vahan.columns])
+
+
+def compact_discom(df_discom: pd.DataFrame) -> pd.DataFrame:
+    if df_discom.empty:
+        return df_discom
+    return _compact(df_discom, [c for c in DISCOM_CATEGORICAL if c in df_discom.columns])
+
+
+def decoded(values: pd.Series) -> pd.Series:
+    """Plain-valued copy of a categorical series (unchanged otherwise)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(values.cat.categories.dtype)
+    return values
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> Dict[str, object]:
+    """
+    Deep memory use of the registry frames.
+
+    Returns:
+        Dict with bytes per frame, total bytes, and civil registry bytes
+        per citizen and MB per million citizens
+    """
+    frame_bytes = {
+        name: int(df.memory_usage(deep=True).sum()) for name, df in frames.items()
+    }
+    citizens = len(frames.get('civil', []))
+    civil_bytes = frame_bytes.get('civil', 0)
+    per_citizen = civil_bytes / citizens if citizens else 0.0
+
+    return {
+        'frame_bytes': frame_bytes,
+        'total_bytes': sum(frame_bytes.values()),
+        'citizens': citizens,
+        'bytes_per_citizen': round(per_citizen, 1),
+        'mb_per_million_citizens': round(per_citizen * 1_000_000 / (1024 * 1024), 1)
+    }
@@ -17,6 +17,7 @@ from datetime import datetime, timezone
 
 from core.logging import get_logger
 from services.welfare_ml_model import WelfareFraudModel
+from services.welfare_features import get_feature_store
 
 logger = get_logger("services.welfare")
 
@@ -26,9 +27,11 @@ _ml_model = None
 def get_ml_model() -> WelfareFraudModel:
     global _ml_model
     if _ml_model is None:
+        # WELFARE_MODEL_VARIANT=student selects the distilled lightweight model
+        variant = os.environ.get('WELFARE_MODEL_VARIANT', 'ensemble')
         _ml_model = WelfareFraudModel()
-        _ml_model.load_model()
-        logger.info("Welfare ML model loaded and cached")
+        _ml_model.load_model(variant=variant)
+        logger.info(f"Welfare ML model loaded and cached (variant: {_ml_model.variant})")
     return _ml_model
 
 # Data paths
@@ -210,25 +213,45 @@ class WelfareChecker:
         Returns:
             Scan result with risk status and flags
         """
+        # Prepare data for ML prediction
+        ml_input = {
+            'declared_income': applicant.get('Declared_Income', applicant.get('declared_income', 0)),
+            'dob': applicant.get('DOB', applicant.get('dob', '1990-01-01')),
+            'address': applicant.get('Address', applicant.get('address', '')),
+            'asset_flag': applicant.get('Asset_Flag', applicant.get('asset_flag', 'Standard'))
+        }
+        
         try:
             # Use cached singleton ML model
-            ml_model = get_ml_model()
-            
-            # Prepare data for ML prediction
-            ml_input = {
-                'declared_income': applicant.get('Declared_Income', applicant.get('declared_income', 0)),
-                'dob': applicant.get('DOB', applicant.get('dob', '1990-01-01')),
-                'address': applicant.get('Address', applicant.get('address', '')),
-                'asset_flag': applicant.get('Asset_Flag', applicant.get('asset_flag', 'Standard'))
+            ml_result = get_ml_model().predict(ml_input)
+        except Exception as e:
+            logger.warning(f"ML model error: {str(e)}. Falling back to traditional checks.")
+            ml_result = None
+        
+        return self._build_scan_result(applicant, ml_input['declared_income'], ml_result)
+    
+    def _build_scan_result(
+        self,
+        applicant: Dict[str, Any],
+        declared_income: float,
+        ml_result: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Combine an ML prediction with the Vahan/Discom checks.
+        
+        A missing ml_result means the ML model failed; the applicant then
+        starts green and only the traditional checks can flag them.
+        """
+        flags = []
+        
+        if ml_result is None:
+            # Fallback to traditional checks
+            ml_result = {
+                'fraud_probability': 0.0,
+                'risk_status': 'green',
+                'risk_level': 'LOW'
             }
-            
-            # Get ML prediction
-            ml_result = ml_model.predict(ml_input)
-            
-            # Use ML model's risk assessment as primary
-            risk_status = ml_result['risk_status']
-            flags = []
-            
+        else:
             # Add ML-detected flags
             for ml_flag in ml_result.get('flags', []):
                 flags.append({
@@ -237,18 +260,9 @@ class WelfareChecker:
                     'reason': ml_flag['details'],
                     'source': 'ML Model'
                 })
-            
-        except Exception as e:
-            logger.warning(f"ML model error: {str(e)}. Falling back to traditional checks.")
-            
-            # Fallback to traditional checks
-            ml_result = {
-                'fraud_probability': 0.0,
-                'risk_status': 'green',
-                'risk_level': 'LOW'
-            }
-            risk_status = 'green'
-            flags = []
+        
+        # Use ML model's risk assessment as primary
+        risk_status = ml_result['risk_status']
         
         # Traditional checks as secondary validation
         applicant_identity = {
@@ -268,7 +282,7 @@ class WelfareChecker:
             "applicant_id": str(applicant.get('ID', applicant.get('applicant_id', ''))),
             "name": applicant.get('Name', applicant.get('name', '')),
             "address": applicant.get('Address', applicant.get('address', '')),
-            "declared_income": ml_input['declared_income'],
+            "declared_income": declared_income,
             "risk_status": risk_status,
             "flags": flags,
             "fraud_probability": ml_result['fraud_probability'],
@@ -277,10 +291,43 @@ class WelfareChecker:
             "feature_values": ml_result.get('feature_values', {})
         }
     
+    def _applicant_frame(self) -> pd.DataFrame:
+        """
+        Applicants with the feature store's column names.
+        
+        Accepts both the lowercase CSV headers and the legacy capitalized
+        ones (ID, Name, Address, Declared_Income, DOB, Asset_Flag).
+        """
+        df = self.applicants_df.rename(columns={
+            'ID': 'applicant_id',
+            'Name': 'name',
+            'Address': 'address',
+            'Declared_Income': 'declared_income',
+            'DOB': 'dob',
+            'Asset_Flag': 'asset_flag'
+        })
+        defaults = {
+            'applicant_id': '',
+            'name': '',
+            'address': '',
+            'declared_income': 0,
+            'dob': '1990-01-01',
+            'asset_flag': 'Standard'
+        }
+        for column, default in defaults.items():
+            if column not in df.columns:
+                df[column] = default
+            else:
+                df[column] = df[column].fillna(default)
+        return df
+    
     async def analyze_all_applicants(self) -> List[Dict[str, Any]]:
         """
         Analyze all applicants from the welfare applicants database.
         
+        ML features come from the persisted feature store (recomputed only
+        for changed applicants) and are scored in one batch.
+        
         Returns:
             List of scan results for all applicants
         """
@@ -290,16 +337,28 @@ class WelfareChecker:
             logger.warning("No applicants data available")
             return results
         
-        for _, row in self.applicants_df.iterrows():
+        applicants = self._applicant_frame()
+        
+        try:
+            ml_model = get_ml_model()
+            store = get_feature_store()
+            store.refresh(applicants)
+            ml_results = ml_model.predict_batch(
+                store.matrix(ml_model.feature_names),
+                applicants['asset_flag'].tolist()
+            )
+        except Exception as e:
+            logger.warning(f"ML model error: {str(e)}. Falling back to traditional checks.")
+            ml_results = [None] * len(applicants)
+        
+        for record, ml_result in zip(applicants.to_dict('records'), ml_results):
             applicant = {
-                'ID': row.get('ID', ''),
-                'Name': row.get('Name', ''),
-                'Address': row.get('Address', ''),
-                'Declared_Income': row.get('Declared_Income', 0)
+                'ID': record['applicant_id'],
+                'Name': record['name'],
+                'Address': record['address'],
+                'Declared_Income': record['declared_income']
             }
-            
-            result = await self.scan_applicant(applicant)
-            results.append(result)
+            results.append(self._build_scan_result(applicant, record['declared_income'], ml_result))
         
         logger.info(f"Analyzed {len(results)} applicants")
         return results
@@ -0,0 +1,194 @@
+"""
+Applicant Feature Store
+Persisted engineered features for welfare applicants, keyed by applicant ID.
+
+Bulk analysis used to recompute income level, asset risk score, address
+complexity and income-asset mismatch from raw fields for the whole
+population on every run. The store keeps those features as a float32
+matrix next to a fingerprint of the raw fields they came from, and only
+recomputes rows whose fingerprint changed. Age is not stored; it is derived
+from a stored DOB ordinal at scoring time so it never goes stale.
+"""
+
+import os
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.logging import get_logger
+from services.welfare_ml_model import MODEL_DIR, ASSET_RISK_MAP
+
+logger = get_logger("services.welfare_features")
+
+FEATURE_STORE_PATH = MODEL_DIR / 'applicant_features.npz'
+
+# Raw fields that feed the engineered features
+SOURCE_COLUMNS = ['declared_income', 'dob', 'address', 'asset_flag']
+
+# Stored feature columns (age is computed at scoring time)
+STORED_FEATURES = ['income_level', 'asset_risk_score', 'address_complexity', 'income_asset_mismatch']
+
+INCOME_LEVEL_BINS = [1000000, 2000000, 3000000, 4000000]
+DEFAULT_DOB = '1990-01-01'
+
+
+def compute_features(applicants: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Vectorized feature engineering, matching WelfareFraudModel.predict().
+
+    Args:
+        applicants: DataFrame with SOURCE_COLUMNS
+
+    Returns:
+        Dict with a float32 'features' matrix (STORED_FEATURES order) and
+        an int32 'dob_ordinal' array
+    """
+    income = pd.to_numeric(applicants['declared_income'], errors='coerce').fillna(0).to_numpy()
+    income_level = np.digitize(income, INCOME_LEVEL_BINS)
+
+    asset_risk_score = (
+        applicants['asset_flag'].map(ASSET_RISK_MAP).fillna(0).to_numpy()
+    )
+    address_complexity = applicants['address'].fillna('').astype(str).str.count(',').to_numpy()
+    income_asset_mismatch = np.maximum(0, asset_risk_score - income_level * asset_risk_score)
+
+    dob = pd.to_datetime(applicants['dob'], errors='coerce').fillna(pd.Timestamp(DEFAULT_DOB))
+    dob_ordinal = np.array([d.toordinal() for d in dob.dt.date], dtype=np.int32)
+
+    features = np.column_stack([
+        income_level, asset_risk_score, address_complexity, income_asset_mismatch
+    ]).astype(np.float32)
+
+    return {'features': features, 'dob_ordinal': dob_ordinal}
+
+
+def fingerprint(applicants: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of each row's raw source fields."""
+    return pd.util.hash_pandas_object(
+        applicants[SOURCE_COLUMNS].astype(str), index=False
+    ).to_numpy(dtype=np.uint64)
+
+
+class ApplicantFeatureStore:
+    """
+    File-backed feature store keyed by applicant ID.
+
+    Arrays are kept aligned by row: applicant_ids, fingerprints,
+    dob_ordinals and a (n, 4) float32 feature matrix.
+    """
+
+    def __init__(self, path=FEATURE_STORE_PATH):
+        self.path = path
+        self.applicant_ids = np.array([], dtype=str)
+        self.fingerprints = np.array([], dtype=np.uint64)
+        self.dob_ordinals = np.array([], dtype=np.int32)
+        self.features = np.empty((0, len(STORED_FEATURES)), dtype=np.float32)
+        self._positions: Dict[str, int] = {}
+        self.load()
+
+    def load(self):
+        """Load the store from disk if it exists."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self.applicant_ids = data['applicant_ids']
+                self.fingerprints = data['fingerprints']
+                self.dob_ordinals = data['dob_ordinals']
+                self.features = data['features']
+            self._reindex()
+            logger.info(f"Loaded feature store: {len(self.applicant_ids)} applicants")
+        except Exception as e:
+            logger.warning(f"Could not load feature store, rebuilding: {e}")
+
+    def save(self):
+        """Write the store atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                applicant_ids=self.applicant_ids,
+                fingerprints=self.fingerprints,
+                dob_ordinals=self.dob_ordinals,
+                features=self.features
+            )
+        os.replace(tmp_path, self.path)
+
+    def _reindex(self):
+        self._positions = {applicant_id: i for i, applicant_id in enumerate(self.applicant_ids)}
+
+    def refresh(self, applicants: pd.DataFrame) -> int:
+        """
+        Bring the store in line with the given applicants.
+
+        Features are recomputed only for new applicants and applicants whose
+        source fields changed; applicants no longer present are dropped.
+
+        Args:
+            applicants: DataFrame with 'applicant_id' and SOURCE_COLUMNS
+
+        Returns:
+            Number of applicants whose features were recomputed
+        """
+        ids = applicants['applicant_id'].astype(str).to_numpy(dtype=str)
+        new_fingerprints = fingerprint(applicants)
+
+        stored = np.array([self._positions.get(applicant_id, -1) for applicant_id in ids], dtype=np.int64)
+        known = stored >= 0
+        unchanged = known.copy()
+        unchanged[known] = self.fingerprints[stored[known]] == new_fingerprints[known]
+        stale = ~unchanged
+
+        features = np.empty((len(ids), len(STORED_FEATURES)), dtype=np.float32)
+        dob_ordinals = np.empty(len(ids), dtype=np.int32)
+        features[unchanged] = self.features[stored[unchanged]]
+        dob_ordinals[unchanged] = self.dob_ordinals[stored[unchanged]]
+
+        if stale.any():
+            computed = compute_features(applicants[stale])
+            features[stale] = computed['features']
+            dob_ordinals[stale] = computed['dob_ordinal']
+
+        changed = bool(stale.any()) or len(ids) != len(self.applicant_ids)
+        self.applicant_ids = ids
+        self.fingerprints = new_fingerprints
+        self.dob_ordinals = dob_ordinals
+        self.features = features
+        self._reindex()
+
+        if changed:
+            self.save()
+
+        recomputed = int(stale.sum())
+        logger.info(f"Feature store refreshed: {recomputed} of {len(ids)} applicants recomputed")
+        return recomputed
+
+    def matrix(self, feature_names, today: Optional[date] = None) -> np.ndarray:
+        """
+        Ready-made float32 model input for every stored applicant.
+
+        Args:
+            feature_names: Model feature order (WelfareFraudModel.feature_names)
+            today: Reference date for age (defaults to today)
+
+        Returns:
+            (n, len(feature_names)) float32 matrix in store row order
+        """
+        today = today or date.today()
+        age = ((today.toordinal() - self.dob_ordinals) / 365.25).astype(np.float32)
+
+        columns = {name: self.features[:, i] for i, name in enumerate(STORED_FEATURES)}
+        columns['age'] = age
+        return np.column_stack([columns[name] for name in feature_names]).astype(np.float32, copy=False)
+
+
+# Singleton store shared by bulk analysis
+_feature_store = None
+
+def get_feature_store() -> ApplicantFeatureStore:
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = ApplicantFeatureStore()
+    return _feature_store
@@ -9,12 +9,19 @@ Model: Scikit-learn Random Forest + XGBoost ensemble
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import (
+    RandomForestClassifier, GradientBoostingClassifier, GradientBoostingRegressor,
+    HistGradientBoostingClassifier
+)
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import xgboost as xgb
 import joblib
 import os
+import pickle
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -25,8 +32,37 @@ MODEL_DIR.mkdir(exist_ok=True)
 
 FINANCIAL_DATA = DATA_DIR / 'financial_intelligence.csv'
 MODEL_PATH = MODEL_DIR / 'welfare_fraud_model.pkl'
+STUDENT_MODEL_PATH = MODEL_DIR / 'welfare_fraud_student.pkl'
 SCALER_PATH = MODEL_DIR / 'scaler.pkl'
 
+# Model variants the service can select (see WELFARE_MODEL_VARIANT)
+ENSEMBLE_VARIANT = 'ensemble'
+STUDENT_VARIANT = 'student'
+
+# Asset flag -> risk score
+ASSET_RISK_MAP = {
+    'Property > 50L': 4,
+    'Luxury Car': 3,
+    'Mutual Funds > 5L': 2,
+    'Standard': 0
+}
+
+# Columns of financial_intelligence.csv used for training
+TRAINING_COLUMNS = ['dob', 'address', 'tax_filing_income', 'asset_flag']
+
+# Rule cascade: cells of (asset_risk_score, income_level) whose ensemble
+# probability is constant on the training set are answered without the model
+CASCADE_KEY_COLUMNS = ('asset_risk_score', 'income_level')
+CASCADE_KEY_SIZE = 5  # both keys take values 0-4
+RISK_THRESHOLDS = [0.4, 0.5, 0.7]
+
+# Streaming training keeps a reservoir of budget / headroom bytes. The
+# factor is the measured tracemalloc peak of the whole pipeline (CSV
+# chunk, split and scaled copies, both learners and the fitted forest)
+# per reservoir byte, with one forest worker plus a safety margin (about
+# 11x at scale; fixed overhead dominates budgets below ~4 MB).
+STREAMING_MEMORY_HEADROOM = 16
+
 
 class WelfareFraudModel:
     """Machine learning model for welfare fraud detection."""
@@ -35,6 +71,10 @@ class WelfareFraudModel:
         self.model = None
         self.scaler = None
         self.feature_names = None
+        self.student_model = None
+        self.variant = ENSEMBLE_VARIANT
+        self.cascade = None
+        self._cascade_table = None
         self.trained = False
         
     def load_training_data(self):
@@ -50,8 +90,17 @@ class WelfareFraudModel:
         
         return df
     
-    def engineer_features(self, df):
-        """Create features from the financial intelligence data."""
+    def engineer_features(self, df, asset_risk_max=None, verbose=True):
+        """
+        Create features from the financial intelligence data.
+        
+        Args:
+            df: Raw financial intelligence rows
+            asset_risk_max: Scale for income_asset_mismatch; defaults to the
+                highest asset_risk_score in df. Pass a fixed value when
+                engineering chunk by chunk so every chunk agrees.
+            verbose: Print the fraud distribution
+        """
         df_processed = df.copy()
         
         # Income features
@@ -65,13 +114,7 @@ class WelfareFraudModel:
         df_processed['age'] = (datetime.now() - df_processed['dob']).dt.days / 365.25
         
         # Asset risk scoring
-        asset_risk_map = {
-            'Property > 50L': 4,
-            'Luxury Car': 3,
-            'Mutual Funds > 5L': 2,
-            'Standard': 0
-        }
-        df_processed['asset_risk_score'] = df_processed['asset_flag'].map(asset_risk_map).fillna(0)
+        df_processed['asset_risk_score'] = df_processed['asset_flag'].map(ASSET_RISK_MAP).fillna(0)
         
         # Address complexity (number of commas = more complex address structure)
         df_processed['address_complexity'] = df_processed['address'].str.count(',')
@@ -83,14 +126,17 @@ class WelfareFraudModel:
         ).astype(int)
         
         # Additional risk indicators
+        if asset_risk_max is None:
+            asset_risk_max = df_processed['asset_risk_score'].max()
         df_processed['income_asset_mismatch'] = (
             df_processed['asset_risk_score'] - 
-            (df_processed['income_level'] * df_processed['asset_risk_score'].max())
+            (df_processed['income_level'] * asset_risk_max)
         ).clip(lower=0)
         
-        print(f"\nFraud distribution in training data:")
-        print(df_processed['is_fraud'].value_counts())
-        print(f"Fraud rate: {df_processed['is_fraud'].mean()*100:.2f}%")
+        if verbose:
+            print(f"\nFraud distribution in training data:")
+            print(df_processed['is_fraud'].value_counts())
+            print(f"Fraud rate: {df_processed['is_fraud'].mean()*100:.2f}%")
         
         return df_processed
     
@@ -110,8 +156,18 @@ class WelfareFraudModel:
         self.feature_names = feature_cols
         return X, y
     
-    def train(self):
-        """Train the ensemble model on financial intelligence data."""
+    def train(self, distill=False, student_trees=8, student_max_depth=3, max_auc_drop=0.01):
+        """
+        Train the ensemble model on financial intelligence data.
+        
+        Args:
+            distill: Also fit a lightweight student model to the ensemble's
+                probabilities and save it as an alternative artifact
+            student_trees: Number of boosting stages in the student
+            student_max_depth: Depth of each student tree
+            max_auc_drop: Largest ROC-AUC loss (vs. the ensemble) at which
+                the student is still saved
+        """
         print("\n" + "="*70)
         print("TRAINING WELFARE FRAUD DETECTION MODEL")
         print("="*70)
@@ -156,10 +212,197 @@ class WelfareFraudModel:
         rf_model.fit(X_train_scaled, y_train)
         gb_model.fit(X_train_scaled, y_train)
         
+        return self._finalize_training(
+            rf_model, gb_model, X_train, X_train_scaled, X_test, X_test_scaled, y_test,
+            distill=distill,
+            student_trees=student_trees,
+            student_max_depth=student_max_depth,
+            max_auc_drop=max_auc_drop
+        )
+    
+    def train_streaming(self, chunksize=100_000, memory_budget_mb=1024, n_jobs=-1,
+                        csv_path=None, distill=False):
+        """
+        Out-of-core, multi-core variant of train() for large feeds.
+        
+        Streams the CSV in chunks through engineer_features into float32
+        arrays, keeping at most memory_budget_mb / STREAMING_MEMORY_HEADROOM
+        of rows (a uniform reservoir sample once the feed is larger). The
+        random forest is built with n_jobs workers and a histogram-based
+        boosting learner replaces GradientBoostingClassifier; both learners
+        are trained concurrently.
+        
+        The headroom factor was measured with one forest worker; each extra
+        worker needs more working memory, so the measured peak is reported
+        against the budget rather than assumed.
+        
+        Args:
+            chunksize: Rows read per CSV chunk (at most the reservoir size)
+            memory_budget_mb: Memory budget for the whole pipeline
+            n_jobs: Worker threads for forest building (-1 = all cores)
+            csv_path: Training CSV (defaults to financial_intelligence.csv)
+            distill: Also build the distilled student model
+        
+        Returns:
+            Training metrics plus a 'pipeline' entry with per-stage timings
+            and peak memory
+        """
+        csv_path = csv_path or FINANCIAL_DATA
+        budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        
+        print("\n" + "="*70)
+        print("TRAINING WELFARE FRAUD DETECTION MODEL (STREAMING)")
+        print("="*70)
+        
+        stages = {}
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        
+        def run_stage(name, fn):
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            result = fn()
+            stages[name] = {
+                'seconds': time.perf_counter() - start,
+                'peak_memory_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            }
+            print(f"  {name:12s} {stages[name]['seconds']:8.2f}s  peak {stages[name]['peak_memory_mb']:8.1f} MB")
+            return result
+        
+        try:
+            reservoir_bytes = budget_bytes // STREAMING_MEMORY_HEADROOM
+            X, y, rows_seen = run_stage(
+                'ingest', lambda: self._stream_features(csv_path, chunksize, reservoir_bytes))
+            print(f"Streamed {rows_seen:,} rows, kept {len(X):,} for training")
+            
+            X_train, X_test, y_train, y_test = run_stage('split', lambda: train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            ))
+            del X, y
+            
+            # Named frames so the scaler accepts the DataFrames predict() builds
+            X_train = pd.DataFrame(X_train, columns=self.feature_names, copy=False)
+            X_test = pd.DataFrame(X_test, columns=self.feature_names, copy=False)
+            
+            self.scaler = StandardScaler()
+            X_train_scaled = run_stage('scale', lambda: self.scaler.fit_transform(X_train).astype(np.float32, copy=False))
+            X_test_scaled = self.scaler.transform(X_test).astype(np.float32, copy=False)
+            
+            rf_model = RandomForestClassifier(
+                n_estimators=200,
+                max_depth=15,
+                min_samples_split=10,
+                min_samples_leaf=5,
+                random_state=42,
+                class_weight='balanced',
+                n_jobs=n_jobs
+            )
+            gb_model = HistGradientBoostingClassifier(
+                max_iter=150,
+                max_depth=7,
+                learning_rate=0.1,
+                random_state=42
+            )
+            
+            def fit_both():
+                # Both learners release the GIL in their tree builders
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    rf_future = pool.submit(rf_model.fit, X_train_scaled, y_train)
+                    gb_future = pool.submit(gb_model.fit, X_train_scaled, y_train)
+                    rf_future.result()
+                    gb_future.result()
+                # Parallel dispatch only pays off for building; single-row
+                # scoring is faster sequential
+                rf_model.set_params(n_jobs=None)
+            
+            print("\nTraining Random Forest and Histogram Gradient Boosting concurrently...")
+            run_stage('fit', fit_both)
+            
+            metrics = run_stage('finalize', lambda: self._finalize_training(
+                rf_model, gb_model, X_train, X_train_scaled, X_test, X_test_scaled, y_test,
+                distill=distill
+            ))
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        
+        peak_mb = max(stage['peak_memory_mb'] for stage in stages.values())
+        metrics['pipeline'] = {
+            'rows_streamed': rows_seen,
+            'rows_trained': len(X_train) + len(X_test),
+            'stages': stages,
+            'total_seconds': sum(stage['seconds'] for stage in stages.values()),
+            'peak_memory_mb': peak_mb,
+            'memory_budget_mb': memory_budget_mb,
+            'within_budget': peak_mb <= memory_budget_mb
+        }
+        if peak_mb > memory_budget_mb:
+            print(f"⚠️  Peak memory {peak_mb:.1f} MB exceeded the {memory_budget_mb} MB budget")
+        return metrics
+    
+    def _stream_features(self, csv_path, chunksize, max_bytes):
+        """
+        Read csv_path in chunks into float32 feature / int8 target arrays.
+        
+        Keeps at most max_bytes of rows; beyond that a uniform reservoir
+        sample (Algorithm R, vectorized per chunk) is maintained. Chunks
+        are no larger than the reservoir, so parsing memory scales with it.
+        
+        Returns:
+            Tuple of (X, y, rows_seen)
+        """
+        n_features = 5
+        row_bytes = n_features * np.dtype(np.float32).itemsize + np.dtype(np.int8).itemsize
+        capacity = max(1, max_bytes // row_bytes)
+        chunksize = min(chunksize, capacity)
+        
+        X = np.empty((min(capacity, chunksize), n_features), dtype=np.float32)
+        y = np.empty(len(X), dtype=np.int8)
+        filled = 0
+        rows_seen = 0
+        rng = np.random.default_rng(42)
+        asset_risk_max = max(ASSET_RISK_MAP.values())
+        
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, usecols=TRAINING_COLUMNS):
+            processed = self.engineer_features(chunk, asset_risk_max=asset_risk_max, verbose=False)
+            X_chunk, y_chunk = self.prepare_features(processed)
+            X_chunk = X_chunk.to_numpy(dtype=np.float32)
+            y_chunk = y_chunk.to_numpy(dtype=np.int8)
+            
+            # Fill free slots first
+            take = min(capacity - filled, len(X_chunk))
+            if take > 0:
+                if filled + take > len(X):
+                    new_size = min(capacity, max(filled + take, 2 * len(X)))
+                    X = np.resize(X, (new_size, n_features))
+                    y = np.resize(y, new_size)
+                X[filled:filled + take] = X_chunk[:take]
+                y[filled:filled + take] = y_chunk[:take]
+                filled += take
+            
+            # Then replace reservoir slots with decreasing probability
+            rest = len(X_chunk) - take
+            if rest > 0:
+                positions = rows_seen + take + np.arange(rest)
+                slots = (rng.random(rest) * (positions + 1)).astype(np.int64)
+                keep = slots < capacity
+                X[slots[keep]] = X_chunk[take:][keep]
+                y[slots[keep]] = y_chunk[take:][keep]
+            
+            rows_seen += len(X_chunk)
+        
+        return X[:filled], y[:filled], rows_seen
+    
+    def _finalize_training(self, rf_model, gb_model, X_train, X_train_scaled,
+                           X_test, X_test_scaled, y_test, distill=False,
+                           student_trees=8, student_max_depth=3, max_auc_drop=0.01):
+        """Evaluate fitted learners, fit the cascade, save and optionally distill."""
         # Store models as attributes for serialization
         self.rf_model = rf_model
         self.gb_model = gb_model
         self.model = {'rf': rf_model, 'gb': gb_model}
+        self.variant = ENSEMBLE_VARIANT
         
         # Evaluate with ensemble
         rf_pred_proba = rf_model.predict_proba(X_test_scaled)[:, 1]
@@ -196,27 +439,282 @@ class WelfareFraudModel:
         for idx, row in importance_df.iterrows():
             print(f"  {row['feature']:25s} {row['importance']:6.4f}")
         
+        # Rule cascade in front of the ensemble
+        self.fit_cascade(X_train, self._ensemble_proba(X_train_scaled))
+        cascade_report = self.evaluate_cascade(X_test)
+        
         # Save models
         print(f"\nSaving model to {MODEL_PATH}")
         joblib.dump({
             'rf_model': rf_model,
             'gb_model': gb_model,
             'scaler': self.scaler,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'cascade': self.cascade
         }, MODEL_PATH)
         
         self.trained = True
         print("\n✅ Model training complete!")
-        return {
+        metrics = {
             'accuracy': accuracy,
             'precision': precision,
             'recall': recall,
             'f1': f1,
-            'roc_auc': roc_auc
+            'roc_auc': roc_auc,
+            'cascade': cascade_report
+        }
+        
+        if distill:
+            metrics['distillation'] = self.distill(
+                X_train_scaled, X_test_scaled, y_test,
+                n_estimators=student_trees,
+                max_depth=student_max_depth,
+                max_auc_drop=max_auc_drop
+            )
+        
+        return metrics
+    
+    def distill(self, X_train_scaled, X_test_scaled, y_test,
+                n_estimators=8, max_depth=3, max_auc_drop=0.01):
+        """
+        Fit a small student model to the ensemble's fraud probabilities.
+        
+        The student is a handful of shallow regression trees trained on the
+        ensemble's soft labels, so it learns the ensemble's decision surface
+        rather than the raw target. It is saved to STUDENT_MODEL_PATH only if
+        its ROC-AUC is within max_auc_drop of the ensemble.
+        
+        Returns:
+            dict with agreement, AUC delta, size and latency ratios
+        """
+        from sklearn.metrics import roc_auc_score
+        
+        print("\n" + "-"*70)
+        print(f"DISTILLING STUDENT MODEL ({n_estimators} trees, depth {max_depth})")
+        print("-"*70)
+        
+        teacher_train = self._ensemble_proba(X_train_scaled)
+        student = GradientBoostingRegressor(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            learning_rate=0.5,
+            random_state=42
+        )
+        student.fit(X_train_scaled, teacher_train)
+        
+        teacher_test = self._ensemble_proba(X_test_scaled)
+        student_test = np.clip(student.predict(X_test_scaled), 0.0, 1.0)
+        
+        agreement = float(np.mean((teacher_test > 0.5) == (student_test > 0.5)))
+        teacher_auc = roc_auc_score(y_test, teacher_test)
+        student_auc = roc_auc_score(y_test, student_test)
+        mean_abs_diff = float(np.mean(np.abs(teacher_test - student_test)))
+        
+        teacher_bytes = len(pickle.dumps(self.model))
+        student_bytes = len(pickle.dumps(student))
+        
+        # Single-row latency is what the /scan endpoint pays per request
+        single_row = X_test_scaled[:1]
+        teacher_latency = self._time_call(lambda: self._ensemble_proba(single_row))
+        student_latency = self._time_call(lambda: student.predict(single_row))
+        
+        report = {
+            'agreement': agreement,
+            'teacher_auc': teacher_auc,
+            'student_auc': student_auc,
+            'auc_delta': student_auc - teacher_auc,
+            'mean_abs_prob_diff': mean_abs_diff,
+            'teacher_bytes': teacher_bytes,
+            'student_bytes': student_bytes,
+            'size_ratio': student_bytes / teacher_bytes,
+            'teacher_latency_ms': teacher_latency * 1000,
+            'student_latency_ms': student_latency * 1000,
+            'latency_ratio': student_latency / teacher_latency,
+            'saved': False
+        }
+        
+        print(f"Agreement:      {agreement:.4f}")
+        print(f"ROC-AUC:        {student_auc:.4f} (teacher {teacher_auc:.4f}, delta {report['auc_delta']:+.4f})")
+        print(f"Size:           {student_bytes:,} B vs {teacher_bytes:,} B ({report['size_ratio']:.4f}x)")
+        print(f"Latency (1 row): {report['student_latency_ms']:.3f} ms vs {report['teacher_latency_ms']:.3f} ms ({report['latency_ratio']:.4f}x)")
+        
+        if teacher_auc - student_auc > max_auc_drop:
+            print(f"⚠️  Student AUC drop exceeds {max_auc_drop:.4f}; not saving student model")
+            return report
+        
+        print(f"Saving student model to {STUDENT_MODEL_PATH}")
+        joblib.dump({
+            'student_model': student,
+            'scaler': self.scaler,
+            'feature_names': self.feature_names,
+            'cascade': self.cascade,
+            'distillation': report
+        }, STUDENT_MODEL_PATH)
+        report['saved'] = True
+        return report
+    
+    @staticmethod
+    def _time_call(fn, repeats=50):
+        """Average wall-clock seconds per call of fn."""
+        fn()  # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats
+    
+    def fit_cascade(self, X, ensemble_prob, tolerance=0.1, min_support=20):
+        """
+        Learn cheap rules for regions where the ensemble is certain.
+        
+        The training target is a deterministic rule on asset_risk_score and
+        income, so most (asset_risk_score, income_level) cells get a constant
+        ensemble probability. A cell becomes a rule when it has at least
+        min_support training rows, its probabilities span no more than
+        tolerance, and they all fall in the same risk band.
+        
+        Args:
+            X: Unscaled training features (DataFrame)
+            ensemble_prob: Ensemble fraud probability for each row of X
+        """
+        cells = pd.DataFrame({
+            'key': self._cascade_keys(X),
+            'prob': ensemble_prob
+        })
+        cells = cells[cells['key'] >= 0]
+        
+        rules = {}
+        for key, group in cells.groupby('key'):
+            low, high = group['prob'].min(), group['prob'].max()
+            if len(group) < min_support or high - low > tolerance:
+                continue
+            # Bands are (lo, hi], matching the strict > comparisons in _format_prediction
+            if np.digitize(low, RISK_THRESHOLDS, right=True) != np.digitize(high, RISK_THRESHOLDS, right=True):
+                continue
+            rules[int(key)] = float(group['prob'].mean())
+        
+        self.cascade = {
+            'rules': rules,
+            'tolerance': tolerance,
+            'min_support': min_support,
+            'training_coverage': float(cells['key'].isin(list(rules)).sum() / len(X))
         }
+        self._cascade_table = None
+        print(f"\nRule cascade: {len(rules)} decisive cells covering "
+              f"{self.cascade['training_coverage']*100:.1f}% of training rows")
+        return self.cascade
+    
+    def evaluate_cascade(self, X, sample_rows=200, max_rows=10_000):
+        """
+        Measure how much traffic the cascade short-circuits and the speedup.
+        
+        Evaluates at most max_rows rows of X (a fixed random sample) and times
+        single-row scoring on the first sample_rows of them.
+        
+        Returns:
+            dict with short-circuit fraction, max probability deviation from
+            the ensemble, and batch and single-row speedups
+        """
+        if len(X) > max_rows:
+            X = X.sample(n=max_rows, random_state=42)
+        X_scaled = self.scaler.transform(X)
+        
+        ensemble_prob = self._ensemble_proba(X_scaled)
+        cascade_prob = self.predict_proba_frame(X)
+        decided = ~np.isnan(self._cascade_lookup(X))
+        
+        batch_ensemble = self._time_call(lambda: self._ensemble_proba(self.scaler.transform(X)), repeats=5)
+        batch_cascade = self._time_call(lambda: self.predict_proba_frame(X), repeats=5)
+        
+        rows = [X.iloc[[i]] for i in range(min(sample_rows, len(X)))]
+        single_ensemble = self._time_call(
+            lambda: [self._ensemble_proba(self.scaler.transform(row)) for row in rows], repeats=1)
+        single_cascade = self._time_call(
+            lambda: [self.predict_proba_frame(row) for row in rows], repeats=1)
+        
+        report = {
+            'short_circuit_fraction': float(decided.mean()),
+            'max_abs_prob_diff': float(np.max(np.abs(cascade_prob - ensemble_prob))),
+            'decision_agreement': float(np.mean((cascade_prob > 0.5) == (ensemble_prob > 0.5))),
+            'batch_speedup': batch_ensemble / batch_cascade,
+            'single_row_speedup': single_ensemble / single_cascade
+        }
+        
+        print(f"Cascade short-circuits {report['short_circuit_fraction']*100:.1f}% of test rows "
+              f"(max prob diff {report['max_abs_prob_diff']:.4f})")
+        print(f"Speedup: {report['batch_speedup']:.1f}x batch, {report['single_row_speedup']:.1f}x single-row")
+        return report
+    
+    @staticmethod
+    def _cascade_keys(X):
+        """Flat cell index per row, or -1 when a key is out of range."""
+        score = X[CASCADE_KEY_COLUMNS[0]].to_numpy(dtype=float)
+        level = X[CASCADE_KEY_COLUMNS[1]].to_numpy(dtype=float)
+        valid = (
+            (score >= 0) & (score < CASCADE_KEY_SIZE) & (score == np.floor(score)) &
+            (level >= 0) & (level < CASCADE_KEY_SIZE) & (level == np.floor(level))
+        )
+        keys = np.where(valid, score * CASCADE_KEY_SIZE + level, -1)
+        return keys.astype(np.int64)
+    
+    def _cascade_lookup(self, X):
+        """Rule probability per row, NaN where the row is ambiguous."""
+        if not self.cascade or not self.cascade['rules']:
+            return np.full(len(X), np.nan)
+        
+        if self._cascade_table is None:
+            table = np.full(CASCADE_KEY_SIZE * CASCADE_KEY_SIZE + 1, np.nan)
+            for key, prob in self.cascade['rules'].items():
+                table[key] = prob
+            self._cascade_table = table  # last slot stays NaN for key -1
+        
+        return self._cascade_table[self._cascade_keys(X)]
     
-    def load_model(self):
-        """Load pre-trained model."""
+    def predict_proba_frame(self, features):
+        """
+        Fraud probability for unscaled feature rows.
+        
+        Rows in a decisive cascade cell get the rule's probability; only the
+        remaining ambiguous rows are scaled and sent to the model.
+        """
+        probs = self._cascade_lookup(features)
+        ambiguous = np.isnan(probs)
+        if ambiguous.any():
+            features_scaled = self.scaler.transform(features[ambiguous])
+            probs[ambiguous] = self._ensemble_proba(features_scaled)
+        return probs
+    
+    def _ensemble_proba(self, features_scaled):
+        """Fraud probability for scaled feature rows from the active model."""
+        if self.variant == STUDENT_VARIANT:
+            return np.clip(self.student_model.predict(features_scaled), 0.0, 1.0)
+        rf_prob = self.rf_model.predict_proba(features_scaled)[:, 1]
+        gb_prob = self.gb_model.predict_proba(features_scaled)[:, 1]
+        return (rf_prob + gb_prob) / 2
+    
+    def load_model(self, variant=ENSEMBLE_VARIANT):
+        """
+        Load pre-trained model.
+        
+        Args:
+            variant: 'ensemble' for the RF+GB ensemble, or 'student' for the
+                distilled lightweight model (falls back to the ensemble if no
+                student artifact exists)
+        """
+        if variant == STUDENT_VARIANT:
+            if STUDENT_MODEL_PATH.exists():
+                print(f"Loading student model from {STUDENT_MODEL_PATH}")
+                model_data = joblib.load(STUDENT_MODEL_PATH)
+                self.student_model = model_data['student_model']
+                self.scaler = model_data['scaler']
+                self.feature_names = model_data['feature_names']
+                self.cascade = model_data.get('cascade')
+                self._cascade_table = None
+                self.model = {'student': self.student_model}
+                self.variant = STUDENT_VARIANT
+                self.trained = True
+                return True
+            print(f"Student model not found at {STUDENT_MODEL_PATH}. Using ensemble.")
+        
         if not MODEL_PATH.exists():
             print(f"Model not found at {MODEL_PATH}. Training new model...")
             return self.train()
@@ -227,7 +725,10 @@ class WelfareFraudModel:
         self.gb_model = model_data['gb_model']
         self.scaler = model_data['scaler']
         self.feature_names = model_data['feature_names']
+        self.cascade = model_data.get('cascade')
+        self._cascade_table = None
         self.model = {'rf': self.rf_model, 'gb': self.gb_model}
+        self.variant = ENSEMBLE_VARIANT
         self.trained = True
         return True
     
@@ -255,14 +756,8 @@ class WelfareFraudModel:
         age = (dt.now() - dob).days / 365.25
         
         # Asset risk scoring
-        asset_risk_map = {
-            'Property > 50L': 4,
-            'Luxury Car': 3,
-            'Mutual Funds > 5L': 2,
-            'Standard': 0
-        }
         asset_flag = applicant_data.get('asset_flag', 'Standard')
-        asset_risk_score = asset_risk_map.get(asset_flag, 0)
+        asset_risk_score = ASSET_RISK_MAP.get(asset_flag, 0)
         
         # Income level
         income = applicant_data['declared_income']
@@ -293,13 +788,46 @@ class WelfareFraudModel:
             income_asset_mismatch
         ]], columns=self.feature_names)
         
-        # Scale
-        features_scaled = self.scaler.transform(features)
+        # Predict using the rule cascade, then ensemble (or its distilled student)
+        fraud_prob = float(self.predict_proba_frame(features)[0])
+        return self._format_prediction(
+            fraud_prob, income_level, age, asset_risk_score,
+            address_complexity, income_asset_mismatch, asset_flag
+        )
+    
+    def predict_batch(self, features, asset_flags):
+        """
+        Predict fraud risk for many applicants from ready-made features.
+        
+        Args:
+            features: DataFrame or float array with columns in
+                feature_names order
+            asset_flags: Asset flag per row (used in flag messages)
         
-        # Predict using ensemble
-        rf_prob = self.rf_model.predict_proba(features_scaled)[:, 1][0]
-        gb_prob = self.gb_model.predict_proba(features_scaled)[:, 1][0]
-        fraud_prob = (rf_prob + gb_prob) / 2
+        Returns:
+            list of prediction dicts, same shape as predict()
+        """
+        if not self.trained:
+            self.load_model()
+        
+        if not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(features, columns=self.feature_names)
+        fraud_probs = self.predict_proba_frame(features)
+        
+        columns = [features[name].to_numpy() for name in self.feature_names]
+        return [
+            self._format_prediction(
+                float(fraud_prob), int(income_level), float(age), int(asset_risk_score),
+                int(address_complexity), float(income_asset_mismatch), asset_flag
+            )
+            for fraud_prob, income_level, age, asset_risk_score, address_complexity,
+                income_asset_mismatch, asset_flag in zip(fraud_probs, *columns, asset_flags)
+        ]
+    
+    @staticmethod
+    def _format_prediction(fraud_prob, income_level, age, asset_risk_score,
+                           address_complexity, income_asset_mismatch, asset_flag):
+        """Build the prediction dict (risk band, flags, features) for one row."""
         prediction = 1 if fraud_prob > 0.5 else 0
         if fraud_prob > 0.7:
             risk_status = 'red'
@@ -351,16 +879,39 @@ class WelfareFraudModel:
         }
 
 
-def train_model():
+def train_model(distill=False):
     """Standalone function to train the model."""
     model = WelfareFraudModel()
-    return model.train()
+    return model.train(distill=distill)
 
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the welfare fraud model")
+    parser.add_argument('--distill', action='store_true', help="Also build the distilled student model")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Stream the CSV in chunks and train within --memory-budget-mb")
+    parser.add_argument('--memory-budget-mb', type=float, default=1024,
+                        help="Memory budget for --streaming (default: 1024)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows per CSV chunk for --streaming")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Forest worker threads for --streaming (-1 = all cores)")
+    parser.add_argument('--csv', help="Training CSV for --streaming (default: financial_intelligence.csv)")
+    args = parser.parse_args()
+    
     # Train the model
     model = WelfareFraudModel()
-    metrics = model.train()
+    if args.streaming:
+        metrics = model.train_streaming(
+            chunksize=args.chunksize, memory_budget_mb=args.memory_budget_mb,
+            n_jobs=args.n_jobs, csv_path=args.csv, distill=args.distill
+        )
+        pipeline = metrics['pipeline']
+        print(f"\nTrained on {pipeline['rows_trained']:,} of {pipeline['rows_streamed']:,} rows in "
+              f"{pipeline['total_seconds']:.1f}s, peak {pipeline['peak_memory_mb']:.1f} MB "
+              f"of {pipeline['memory_budget_mb']} MB")
+    else:
+        metrics = model.train(distill=args.distill)
     
     # Test prediction
     print("\n" + "="*70)
@@ -0,0 +1,387 @@
+"""
+PDS ledger tests.
+
+Checks of the block codec, Merkle checkpoints, the Mongo writer and
+importer and the file-backed segment log, run with pytest from the
+repository root. Mongo-backed tests run against mongomock_motor and are
+skipped when it is not installed.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+os.environ.setdefault('LEDGER_VERIFY_WORKERS', '1')  # Hash in-process, no worker pool
+
+import core.database as database  # noqa: E402
+from core.exceptions import ValidationError  # noqa: E402
+from services import ledger_merkle  # noqa: E402
+from services.ledger_import import import_ledger  # noqa: E402
+from services.ledger_stats import HyperLogLog, LedgerStats  # noqa: E402
+from services.ledger_store import RECORD, SegmentLog  # noqa: E402
+from services.block_codec import HASH_V1, encode_v2, quantity_units  # noqa: E402
+from services.ledger import (  # noqa: E402
+    Block, LedgerChain, hash_block, merkle_leaf, merkle_levels, merkle_proof, seal_block,
+    verify_inclusion_proof
+)
+from services.ledger_verifier import verify_chain_stream  # noqa: E402
+from services.ledger_writer import MAX_CONFLICT_RETRIES, LedgerWriter, make_block  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    mock_db = mongomock_motor.AsyncMongoMockClient()['ledger_test']
+    monkeypatch.setattr(database, '_db', mock_db)
+    return mock_db
+
+
+def transaction(i, **fields):
+    return {'shop_id': f'S{i % 7}', 'dealer_id': 'D1', 'beneficiary_id': f'B{i}', 'item': 'Rice',
+            'quantity': 1.5, **fields}
+
+
+async def insert_chain(collection, count, added_by='test'):
+    """count valid blocks, genesis included, inserted directly."""
+    previous_hash = '0' * 64
+    for i in range(count):
+        block = make_block(i, transaction(i), previous_hash, added_by)
+        await collection.insert_one(dict(block))
+        previous_hash = block['hash']
+
+
+def test_merkle_proofs_fold_to_root():
+    for n in range(1, 10):
+        hashes = [bytes([i]).hex() * 32 for i in range(n)]
+        levels = merkle_levels([merkle_leaf(h) for h in hashes])
+        root = levels[-1][0].hex()
+
+        for position, block_hash in enumerate(hashes):
+            proof = merkle_proof(levels, position)
+            assert verify_inclusion_proof(block_hash, proof, root)
+            assert not verify_inclusion_proof('ff' * 32, proof, root)
+            if proof:
+                flipped = [dict(step, side='left' if step['side'] == 'right' else 'right') for step in proof]
+                assert not verify_inclusion_proof(block_hash, flipped, root)
+
+    assert not verify_inclusion_proof(hashes[0], [{'hash': 'zz'}], root)
+    assert not verify_inclusion_proof(hashes[0], [{'hash': '00' * 32, 'side': 'up'}], root)
+
+
+def test_checkpoint_inclusion_proofs(db, monkeypatch):
+    monkeypatch.setattr(ledger_merkle, 'CHECKPOINT_INTERVAL', 13)
+    monkeypatch.setenv('LEDGER_CHECKPOINT_SECRET', 'test-secret')
+    ledger, checkpoints = db.pds_ledger, db.pds_ledger_checkpoints
+
+    async def run():
+        await insert_chain(ledger, 30)
+        result = await ledger_merkle.verify_incremental(ledger, checkpoints)
+        assert result['is_valid'] and result['checkpoints_created'] == 2 and result['watermark'] == 25
+
+        for index in range(26):
+            proof = await ledger_merkle.inclusion_proof(ledger, checkpoints, index=index)
+            assert proof['checkpoint']['segment'] == index // 13
+            assert ledger_merkle.checkpoint_signature_valid(proof['checkpoint'])
+            assert verify_inclusion_proof(hash_block(proof['block']), proof['proof'], proof['merkle_root'])
+
+        by_hash = await ledger_merkle.inclusion_proof(
+            ledger, checkpoints, block_hash=(await ledger.find_one({'index': 3}))['hash'])
+        assert by_hash['block']['index'] == 3
+        assert (await ledger_merkle.inclusion_proof(ledger, checkpoints, index=28))['checkpoint'] is None
+        assert await ledger_merkle.inclusion_proof(ledger, checkpoints, index=99) is None
+        with monkeypatch.context() as m:
+            m.setenv('LEDGER_CHECKPOINT_SECRET', 'other-secret')
+            assert not ledger_merkle.checkpoint_signature_valid(by_hash['checkpoint'])
+
+        # An edited block no longer proves against the signed root
+        await ledger.update_one({'index': 3}, {'$set': {'transaction.quantity': 9.0}})
+        proof = await ledger_merkle.inclusion_proof(ledger, checkpoints, index=3)
+        assert not verify_inclusion_proof(hash_block(proof['block']), proof['proof'], proof['merkle_root'])
+
+        # Checkpointed segments are only rechecked once marked for audit
+        assert (await ledger_merkle.verify_incremental(ledger, checkpoints))['is_valid']
+        assert await ledger_merkle.mark_for_audit(checkpoints, 3)
+        result = await ledger_merkle.verify_incremental(ledger, checkpoints)
+        assert result['status'] == 'COMPROMISED' and result['tampered_blocks'] == [3]
+
+    asyncio.run(run())
+
+
+def test_writer_retries_when_another_writer_takes_the_tip(db):
+    ledger = db.pds_ledger
+
+    async def run():
+        writer = LedgerWriter(ledger, max_group_commit=16)
+        blocks = await asyncio.gather(*[writer.append(transaction(i), 'u') for i in range(100)])
+        assert [block['index'] for block in blocks] == list(range(1, 101))
+
+        # Another process appends behind the writer's cached tip
+        tip = await ledger.find_one({}, {'_id': 0}, sort=[('index', -1)])
+        await ledger.insert_one(make_block(tip['index'] + 1, transaction(-1), tip['hash'], 'other'))
+        blocks = await asyncio.gather(*[writer.append(transaction(i), 'u') for i in range(10)])
+        assert [block['index'] for block in blocks] == list(range(102, 112))
+
+        result = await verify_chain_stream(ledger)
+        assert result['is_valid'] and result['total_blocks'] == 112
+
+        # A tip that never catches up fails the batch instead of looping
+        stale = dict(tip)
+        calls = []
+
+        async def stale_tip():
+            calls.append(1)
+            return stale
+
+        writer.current_tip = stale_tip
+        with pytest.raises(RuntimeError):
+            await writer.append(transaction(0), 'u')
+        assert len(calls) == MAX_CONFLICT_RETRIES + 1
+        assert await ledger.count_documents({}) == 112
+
+    asyncio.run(run())
+
+
+def write_transactions_csv(path, rows, bad_row=None):
+    with open(path, 'w') as f:
+        f.write('shop_id,dealer_id,beneficiary_id,item,quantity,timestamp\n')
+        for i in range(rows):
+            quantity = '0.0001' if i == bad_row else f'{i % 5 + 0.5}'
+            f.write(f'S{i % 7},D1,B{i},Rice,{quantity},2025-0{i % 9 + 1}-01T00:00:00\n')
+    return str(path)
+
+
+def test_import_resumes_without_duplicates(db, tmp_path):
+    ledger, imports = db.pds_ledger, db.pds_ledger_imports
+    path = write_transactions_csv(tmp_path / 'transactions.csv', 250)
+
+    async def run():
+        writer = LedgerWriter(ledger)
+        commit, calls = writer.commit, []
+
+        async def interrupted(entries, written):
+            calls.append(len(entries))
+            if len(calls) == 3:
+                await commit(entries[:20], written)
+                raise RuntimeError('connection lost')
+            await commit(entries, written)
+
+        writer.commit = interrupted
+        with pytest.raises(RuntimeError):
+            await import_ledger(path, import_id='imp1', writer=writer, imports=imports, batch_size=60)
+        progress = await imports.find_one({'import_id': 'imp1'})
+        assert progress['status'] == 'failed' and progress['records_committed'] == 140
+
+        # Lose the last progress update, and let a live append land in between
+        await imports.update_one({'import_id': 'imp1'}, {'$set': {'records_committed': 120, 'last_index': 120}})
+        writer.commit = commit
+        await writer.append(transaction(999), 'live')
+
+        progress = await import_ledger(path, import_id='imp1', writer=writer, imports=imports, batch_size=60)
+        assert progress['status'] == 'completed' and progress['records_committed'] == 250
+        imported = await ledger.find({'added_by': 'import:imp1'}).to_list(None)
+        assert sorted(block['transaction']['beneficiary_id'] for block in imported) == \
+            sorted(f'B{i}' for i in range(250))
+        assert (await verify_chain_stream(ledger))['is_valid']
+
+        # A completed import is not replayed
+        again = await import_ledger(path, import_id='imp1', writer=writer, imports=imports)
+        assert again['status'] == 'completed'
+        assert await ledger.count_documents({}) == 252
+
+    asyncio.run(run())
+
+
+def test_import_rejects_inexact_quantity(db, tmp_path):
+    ledger, imports = db.pds_ledger, db.pds_ledger_imports
+    path = write_transactions_csv(tmp_path / 'transactions.csv', 30, bad_row=25)
+
+    async def run():
+        with pytest.raises(ValidationError, match='Record 26'):
+            await import_ledger(path, import_id='imp2', writer=LedgerWriter(ledger), imports=imports,
+                                batch_size=10)
+        progress = await imports.find_one({'import_id': 'imp2'})
+        assert progress['status'] == 'failed' and progress['records_committed'] == 20
+
+    asyncio.run(run())
+
+
+def legacy_block():
+    return {'index': 3, 'timestamp': '2025-01-01T00:00:00', 'transaction': transaction(3, quantity=2.5),
+            'previous_hash': 'ab' * 32, 'added_by': 'u'}
+
+
+def test_v1_blocks_hash_as_sorted_json():
+    block = legacy_block()
+    expected = hashlib.sha256(json.dumps(block, sort_keys=True).encode()).hexdigest()
+    block['hash'] = expected
+    block['_id'] = 'ignored'
+    assert hash_block(block) == expected
+
+    sealed = Block(3, block['transaction'], block['previous_hash'], block['timestamp'], 'u', hash_version=HASH_V1)
+    assert sealed.hash == expected and 'hash_version' not in sealed.to_dict()
+
+    # v1 covers every stored field
+    assert hash_block(dict(block, note='x')) != expected
+
+
+def test_v2_encoding_and_hash():
+    block = seal_block(legacy_block())
+    assert block['hash_version'] == 2
+    assert hash_block(block) == block['hash']
+    assert Block(3, block['transaction'], block['previous_hash'], block['timestamp'], 'u').hash == block['hash']
+
+    encoded = bytes(encode_v2(3, block['timestamp'], block['transaction'], block['previous_hash'], None))
+    assert encoded[:9] == struct.pack('>BQ', 2, 3)
+    assert struct.pack('>q', 2500) + bytes.fromhex('ab' * 32) + b'\xff\xff\xff\xff' == encoded[-44:]
+
+    # Every covered field, and the version itself, changes the hash
+    for changed in (
+        dict(block, index=4),
+        dict(block, timestamp='2025-01-01T00:00:01'),
+        dict(block, transaction=dict(block['transaction'], item='Wheat')),
+        dict(block, transaction=dict(block['transaction'], quantity=2.501)),
+        dict(block, previous_hash='cd' * 32),
+        dict(block, added_by=''),
+        dict(block, added_by=None),
+        {k: v for k, v in block.items() if k != 'hash_version'},
+    ):
+        assert hash_block(changed) != block['hash']
+    assert hash_block(dict(block, previous_hash='not hex')) == ''
+
+
+def test_v2_quantities_are_exact_thousandths():
+    for quantity, units in ((0, 0), (10, 10000), (2.5, 2500), (0.1, 100), (1.005, 1005), (12.345, 12345), (-3, -3000)):
+        assert quantity_units(quantity) == units
+
+    for quantity in (10.0001, 10.0004, 2.5000001, float('nan'), float('inf'), 1e300):
+        with pytest.raises(ValueError):
+            quantity_units(quantity)
+
+    with pytest.raises(ValueError):
+        seal_block(dict(legacy_block(), transaction=transaction(3, quantity=10.0004)))
+
+    # A stored block edited to an inexact quantity fails instead of hashing like its rounded value
+    block = seal_block(dict(legacy_block(), transaction=transaction(3, quantity=10.0)))
+    assert hash_block(dict(block, transaction=transaction(3, quantity=10.0004))) == ''
+
+
+def test_hyperloglog_estimates():
+    small = HyperLogLog()
+    for i in range(50):
+        small.add(f'B{i % 10}')
+    assert small.count() == 10
+
+    large = HyperLogLog()
+    for i in range(100_000):
+        large.add(f'B{i}')
+    assert abs(large.count() - 100_000) < 2_000
+
+    restored = HyperLogLog(registers=large.to_bytes())
+    assert restored.count() == large.count()
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=12, registers=large.to_bytes())
+
+
+def test_ledger_stats_follow_the_chain(db):
+    ledger = db.pds_ledger
+
+    async def run():
+        stats = LedgerStats(db.pds_ledger_stats, ledger)
+        writer = LedgerWriter(ledger, stats=stats)
+        for i in range(30):
+            await writer.append(transaction(i % 11, item=['Rice', 'Wheat'][i % 2]), 'u')
+
+        snapshot = await stats.snapshot()
+        assert snapshot['total_transactions'] == 30
+        assert (snapshot['unique_shops'], snapshot['unique_beneficiaries']) == (7, 11)
+        assert {item['_id']: item['transaction_count'] for item in snapshot['items']} == {'Rice': 15, 'Wheat': 15}
+
+        # A block written outside the writer is folded in on refresh
+        tip = await writer.tip()
+        await ledger.insert_one(make_block(tip['index'] + 1, transaction(50), tip['hash'], 'seed'))
+        tip = await ledger.find_one({}, {'_id': 0}, sort=[('index', -1)])
+        assert not await stats.is_current(tip)
+        assert await stats.refresh(tip) == 1
+        assert (await stats.snapshot())['unique_beneficiaries'] == 12
+
+        exact = await stats.recount_exact()
+        assert (exact['unique_shops'], exact['unique_beneficiaries']) == (7, 12)
+        reloaded = await LedgerStats(db.pds_ledger_stats, ledger).snapshot()
+        assert reloaded == await stats.snapshot() and reloaded['unique_counts'] == 'exact'
+
+        # A rewritten chain is recounted from scratch
+        await ledger.delete_many({'index': {'$gt': 5}})
+        tip = await ledger.find_one({}, {'_id': 0}, sort=[('index', -1)])
+        await stats.refresh(tip)
+        snapshot = await stats.snapshot()
+        assert snapshot['total_blocks'] == 6 and snapshot['unique_counts'] == 'approximate'
+
+    asyncio.run(run())
+
+
+def test_segment_log_reopens_tampered_and_torn_chains(tmp_path):
+    path = str(tmp_path / 'chain')
+    with LedgerChain(path) as chain:
+        for i in range(300):
+            chain.add_transaction(f'S{i % 50}', 'D1', f'B{i}', 'Rice', 1.5 + i % 3, 'u')
+        ledger = chain.get_ledger()
+
+    chain = LedgerChain(path)
+    assert len(chain) == 301 and chain.get_ledger() == ledger
+    assert chain.verify_chain()['is_valid']
+
+    # Tampering and later appends are persisted
+    chain.simulate_tamper(100)
+    chain.add_transaction('S1', 'D1', 'B-new', 'Wheat', 2, 'u')
+    chain.close()
+    chain = LedgerChain(path)
+    assert len(chain) == 302 and chain.chain[-1].transaction['beneficiary_id'] == 'B-new'
+    assert chain.verify_chain()['tampered_block'] == 100
+    chain.close()
+
+    # Bytes past the last indexed write (a torn append) are truncated on reopen
+    segment = os.path.join(path, 'ledger-000000.seg')
+    with open(segment, 'ab') as f:
+        f.write(b'x' * 50)
+    with open(os.path.join(path, 'strings.dat'), 'ab') as f:
+        f.write(b'junk')
+    chain = LedgerChain(path)
+    assert len(chain) == 302 and os.path.getsize(segment) == 302 * RECORD.size
+    chain.add_transaction('S1', 'D1', 'B-after', 'Rice', 1, 'u')
+    assert chain.verify_chain()['tampered_block'] == 100
+
+    chain.reset()
+    chain.close()
+    with LedgerChain(path) as chain:
+        assert len(chain) == 1 and chain.verify_chain()['is_valid']
+
+
+def test_segment_log_rollover_and_overrides(tmp_path):
+    path = str(tmp_path / 'log')
+    log = SegmentLog(path, records_per_segment=7, fsync_batch=5)
+    previous_hash, blocks = '0' * 64, []
+    for i in range(23):
+        tx = transaction(i, quantity=i)
+        if i == 9:
+            tx['note'] = 'does not fit the record layout'
+        block = Block(i, tx, previous_hash, added_by=None if i % 4 else 'a')
+        log.append(block.timestamp, block.transaction, block.previous_hash, block.added_by,
+                   block.hash_version, block.hash)
+        previous_hash = block.hash
+        blocks.append(block.to_dict())
+    log.close()
+
+    log = SegmentLog(path)
+    assert sorted(f for f in os.listdir(path) if f.endswith('.seg')) == \
+        [f'ledger-00000{segment}.seg' for segment in range(4)]
+    assert len(log) == 23
+    for i, block in enumerate(blocks):
+        assert log.block_dict(i) == block
+        assert log.recompute_hash(i) == block['hash']
+    log.close()
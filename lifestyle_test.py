@@ -0,0 +1,258 @@
+"""
+Lifestyle scanner index tests.
+
+Pure-Python checks of the in-memory registry indexes and household risk
+table, run with pytest from the repository root (no server or database).
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.household_graph import HouseholdGraph, UnionFind  # noqa: E402
+from services.household_risk import HouseholdRiskTable, affected_families  # noqa: E402
+from services.lifestyle import LifestyleScanner  # noqa: E402
+from services.lifestyle_index import AssetIndex, FamilyIndex, NameIndex  # noqa: E402
+from services.lifestyle_registry import compact_civil, compact_discom, compact_vahan  # noqa: E402
+
+
+def civil_registry():
+    return pd.DataFrame([
+        {'name': 'Daksh Raja', 'family_id': 'F1', 'unique_id': 'U1', 'address': '18, Pall Street', 'dob': '1954-07-26'},
+        {'name': 'Meera Raja', 'family_id': 'F1', 'unique_id': 'U2', 'address': '18, Pall Street', 'dob': '1958-02-11'},
+        {'name': 'Turvi Lamba', 'family_id': 'F2', 'unique_id': 'U3', 'address': '4, Ring Road', 'dob': '1990-05-20'},
+        {'name': 'Ishaan Lamba', 'family_id': 'F2', 'unique_id': 'U4', 'address': '4, Ring Road', 'dob': '1988-01-02'},
+        {'name': 'Kabir Sethi', 'family_id': 'F3', 'unique_id': 'U5', 'address': '9, Lake View', 'dob': '1975-09-09'},
+    ])
+
+
+def vahan_registry():
+    return pd.DataFrame([{'owner_name': 'Ishaan Lamba', 'owner_id': 'U4', 'vehicle_model': 'BMW X5'}])
+
+
+def discom_data():
+    return pd.DataFrame([
+        {'consumer_name': 'Kabir Sethi', 'address': '9, Lake View', 'avg_monthly_bill': 9500},
+        {'consumer_name': 'Daksh Raja', 'address': '18, Pall Street', 'avg_monthly_bill': 1200},
+    ])
+
+
+def make_scanner(df_civil, df_vahan, df_discom):
+    """Scanner over in-memory frames instead of the CSVs in backend/data."""
+    scanner = LifestyleScanner.__new__(LifestyleScanner)
+    scanner.df_civil = compact_civil(df_civil)
+    scanner.df_vahan = compact_vahan(df_vahan)
+    scanner.df_discom = compact_discom(df_discom)
+    scanner._build_indexes()
+    return scanner
+
+
+def test_name_index_exact_and_prefix_return_first_registry_row():
+    names = ['Meera Raja', 'Daksh Raja', None, 'Daksh Raja', 'Dakshesh Rao', 'Kabir Sethi']
+    index = NameIndex(names)
+
+    assert len(index) == 5
+    assert index.exact('daksh raja') == 1
+    assert index.exact('kabir sethi') == 5
+    assert index.exact('daksh') is None
+
+    # Earliest registry row among all prefix matches, not the alphabetically first
+    assert index.prefix('daksh') == 1
+    assert index.prefix('dakshe') == 4
+    assert index.prefix('m') == 0
+    assert index.prefix('z') is None
+    assert index.prefix('') is None
+
+    for query in ('d', 'da', 'daksh r', 'dakshesh', 'k', 'kabir sethi', 'meera raja x'):
+        scan = next((i for i, name in enumerate(names) if name and name.lower().startswith(query)), None)
+        assert index.prefix(query) == scan
+
+
+def word_overlap_scan(names, query, threshold=0.5):
+    """The original fuzzy fallback: best word overlap over every row in order."""
+    query_words = set(query.split())
+    best, best_score = None, 0
+    for position, name in enumerate(names):
+        if not name:
+            continue
+        name_words = set(name.lower().split())
+        score = len(query_words & name_words) / max(len(query_words), len(name_words))
+        if score > best_score and score > threshold:
+            best, best_score = position, score
+    return best, best_score
+
+
+def test_name_index_fuzzy_matches_word_overlap_scan():
+    names = ['Meera Raja', 'Daksh Kumar Raja', None, 'Daksh Raja', 'Kabir Sethi', 'Raja Daksh']
+    index = NameIndex(names)
+
+    for query in ('daksh raja', 'raja daksh kumar', 'kabir sethi singh', 'meera', 'sethi kabir', 'nobody here'):
+        position, score, _ = index.fuzzy(query)
+        assert (position, score) == word_overlap_scan(names, query)
+
+
+def test_name_index_fuzzy_tolerates_one_typo_per_word():
+    index = NameIndex(['Meera Raja', 'Daksh Raja', 'Kabir Sethi', 'Dakhs Rajan'])
+
+    # No exact-word score above the threshold, so misspelled words may match
+    assert index.fuzzy('daksh rajaa')[:2] == (1, 1.0)
+
+    # Among typo matches, more exact words win
+    assert index.fuzzy('dakhs raja')[0] == 3
+    assert index.fuzzy('kabr seti')[0] == 2
+
+    # Short words are not expanded, and typos can be disabled
+    assert index.fuzzy('kabir set')[0] is None
+    assert NameIndex(['Kabir Sethi'], max_edit_distance=0).fuzzy('kabr sethi')[0] is None
+
+
+def test_family_index_members_in_registry_order():
+    family_ids = ['F2', 'F1', None, 'F2', 'F3', 'F1', 'F2', float('nan')]
+    index = FamilyIndex(family_ids)
+
+    assert len(index) == 3
+    assert index.members('F1').tolist() == [1, 5]
+    assert index.members('F2').tolist() == [0, 3, 6]
+    assert index.members('F3').tolist() == [4]
+    assert index.members('F9').tolist() == []
+
+    civil = civil_registry()
+    index = FamilyIndex(civil['family_id'])
+    for family_id in civil['family_id'].unique():
+        assert index.members(family_id).tolist() == civil.index[civil['family_id'] == family_id].tolist()
+
+
+def test_asset_index_lookups():
+    vahan = pd.concat([vahan_registry(), pd.DataFrame([
+        {'owner_name': 'Ishaan Lamba', 'owner_id': 'U4', 'vehicle_model': 'Maruti Alto'},
+        {'owner_name': 'Kabir Sethi', 'owner_id': 'U5', 'vehicle_model': 'Honda City'},
+    ])], ignore_index=True)
+    discom = pd.concat([discom_data(), pd.DataFrame([
+        {'consumer_name': 'K Sethi', 'address': '9,  lake view', 'avg_monthly_bill': 300},
+    ])], ignore_index=True)
+
+    for df_vahan, df_discom in ((vahan, discom), (compact_vahan(vahan), compact_discom(discom))):
+        index = AssetIndex(df_vahan, df_discom)
+        # First registration / connection wins; addresses match case- and space-insensitively
+        vehicles = index.vehicle_models(pd.Series(['U4', 'U1', 'U5']))
+        assert vehicles.iloc[0] == 'BMW X5' and pd.isna(vehicles.iloc[1]) and vehicles.iloc[2] == 'Honda City'
+        bills = index.monthly_bills(pd.Series(['9, LAKE VIEW ', '4, Ring Road', None]))
+        assert bills.iloc[0] == 9500 and bills.iloc[1:].isna().all()
+        assert index.has_vehicle('U4') and not index.has_vehicle('U1')
+
+    old = AssetIndex(vahan_registry(), discom_data())
+    new = AssetIndex(vahan, discom.assign(avg_monthly_bill=[9500, 1500, 300]))
+    assert old.changed_owners(new) == {'U5'}
+    assert old.changed_addresses(new) == {'18, pall street'}
+    assert new.changed_owners(new) == set() and new.changed_addresses(new) == set()
+
+
+def test_check_family_assets_uses_asset_index():
+    scanner = make_scanner(civil_registry(), vahan_registry(), discom_data())
+
+    flags, score = scanner._check_family_assets(scanner._family_members('F2'))
+    assert score == 50 and flags == ['🚗 Family Member (Ishaan Lamba) owns BMW X5']
+    flags, score = scanner._check_family_assets(scanner._family_members('F3'))
+    assert score == 40 and flags == ['⚡ High Monthly Bill Detected: ₹9500']
+    assert scanner._check_family_assets(scanner._family_members('F1')) == ([], 0)
+
+
+def test_union_find_merges_sets():
+    uf = UnionFind(6)
+    uf.union(0, 1)
+    uf.union(2, 3)
+    uf.union(1, 3)
+    uf.union(3, 0)
+
+    assert len({uf.find(x) for x in (0, 1, 2, 3)}) == 1
+    assert uf.find(4) == 4 and uf.find(5) == 5
+    assert uf.size[uf.find(0)] == 4
+    assert all(uf.parent[x] == uf.find(0) for x in (0, 1, 2, 3))
+
+
+def linked_registry():
+    # F1 and F2 share a phone; F2 and F3 share an address; F4 is alone
+    return pd.DataFrame([
+        {'family_id': 'F1', 'address': '18, Pall Street', 'phone': '98100 00001'},
+        {'family_id': 'F1', 'address': '18, Pall Street', 'phone': None},
+        {'family_id': 'F2', 'address': '4, Ring Road', 'phone': '9810000001'},
+        {'family_id': 'F3', 'address': '4,  RING road', 'phone': '98100 00003'},
+        {'family_id': 'F4', 'address': '9, Lake View', 'phone': None},
+    ])
+
+
+def test_household_graph_components_and_hop_limit():
+    graph = HouseholdGraph(linked_registry(), path=None)
+
+    assert graph.cluster(0).tolist() == [0, 1, 2, 3]
+    assert graph.cluster(3).tolist() == [0, 1, 2, 3]
+    assert graph.cluster(4).tolist() == [4]
+
+    assert graph.cluster(1, hop_limit=0).tolist() == [1]
+    assert graph.cluster(1, hop_limit=1).tolist() == [0, 1]
+    assert graph.cluster(1, hop_limit=2).tolist() == [0, 1, 2]
+    assert graph.cluster(1, hop_limit=3).tolist() == [0, 1, 2, 3]
+
+    # A key shared by more rows than max_group_size links nobody
+    hub = linked_registry().assign(email='office@example.com')
+    assert HouseholdGraph(hub, path=None, max_group_size=4).cluster(4).tolist() == [4]
+    assert HouseholdGraph(hub, path=None, max_group_size=5).cluster(4).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_household_graph_persists_until_registry_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'household_graph.npz')
+    graph = HouseholdGraph(linked_registry(), path=path)
+
+    def no_build(*args):
+        raise AssertionError('graph rebuilt')
+
+    with monkeypatch.context() as m:
+        m.setattr(HouseholdGraph, '_build', no_build)
+        reloaded = HouseholdGraph(linked_registry(), path=path)
+    assert reloaded.labels.tolist() == graph.labels.tolist()
+    assert reloaded.cluster(1, hop_limit=2).tolist() == [0, 1, 2]
+
+    changed = linked_registry()
+    changed.loc[2, 'phone'] = None
+    assert HouseholdGraph(changed, path=path).cluster(0).tolist() == [0, 1]
+
+
+def test_affected_families_tolerates_duplicate_unique_id():
+    old = civil_registry()
+    new = pd.concat([old, old.iloc[[4]]], ignore_index=True)
+    new.loc[5, 'family_id'] = 'F2'
+    assets = AssetIndex(vahan_registry(), discom_data())
+
+    assert affected_families(old, new, assets, assets) == {'F2', 'F3'}
+    assert affected_families(new, new, assets, assets) == set()
+
+    # An edit to the second copy of a duplicated id is still seen
+    edited = new.copy()
+    edited.loc[5, 'name'] = 'Kabir S'
+    assert affected_families(new, edited, assets, assets) == {'F2', 'F3'}
+
+
+def test_apply_registry_changes_with_duplicate_unique_id():
+    scanner = make_scanner(civil_registry(), vahan_registry(), discom_data())
+    assert scanner.household_risk.lookup('F3')[1] == 40
+
+    changed = civil_registry()
+    changed = pd.concat([changed, changed.iloc[[2]]], ignore_index=True)
+    changed.loc[5, ['family_id', 'address']] = ['F3', '9, Lake View']
+    assert scanner.apply_registry_changes(changed) == 2
+
+    rebuilt = HouseholdRiskTable(scanner.df_civil, scanner.asset_index)
+    for family_id in ('F1', 'F2', 'F3'):
+        assert scanner.household_risk.lookup(family_id) == rebuilt.lookup(family_id)
+    assert scanner.household_risk.lookup('F3')[1] == 80
+
+
+def test_household_hop_limit_falls_back_on_bad_values(monkeypatch):
+    from services.lifestyle import _household_hop_limit
+
+    for value, expected in (('', None), ('2', 2), (' 0 ', 0), ('two', None), ('-1', None)):
+        monkeypatch.setenv('HOUSEHOLD_HOP_LIMIT', value)
+        assert _household_hop_limit() == expected
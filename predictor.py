@@ -0,0 +1,78 @@
+import os
+import threading
+
+import joblib
+import pandas as pd
+
+# Shared fraud predictor for main.py (/ml-predict) and use_model.py (/predict).
+# The model is loaded once per process (by warm() at app startup, or on
+# first use) and scores any number of applicants with a single predict_proba
+# call.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get("FRAUD_MODEL_PATH", os.path.join(BASE_DIR, "fraud_model.pkl"))
+
+FEATURES = ["income", "same_day_visits", "shared_mobile", "previous_defaults"]
+
+_model = None
+_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Returns the fraud model, loading it on first call.
+    """
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = joblib.load(MODEL_PATH)
+    return _model
+
+
+def warm():
+    """
+    Loads the model and runs one prediction so the first request is fast.
+    """
+    score_applicants([{"income": 600000, "same_day_visits": 6, "shared_mobile": 1, "previous_defaults": 1}])
+
+
+def risk_level(prob):
+    if prob > 0.75:
+        return "High Risk"
+    elif prob > 0.4:
+        return "Medium Risk"
+    return "Low Risk"
+
+
+def score_applicants(applicants):
+    """
+    Scores a list of applicant dicts (keys: FEATURES) in one vectorized call.
+
+    Returns:
+        list of {"status", "fraud_risk", "risk_level"} dicts, in input order
+    """
+    if not applicants:
+        return []
+
+    features = pd.DataFrame(
+        [[int(applicant[name]) for name in FEATURES] for applicant in applicants],
+        columns=FEATURES
+    )
+    probs = get_model().predict_proba(features)[:, 1]
+
+    return [
+        {
+            "status": "Rejected" if prob > 0.5 else "Approved",
+            "fraud_risk": round(float(prob) * 100, 2),
+            "risk_level": risk_level(prob)
+        }
+        for prob in probs
+    ]
+
+
+def score_applicant(applicant):
+    """
+    Scores a single applicant dict.
+    """
+    return score_applicants([applicant])[0]
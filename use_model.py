@@ -1,65 +1,37 @@
-from flask import Flask, request, jsonify
-import joblib
-app = Flask(__name__)
-
-
-
-model = joblib.load("fraud_model.pkl")
-
-test_case = [[600000, 6, 1, 1]]
-prob = model.predict_proba(test_case)[0][1]
-
-print("Fraud probability:", round(prob * 100, 2), "%")
-
-@app.route("/predict", methods=["POST"])
-def predict():
-    data = request.json
-
-    features = [[
-        data["income"],
-        data["same_day_visits"],
-        data["shared_mobile"],
-        data["previous_defaults"]
-    ]]
-
-    prob = model.predict_proba(features)[0][1]
-
-    if prob > 0.75:
-        level = "High Risk"
-    elif prob > 0.4:
-        level = "Medium Risk"
-    else:
-        level = "Low Risk"
-
-    return jsonify({
-        "status": "Rejected" if prob > 0.5 else "Approved",
-        "fraud_risk": round(prob * 100, 2),
-        "risk_level": level
-    })
-if __name__ == "__main__":
-    app.run(debug=True)
-@app.post("/ml-predict")
-async def ml_predict(request: Request):
-    data = await request.json()
-
-    features = [[
-        data["income"],
-        data["same_day_visits"],
-        data["shared_mobile"],
-        data["previous_defaults"]
-    ]]
-
-    prob = model.predict_proba(features)[0][1]
-
-    if prob > 0.75:
-        level = "High Risk"
-    elif prob > 0.4:
-        level = "Medium Risk"
-    else:
-        level = "Low Risk"
-
-    return {
-        "status": "Rejected" if prob > 0.5 else "Approved",
-        "fraud_risk": round(prob * 100, 2),
-        "risk_level": level
-    }
+from flask import Flask, request, jsonify
+from predictor import score_applicant, score_applicants, warm
+app = Flask(__name__)
+
+
+
+# Model is shared with main.py and loaded lazily on first request
+
+@app.route("/predict", methods=["POST"])
+def predict():
+    data = request.json
+
+    return jsonify(score_applicant(data))
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    data = request.get_json(silent=True)
+    applicants = data.get("applicants") if isinstance(data, dict) else data
+
+    if not isinstance(applicants, list):
+        return jsonify({"error": 'Expected a JSON list of applicants or {"applicants": [...]}'}), 400
+
+    try:
+        results = score_applicants(applicants)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid applicant: {e!r}"}), 400
+
+    return jsonify({
+        "count": len(results),
+        "results": results
+    })
+
+if __name__ == "__main__":
+    warm()
+    test_case = {"income": 600000, "same_day_visits": 6, "shared_mobile": 1, "previous_defaults": 1}
+    print("Fraud probability:", score_applicant(test_case)["fraud_risk"], "%")
+    app.run(debug=True)
@@ -0,0 +1,165 @@
+"""
+Welfare fraud model tests.
+
+Pure-Python checks of the training and scoring pipeline, run with pytest
+from the repository root. Model artifacts are written to a temporary
+directory, never over backend/services/models.
+"""
+
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import services.welfare_ml_model as welfare_ml_model  # noqa: E402
+from services.welfare_features import ApplicantFeatureStore, compute_features  # noqa: E402
+from services.welfare_ml_model import ASSET_RISK_MAP, WelfareFraudModel  # noqa: E402
+
+FEATURE_NAMES = ['income_level', 'age', 'asset_risk_score', 'address_complexity', 'income_asset_mismatch']
+
+
+@pytest.fixture
+def model_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(welfare_ml_model, 'MODEL_PATH', tmp_path / 'welfare_fraud_model.pkl')
+    monkeypatch.setattr(welfare_ml_model, 'STUDENT_MODEL_PATH', tmp_path / 'welfare_fraud_student.pkl')
+    return tmp_path
+
+
+def write_financial_csv(path, rows, seed=0):
+    """financial_intelligence.csv-shaped feed with a mix of fraud and clean rows."""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1950, 2004, rows)
+    pd.DataFrame({
+        'pan_id': [f'P{i:07d}' for i in range(rows)],
+        'name': 'Test Person',
+        'dob': [f'{year}-0{month}-1{day}' for year, month, day in
+                zip(years, rng.integers(1, 10, rows), rng.integers(0, 10, rows))],
+        'address': rng.choice(['12, MG Road, Pune', 'Sector 4, Noida', '7/2, Lake View, Kochi-682001'], rows),
+        'tax_filing_income': rng.integers(100_000, 4_999_999, rows),
+        'asset_flag': rng.choice(list(ASSET_RISK_MAP), rows)
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_cascade_answers_decisive_cells_without_the_model():
+    from sklearn.preprocessing import StandardScaler
+
+    X = pd.DataFrame([[4, 40.0, 0, 1, 0], [0, 35.0, 4, 2, 4], [1, 50.0, 2, 0, 0], [2.5, 30.0, 0, 0, 0]],
+                     columns=FEATURE_NAMES)
+    model = WelfareFraudModel()
+    model.feature_names = FEATURE_NAMES
+    model.scaler = StandardScaler().fit(X)
+    model.cascade = {'rules': {0 * 5 + 4: 0.02, 4 * 5 + 0: 0.97}}
+
+    scored = []
+
+    def ensemble(features_scaled):
+        scored.append(len(features_scaled))
+        return np.full(len(features_scaled), 0.45)
+
+    model._ensemble_proba = ensemble
+    # Cells (0, 4) and (4, 0) are rules; (2, 1) has none; a fractional key is out of range
+    assert model.predict_proba_frame(X).tolist() == [0.02, 0.97, 0.45, 0.45]
+    assert scored == [2]
+
+    scored.clear()
+    assert model.predict_proba_frame(X.iloc[:2]).tolist() == [0.02, 0.97]
+    assert scored == []
+
+
+def applicants_frame():
+    return pd.DataFrame([
+        {'applicant_id': 'A1', 'declared_income': 250000, 'dob': '1980-03-01',
+         'address': '12, MG Road, Pune', 'asset_flag': 'None'},
+        {'applicant_id': 'A2', 'declared_income': 1000000, 'dob': '1995-12-31',
+         'address': 'Sector 4', 'asset_flag': list(ASSET_RISK_MAP)[-1]},
+        {'applicant_id': 'A3', 'declared_income': 4500000, 'dob': 'not a date',
+         'address': None, 'asset_flag': 'Unknown Flag'},
+    ])
+
+
+def test_compute_features_matches_single_applicant_engineering():
+    applicants = applicants_frame()
+    computed = compute_features(applicants)
+
+    for row, features in zip(applicants.itertuples(), computed['features']):
+        income_level = int(np.digitize(row.declared_income, [1000000, 2000000, 3000000, 4000000]))
+        asset_risk_score = ASSET_RISK_MAP.get(row.asset_flag, 0)
+        expected = [
+            income_level,
+            asset_risk_score,
+            row.address.count(',') if isinstance(row.address, str) else 0,
+            max(0, asset_risk_score - income_level * asset_risk_score),
+        ]
+        assert features.tolist() == expected
+    assert computed['dob_ordinal'].tolist() == [
+        date(1980, 3, 1).toordinal(), date(1995, 12, 31).toordinal(), date(1990, 1, 1).toordinal()]
+
+
+def test_feature_store_recomputes_only_changed_applicants(tmp_path):
+    path = str(tmp_path / 'applicant_features.npz')
+    store = ApplicantFeatureStore(path)
+    applicants = applicants_frame()
+
+    assert store.refresh(applicants) == 3
+    assert store.refresh(applicants) == 0
+    full = store.matrix(FEATURE_NAMES, today=date(2025, 3, 1))
+    assert full.dtype == np.float32 and full.shape == (3, 5)
+    assert full[0, 1] == np.float32((date(2025, 3, 1).toordinal() - date(1980, 3, 1).toordinal()) / 365.25)
+
+    edited = applicants.copy()
+    edited.loc[1, 'address'] = 'Sector 4, Noida'
+    assert store.refresh(edited) == 1
+    assert store.matrix(FEATURE_NAMES, today=date(2025, 3, 1))[1, 3] == 1
+
+    # Dropped and reordered applicants keep their stored features
+    reordered = edited.iloc[[2, 0]].reset_index(drop=True)
+    assert store.refresh(reordered) == 0
+    assert store.applicant_ids.tolist() == ['A3', 'A1']
+
+    reloaded = ApplicantFeatureStore(path)
+    assert reloaded.applicant_ids.tolist() == ['A3', 'A1']
+    assert np.array_equal(reloaded.matrix(FEATURE_NAMES, today=date(2025, 3, 1)),
+                          store.matrix(FEATURE_NAMES, today=date(2025, 3, 1)))
+    assert np.array_equal(reloaded.matrix(FEATURE_NAMES, today=date(2025, 3, 1))[1], full[0])
+
+
+def test_train_streaming_under_tight_budget(model_paths):
+    csv_path = write_financial_csv(model_paths / 'financial.csv', 20_000)
+
+    metrics = WelfareFraudModel().train_streaming(memory_budget_mb=4, csv_path=csv_path, n_jobs=1)
+
+    pipeline = metrics['pipeline']
+    assert pipeline['rows_streamed'] == 20_000
+    assert 0 < pipeline['rows_trained'] < 20_000
+    assert pipeline['within_budget'], pipeline
+    assert metrics['roc_auc'] > 0.95
+    assert (model_paths / 'welfare_fraud_model.pkl').exists()
+
+
+def test_cascade_risk_bands_match_prediction_thresholds():
+    # Cells 0-4: asset_risk_score 0, income_level 0-4, 20 rows each
+    X = pd.DataFrame({'asset_risk_score': 0, 'income_level': np.repeat(np.arange(5), 20)})
+    cell_probs = [
+        (0.35, 0.40),  # both LOW: 0.4 is not > 0.4
+        (0.40, 0.45),  # LOW and MEDIUM
+        (0.45, 0.50),  # both MEDIUM, both not fraud
+        (0.50, 0.55),  # not fraud and fraud
+        (0.65, 0.70),  # both MEDIUM: 0.7 is not > 0.7
+    ]
+    ensemble_prob = np.concatenate([np.linspace(low, high, 20) for low, high in cell_probs])
+
+    model = WelfareFraudModel()
+    rules = model.fit_cascade(X, ensemble_prob)['rules']
+
+    assert sorted(rules) == [0, 2, 4]
+    for key in rules:
+        rows = ensemble_prob[key * 20:(key + 1) * 20]
+        bands = {WelfareFraudModel._format_prediction(p, 0, 30, 0, 0, 0.0, 'None')['risk_level'] for p in rows}
+        rule = WelfareFraudModel._format_prediction(rules[key], 0, 30, 0, 0, 0.0, 'None')['risk_level']
+        assert bands == {rule}